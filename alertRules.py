@@ -0,0 +1,394 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+  2026/10/19  BrucesHobbies   Rule alert state can be saved and restored (stateSnapshot.py)
+  2026/10/19  BrucesHobbies   Rules are checked when loaded, bad rules are skipped
+
+
+OVERVIEW:
+    Alert rule engine. Rules are read from a JSON file (alertRules.json),
+    each rule is compiled once into a small state machine and every sample
+    updates only the rules for its topic, each in constant time.
+
+    Rule types:
+        threshold  value of a field, or the highest (above) / lowest (below)
+                   of a list of fields
+        rate       change of a field per hour over windowSec seconds
+        disagree   absolute difference between two fields
+        daily      fires once a day at "HH:MM" local time, from tick()
+
+    Sample rules use "above" or "below", and optionally:
+        hysteresis      clears once the value is this far back inside
+        forSec          condition must hold this many seconds before firing
+        minIntervalSec  do not fire again sooner than this
+        repeatSec       fire again after this many seconds while still active
+        enabled         false to keep a rule in the file without running it
+
+    Missing values (-99) are ignored. When a rule fires its "action" runs,
+    when it clears its optional "clearAction" runs:
+        {"dest": ["EMAIL_SMS"], "topic": "basinMaster/Alert", "message": "Water Depth: {value}"}
+            publish through pubScribe, message fields are name, field, value, time
+        {"call": "status"}
+            call a function registered with addAction()
+
+    loadRules() checks each rule as it is read. A rule that can not be
+    built, or names an unknown "call" or a bad message format, is printed
+    and skipped, the other rules still run. A file that is not valid JSON
+    returns None so the caller can keep its running rules or the defaults.
+
+    Example alertRules.json:
+        [{"name": "High water", "type": "threshold", "topic": "basinMaster/WaterDepth",
+          "field": ["Ultrasonic (in)", "ABP (in)"], "above": 9, "hysteresis": 0.5, "forSec": 0,
+          "minIntervalSec": 86400,
+          "action": {"dest": ["EMAIL_SMS"], "topic": "basinMaster/Alert", "message": "Water Depth: {value}\\n"}},
+         {"name": "Daily status", "type": "daily", "at": "12:30", "action": {"call": "status"}}]
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import sys
+import time
+import json
+import collections
+
+import pubScribe
+
+
+RULES_FILE    = "alertRules.json"
+MISSING_VALUE = -99
+
+FIRE  = 1
+CLEAR = 2
+
+
+def valid(v) :
+    return isinstance(v, (int, float)) and not isinstance(v, bool) and v != MISSING_VALUE
+
+
+#
+# Sample rule: threshold, rate or disagree
+#
+class SampleRule :
+    def __init__(self, spec) :
+        self.spec = spec
+        self.name = spec.get("name", spec.get("type", "rule"))
+        self.topic = spec["topic"]
+        self.forSec = spec.get("forSec", 0)
+        self.minIntervalSec = spec.get("minIntervalSec", 0)
+        self.repeatSec = spec.get("repeatSec", 0)
+        hysteresis = spec.get("hysteresis", 0)
+
+        if "above" in spec :
+            level = spec["above"]
+            self.enter = lambda x : x > level
+            self.exit = lambda x : x < level - hysteresis
+            pick = max
+        elif "below" in spec :
+            level = spec["below"]
+            self.enter = lambda x : x < level
+            self.exit = lambda x : x > level + hysteresis
+            pick = min
+        else :
+            raise ValueError("Rule " + self.name + " needs above or below")
+
+        kind = spec.get("type", "threshold")
+        if kind == "threshold" :
+            fields = spec["field"] if isinstance(spec["field"], list) else [spec["field"]]
+            if len(fields) == 1 :
+                field = fields[0]
+                self.value = lambda tsec, data : data.get(field) if valid(data.get(field)) else None
+            else :
+                def value(tsec, data) :
+                    values = [data[f] for f in fields if valid(data.get(f))]
+                    return pick(values) if values else None
+                self.value = value
+
+        elif kind == "rate" :
+            field = spec["field"]
+            windowSec = spec.get("windowSec", 600)
+            history = collections.deque()        # (tsec, value) within windowSec
+            def value(tsec, data) :
+                v = data.get(field)
+                if not valid(v) :
+                    return None
+                history.append((tsec, v))
+                while tsec - history[0][0] > windowSec :
+                    history.popleft()
+                t0, v0 = history[0]
+                if tsec - t0 < windowSec / 2.0 :
+                    return None                  # not enough history yet
+                return (v - v0) * 3600.0 / (tsec - t0)
+            self.value = value
+
+        elif kind == "disagree" :
+            a, b = spec["fields"]
+            self.value = lambda tsec, data : abs(data[a] - data[b]) if valid(data.get(a)) and valid(data.get(b)) else None
+
+        else :
+            raise ValueError("Rule " + self.name + " has unknown type " + kind)
+
+        self.active = False
+        self.pendingSince = None
+        self.lastFired = None
+        self.lastValue = None
+
+    #
+    # Update with one sample, returns FIRE, CLEAR or None
+    #
+    def update(self, tsec, data) :
+        x = self.value(tsec, data)
+        if x is None :
+            return None
+        self.lastValue = x
+
+        if not self.active :
+            if self.enter(x) :
+                if self.pendingSince is None :
+                    self.pendingSince = tsec
+                if tsec - self.pendingSince >= self.forSec :
+                    self.active = True
+                    self.pendingSince = None
+                    if self.lastFired is None or tsec - self.lastFired >= self.minIntervalSec :
+                        self.lastFired = tsec
+                        return FIRE
+            else :
+                self.pendingSince = None
+
+        elif self.exit(x) :
+            self.active = False
+            return CLEAR
+
+        elif self.repeatSec and tsec - self.lastFired >= self.repeatSec :
+            self.lastFired = tsec
+            return FIRE
+
+        return None
+
+
+#
+# Daily rule, fires once a day at "HH:MM"
+#
+class DailyRule :
+    def __init__(self, spec, now=None) :
+        self.spec = spec
+        self.name = spec.get("name", "daily")
+        self.hh, self.mm = [int(s) for s in spec["at"].split(':')]
+        self.lastValue = None
+        self.nextTime = self.next(now if now is not None else time.time())
+
+    def next(self, after) :
+        t = time.localtime(after)
+        tNext = time.mktime((t.tm_year, t.tm_mon, t.tm_mday, self.hh, self.mm, 0, 0, 0, -1))
+        if tNext <= after :
+            t = time.localtime(after + 24*3600)
+            tNext = time.mktime((t.tm_year, t.tm_mon, t.tm_mday, self.hh, self.mm, 0, 0, 0, -1))
+        return tNext
+
+    def tick(self, now) :
+        if now < self.nextTime :
+            return None
+        self.nextTime = self.next(now)
+        return FIRE
+
+
+class RuleEngine :
+    def __init__(self, specs=(), now=None) :
+        self.byTopic = {}                # topic: [SampleRule, ...]
+        self.daily = []
+        self.actions = {}                # name: function(rule, event)
+        self.fired = 0
+        for spec in specs :
+            self.addRule(spec, now)
+
+    def addRule(self, spec, now=None) :
+        if not spec.get("enabled", True) :
+            return None
+        if spec.get("type") == "daily" :
+            rule = DailyRule(spec, now)
+            self.daily.append(rule)
+        else :
+            rule = SampleRule(spec)
+            self.byTopic.setdefault(rule.topic, []).append(rule)
+        return rule
+
+    #
+    # Register a function for {"call": name} actions, function(rule, tsec)
+    #
+    def addAction(self, name, function) :
+        self.actions[name] = function
+
+    #
+    # Update the rules of a topic with one sample
+    #
+    def evaluate(self, topic, tsec, data) :
+        for rule in self.byTopic.get(topic, ()) :
+            event = rule.update(tsec, data)
+            if event == FIRE :
+                self.run(rule, rule.spec.get("action"), tsec)
+            elif event == CLEAR :
+                self.run(rule, rule.spec.get("clearAction"), tsec)
+
+    #
+    # pubScribe subscriber, see pubScribe.subscribe()
+    #
+    def onRecord(self, topic, tsec, data, hdr="") :
+        if isinstance(data, dict) :
+            self.evaluate(topic, tsec, data)
+
+    #
+    # Time based rules, call about once a minute or more often
+    #
+    def tick(self, now=None) :
+        now = time.time() if now is None else now
+        for rule in self.daily :
+            if rule.tick(now) == FIRE :
+                self.run(rule, rule.spec.get("action"), now)
+
+    #
+    # Alert state of the sample rules by name, kept across restarts (see stateSnapshot.py)
+    #
+    def getState(self) :
+        return {rule.name : [rule.active, rule.pendingSince, rule.lastFired]
+                for rules in self.byTopic.values() for rule in rules}
+
+    def setState(self, state) :
+        for rules in self.byTopic.values() :
+            for rule in rules :
+                if rule.name in state :
+                    rule.active, rule.pendingSince, rule.lastFired = state[rule.name]
+
+    def run(self, rule, action, tsec) :
+        if not action :
+            return
+        self.fired += 1
+        if "call" in action :
+            if action["call"] not in self.actions :
+                print("Rule " + rule.name + " calls unknown action " + str(action["call"]))
+                return
+            self.actions[action["call"]](rule, tsec)
+        else :
+            fields = rule.spec.get("field", rule.spec.get("fields", ""))
+            msg = action.get("message", "{name}: {value}").format(
+                  name=rule.name, field=fields, value=rule.lastValue,
+                  time=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(tsec)))
+            pubScribe.pubRecord(action.get("dest", [pubScribe.EMAIL_SMS]), action.get("topic", "alert"), msg)
+
+
+#
+# Errors of one rule spec, [] when it can be used
+#   actions: names allowed in {"call": name} actions
+#
+def checkRule(spec, actions=()) :
+    if not isinstance(spec, dict) :
+        return ["expected an object"]
+    if not spec.get("enabled", True) :
+        return []
+
+    try :
+        rule = DailyRule(spec) if spec.get("type") == "daily" else SampleRule(spec)
+    except (ValueError, KeyError, TypeError, IndexError, AttributeError) as e :
+        return ["{}: {}".format(type(e).__name__, e)]
+
+    errors = []
+    for key in ("action", "clearAction") :
+        action = spec.get(key)
+        if action is None :
+            continue
+        if not isinstance(action, dict) :
+            errors.append(key + " is not an object")
+        elif "call" in action :
+            if action["call"] not in actions :
+                errors.append("{} calls unknown action {}".format(key, action["call"]))
+        else :
+            try :
+                action.get("message", "{name}: {value}").format(name=rule.name, field="", value=0.0, time="")
+            except (ValueError, KeyError, IndexError, AttributeError) as e :
+                errors.append("{} message: {}".format(key, e))
+    return errors
+
+
+#
+# Read rules from a JSON file, the file is created from defaults if it does not exist.
+# Returns the rules that pass checkRule(), or None when the file is not a JSON list.
+#
+def loadRules(filename=RULES_FILE, defaults=(), actions=()) :
+    try :
+        with open(filename, 'r') as f :
+            specs = json.load(f)
+    except IOError :
+        with open(filename, 'w') as f :
+            json.dump(list(defaults), f, indent=2)
+        specs = list(defaults)
+    except ValueError as e :
+        print("{} not loaded: {}".format(filename, e))
+        return None
+
+    if not isinstance(specs, list) :
+        print("{} not loaded: expected a list of rules".format(filename))
+        return None
+
+    good = []
+    for i, spec in enumerate(specs) :
+        errors = checkRule(spec, actions)
+        if errors :
+            name = spec.get("name", "") if isinstance(spec, dict) else ""
+            print("{} rule {} {} skipped: {}".format(filename, i + 1, name, "; ".join(errors)))
+        else :
+            good.append(spec)
+    return good
+
+
+#
+# Test / debug, rule evaluation cost per sample
+#
+if __name__ == '__main__':
+
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    fired = []
+
+    specs = []
+    for i in range(50) :
+        specs.append({"name": "High {}".format(i), "type": "threshold", "topic": "basinMaster/WaterDepth",
+                      "field": ["Ultrasonic (in)", "ABP (in)"], "above": 5 + i * 0.1, "hysteresis": 0.5, "forSec": 120,
+                      "action": {"call": "log"}})
+    specs.append({"name": "Rising fast", "type": "rate", "topic": "basinMaster/WaterDepth", "field": "ABP (in)",
+                  "windowSec": 600, "above": 3.0, "action": {"call": "log"}})
+    specs.append({"name": "Sensors disagree", "type": "disagree", "topic": "basinMaster/WaterDepth",
+                  "fields": ["Ultrasonic (in)", "ABP (in)"], "above": 2.0, "forSec": 600, "action": {"call": "log"}})
+
+    engine = RuleEngine(specs)
+    engine.addAction("log", lambda rule, tsec : fired.append(rule.name))
+
+    depth = 3.0
+    t0 = time.time()
+    for i in range(samples) :
+        depth = depth + 0.01 if depth < 10 else 3.0
+        engine.evaluate("basinMaster/WaterDepth", 1.6e9 + 60 * i, {"Ultrasonic (in)": depth, "ABP (in)": depth + 0.05})
+    elapsed = time.time() - t0
+    print("{} rules, {:.1f} us per sample, {} actions".format(len(specs), elapsed / samples * 1e6, len(fired)))
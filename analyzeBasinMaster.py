@@ -0,0 +1,416 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+  2026/10/19  BrucesHobbies   Analyze logs written only as swinging door breakpoints
+
+
+OVERVIEW:
+    Historical analytics over basinMaster water depth logs, e.g. years of
+    basinMaster_WaterDepth.csv and its rotated segments.
+
+    Each file is split into byte ranges of ANALYZE_RANGE_BYTES that are
+    processed by a pool of worker processes. A worker parses its range in
+    chunks with the plotBasinMaster csv parser, keeping only the time and
+    depth columns, and reduces every chunk with numpy to per hour sums:
+        samples, sum, min, max            of the depth
+        seconds above --threshold         time weighted between samples
+        pump cycles                       start of a drop of more than PUMP_DROP_IN
+        fill inches, fill seconds         net rise between samples that are not pump drops
+    A range also reads one line before and after it, so pairs of samples
+    spanning ranges are counted exactly once. Gaps longer than
+    ANALYZE_MAX_GAP_SEC are not counted as time above or fill.
+    A topic written only as swinging door breakpoints (<topic>_sdt.csv) is
+    rebuilt as regular samples with pubCompress, one job per file.
+
+    The hourly sums are merged and written as tables:
+        <outdir>/<topic>_daily.csv     per local day: min, mean, max, hours above,
+                                       pump cycles, inflow and mean fill rate
+        <outdir>/<topic>_storms.csv    runs of hours with fill rate of at least
+                                       --storm in/hr: start, end, peak and mean
+                                       rate, inflow and pump cycles
+
+    Usage:
+        python3 analyzeBasinMaster.py [files or directories] [--field "ABP (in)"]
+            [--threshold 6] [--storm 1.0] [--window "2024-01-01,2026-01-01"]
+            [--processes 4] [--outdir reports]
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import time
+import glob
+import argparse
+import multiprocessing
+
+import numpy as np
+
+import plotBasinMaster
+import pumpCycles
+import pubCompress
+
+
+ANALYZE_TOPIC       = "basinMaster_WaterDepth"
+ANALYZE_FIELD       = "ABP (in)"
+ANALYZE_THRESHOLD   = 6.0          # inches, hours above this depth are reported
+ANALYZE_STORM_RATE  = 1.0          # inches/hour of fill rate that counts as a storm hour
+ANALYZE_MAX_GAP_SEC = 900          # longer gaps between samples are logging outages
+ANALYZE_RANGE_BYTES = 16 << 20     # bytes of csv per worker job
+
+# columns of the hourly statistics
+SAMPLES, SUM, MIN, MAX, ABOVE_SEC, PUMP_STARTS, FILL_IN, FILL_SEC = range(8)
+NSTATS = 8
+
+
+#
+# Per hour reduction of time sorted arrays.
+#   columns: {stat column: values}, summed per hour except MIN and MAX
+#   Returns (hours, stats) with stats NaN where a column was not given
+#
+def binHours(t, columns) :
+    stats = np.full((0, NSTATS), np.nan)
+    if not len(t) :
+        return np.empty(0), stats
+
+    hours = np.floor(t / 3600.0)
+    starts = np.flatnonzero(np.r_[True, hours[1:] != hours[:-1]])
+    stats = np.full((len(starts), NSTATS), np.nan)
+    for col, values in columns.items() :
+        if col == MIN :
+            stats[:, col] = np.fmin.reduceat(values, starts)
+        elif col == MAX :
+            stats[:, col] = np.fmax.reduceat(values, starts)
+        else :
+            stats[:, col] = np.add.reduceat(values, starts)
+    return hours[starts], stats
+
+
+#
+# Merge (hours, stats) partial results into one sorted table
+#
+def mergeHours(partials) :
+    partials = [p for p in partials if len(p[0])]
+    if not partials :
+        return np.empty(0), np.full((0, NSTATS), np.nan)
+
+    hours = np.concatenate([p[0] for p in partials])
+    stats = np.concatenate([p[1] for p in partials])
+    uHours, inverse = np.unique(hours, return_inverse=True)
+
+    merged = np.full((len(uHours), NSTATS), np.nan)
+    for col in range(NSTATS) :
+        values = stats[:, col]
+        if col == MIN :
+            np.fmin.at(merged[:, col], inverse, values)
+        elif col == MAX :
+            np.fmax.at(merged[:, col], inverse, values)
+        else :
+            out = np.zeros(len(uHours))
+            np.add.at(out, inverse, np.nan_to_num(values))
+            merged[:, col] = out
+    return uHours, merged
+
+
+#
+# Samples: count, sum, min and max of the depth per hour
+#
+def sampleStats(t, v) :
+    valid = np.isfinite(v)
+    return binHours(t[valid], {SAMPLES: np.ones(valid.sum()), SUM: v[valid], MIN: v[valid], MAX: v[valid]})
+
+
+#
+# Pairs of consecutive samples (i, i+1) for i >= p0: time above threshold,
+# pump starts and fill, binned by the hour of sample i
+#
+def pairStats(t, v, p0, threshold, dropIn) :
+    if len(t) - 1 <= p0 :
+        return np.empty(0), np.full((0, NSTATS), np.nan)
+
+    i = np.arange(p0, len(t) - 1)
+    dt = t[i+1] - t[i]
+    d = v[i+1] - v[i]
+    ok = (dt > 0) & (dt <= ANALYZE_MAX_GAP_SEC) & np.isfinite(d)
+
+    drop = ok & (d < -dropIn)
+    prevD = np.where(i >= 1, v[i] - v[np.maximum(i - 1, 0)], np.nan)
+    start = drop & ~(prevD < -dropIn)
+    fill = ok & ~drop
+
+    return binHours(t[i], {ABOVE_SEC: np.where(ok & (v[i] > threshold), dt, 0.0),
+                           PUMP_STARTS: start.astype(np.float64),
+                           FILL_IN: np.where(fill, d, 0.0),
+                           FILL_SEC: np.where(fill, dt, 0.0)})
+
+
+#
+# Lines of a byte range, a line belongs to the range holding its first byte.
+#   Returns (line before the range or None, lines, line after the range or None)
+#
+def readRange(filename, start, end) :
+    with open(filename, 'rb') as f :
+        f.readline()                                   # header
+        dataStart = f.tell()
+
+        before = None
+        if start <= dataStart :
+            start = dataStart
+        else :
+            f.seek(start - 1)
+            if f.read(1) != b'\n' :
+                f.readline()                           # line belongs to the previous range
+                start = f.tell()
+            f.seek(max(start - 4096, dataStart))
+            prev = f.read(start - f.tell()).rstrip(b'\n').rsplit(b'\n', 1)
+            before = prev[-1] if prev[-1] else None
+
+        f.seek(start)
+        data = f.read(max(end - start, 0))
+        if data and not data.endswith(b'\n') :
+            data += f.readline()
+        after = f.readline() or None
+
+    return before, data.decode('utf-8', 'replace').splitlines(), after
+
+
+#
+# Worker: hourly statistics of one byte range of one file.
+#   job is (filename, column index, start, end, tStart, tEnd, threshold, dropIn)
+#
+def analyzeRange(job) :
+    filename, col, start, end, tStart, tEnd, threshold, dropIn = job
+    if pubCompress.isSdtFilename(filename) :
+        return analyzeBreakpoints(job)
+
+    before, lines, after = readRange(filename, start, end)
+
+    def parse(lines) :
+        lines = [line for line in lines if line.strip()]
+        if not lines :
+            return np.empty(0), np.empty(0)
+        arr = plotBasinMaster.parseCsvLines(lines, [0, col])
+        t, v = arr[:, 0], arr[:, 1]
+        v[v == plotBasinMaster.MISSING_VALUE] = np.nan
+        keep = np.isfinite(t)
+        if tStart is not None :
+            keep &= t >= tStart
+        if tEnd is not None :
+            keep &= t <= tEnd
+        return t[keep], v[keep]
+
+    # carry the last two rows between chunks, the pair from the last row
+    # is counted with the next chunk and the row before it tells if that
+    # pair continues a pump drop
+    partials = []
+    carryT, carryV = parse([before.decode('utf-8', 'replace')] if before else [])
+    lastOwn = False                                    # last carried row belongs to this range
+    rows = 0
+
+    for i in range(0, len(lines), plotBasinMaster.CSV_CHUNK_ROWS) :
+        t, v = parse(lines[i : i + plotBasinMaster.CSV_CHUNK_ROWS])
+        if not len(t) :
+            continue
+        rows += len(t)
+        partials.append(sampleStats(t, v))
+
+        p0 = len(carryT) - 1 if lastOwn else len(carryT)
+        t = np.concatenate([carryT, t])
+        v = np.concatenate([carryV, v])
+        partials.append(pairStats(t, v, p0, threshold, dropIn))
+        carryT, carryV = t[-2:], v[-2:]
+        lastOwn = True
+
+    # pair from the last row of the range to the first row after it
+    t, v = parse([after.decode('utf-8', 'replace')] if after else [])
+    if lastOwn and len(t) :
+        partials.append(pairStats(np.concatenate([carryT, t]), np.concatenate([carryV, v]), len(carryT) - 1, threshold, dropIn))
+
+    hours, stats = mergeHours(partials)
+    return hours, stats, rows
+
+
+#
+# Job for a swinging door breakpoint file, the whole file is rebuilt as
+#   regular samples (pubCompress.expandFile) and reduced in one pass
+#
+def analyzeBreakpoints(job) :
+    filename, col, start, end, tStart, tEnd, threshold, dropIn = job
+    names, times, values = pubCompress.expandFile(filename, tStart=tStart, tEnd=tEnd)
+    t = np.array(times, dtype=np.float64)
+    v = np.array([x if pubCompress.isNumber(x) else np.nan for x in values[names[col - 2]]], dtype=np.float64)
+
+    hours, stats = mergeHours([sampleStats(t, v), pairStats(t, v, 0, threshold, dropIn)])
+    return hours, stats, len(t)
+
+
+#
+# Files to analyze, directories are searched for the topic log and its rotated segments
+#
+def findLogs(paths, topic=ANALYZE_TOPIC) :
+    result = []
+    for path in paths :
+        if os.path.isdir(path) :
+            files = glob.glob(os.path.join(path, topic + ".csv")) + glob.glob(os.path.join(path, topic + ".*.csv"))
+            if not files :
+                # written only as swinging door breakpoints (pubScribe COMPRESS_ONLY)
+                sdt = topic + pubCompress.COMPRESS_SUFFIX
+                files = glob.glob(os.path.join(path, sdt + ".csv")) + glob.glob(os.path.join(path, sdt + ".*.csv"))
+            result += sorted(files)
+        else :
+            result.append(path)
+    return result
+
+
+#
+# Byte range jobs for every file, limited to the time window
+#
+def makeJobs(files, field, tStart, tEnd, threshold, dropIn, rangeBytes=ANALYZE_RANGE_BYTES) :
+    jobs = []
+    for filename in files :
+        with open(filename, 'r') as f :
+            hdr = plotBasinMaster.readCsvHeader(f)
+        if field not in hdr[2:] :
+            print("No column " + field + " in " + filename)
+            continue
+        col = hdr.index(field)
+
+        if pubCompress.isSdtFilename(filename) :
+            jobs.append((filename, col, 0, 0, tStart, tEnd, threshold, dropIn))
+            continue
+
+        size = os.path.getsize(filename)
+        start = plotBasinMaster.seekTime(filename, tStart) if tStart is not None else 0
+        end = size
+        if tEnd is not None :
+            end = min(plotBasinMaster.seekTime(filename, tEnd) + 4096 * 2, size)
+        for pos in range(start, end, rangeBytes) :
+            jobs.append((filename, col, pos, min(pos + rangeBytes, end), tStart, tEnd, threshold, dropIn))
+    return jobs
+
+
+#
+# Local date of each hour, one localtime() call per distinct hour
+#
+def hourDates(hours) :
+    return np.array([time.strftime('%Y-%m-%d', time.localtime(h * 3600.0)) for h in hours])
+
+
+def dailyTable(hours, stats) :
+    dates = hourDates(hours)
+    rows = []
+    for date in np.unique(dates) :
+        s = stats[dates == date]
+        n = s[:, SAMPLES].sum()
+        fillSec = s[:, FILL_SEC].sum()
+        rows.append([date, int(n),
+                     np.nanmin(s[:, MIN]) if n else np.nan,
+                     s[:, SUM].sum() / n if n else np.nan,
+                     np.nanmax(s[:, MAX]) if n else np.nan,
+                     s[:, ABOVE_SEC].sum() / 3600.0,
+                     int(s[:, PUMP_STARTS].sum()),
+                     s[:, FILL_IN].sum(),
+                     s[:, FILL_IN].sum() / fillSec * 3600.0 if fillSec else np.nan])
+    return ["Date", "Samples", "Min (in)", "Mean (in)", "Max (in)", "Hours above", "Pump cycles", "Inflow (in)", "Fill rate (in/hr)"], rows
+
+
+#
+# Storms: runs of consecutive hours with a fill rate of at least stormRate
+#
+def stormTable(hours, stats, stormRate) :
+    rate = np.where(stats[:, FILL_SEC] >= 1800, stats[:, FILL_IN] / np.maximum(stats[:, FILL_SEC], 1) * 3600.0, np.nan)
+    wet = rate >= stormRate
+    rows = []
+    i = 0
+    while i < len(hours) :
+        if not wet[i] :
+            i += 1
+            continue
+        j = i
+        while j + 1 < len(hours) and wet[j + 1] and hours[j + 1] == hours[j] + 1 :
+            j += 1
+        s = stats[i : j + 1]
+        rows.append([time.strftime('%Y-%m-%d %H:%M', time.localtime(hours[i] * 3600.0)),
+                     time.strftime('%Y-%m-%d %H:%M', time.localtime((hours[j] + 1) * 3600.0)),
+                     j - i + 1, np.nanmax(rate[i : j + 1]), s[:, FILL_IN].sum() / s[:, FILL_SEC].sum() * 3600.0,
+                     s[:, FILL_IN].sum(), int(s[:, PUMP_STARTS].sum())])
+        i = j + 1
+    return ["Start", "End", "Hours", "Peak rate (in/hr)", "Mean rate (in/hr)", "Inflow (in)", "Pump cycles"], rows
+
+
+def writeTable(filename, header, rows) :
+    with open(filename, 'w') as f :
+        f.write(",".join(header) + "\n")
+        for row in rows :
+            f.write(",".join("{:.2f}".format(v) if isinstance(v, (float, np.floating)) else str(v) for v in row) + "\n")
+
+
+#
+# Analyze files in a process pool, returns (hours, stats, rows)
+#
+def analyze(files, field=ANALYZE_FIELD, tStart=None, tEnd=None, threshold=ANALYZE_THRESHOLD,
+            dropIn=pumpCycles.PUMP_DROP_IN, processes=None, rangeBytes=ANALYZE_RANGE_BYTES) :
+    jobs = makeJobs(files, field, tStart, tEnd, threshold, dropIn, rangeBytes)
+    if processes == 1 :
+        results = [analyzeRange(job) for job in jobs]
+    else :
+        with multiprocessing.Pool(processes) as pool :
+            results = pool.map(analyzeRange, jobs)
+    hours, stats = mergeHours([(h, s) for h, s, n in results])
+    return hours, stats, sum(n for h, s, n in results), len(jobs)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Daily and storm statistics from basinMaster depth logs")
+    parser.add_argument("paths", nargs="*", default=["."], help="csv files or directories")
+    parser.add_argument("--topic", default=ANALYZE_TOPIC, help="topic log name searched for in directories")
+    parser.add_argument("--field", default=ANALYZE_FIELD, help="depth column")
+    parser.add_argument("--threshold", type=float, default=ANALYZE_THRESHOLD, help="inches, report hours above")
+    parser.add_argument("--storm", type=float, default=ANALYZE_STORM_RATE, help="in/hr fill rate of a storm hour")
+    parser.add_argument("--window", default=None, help="time window START,END as YYYY-mm-dd[ HH:MM]")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes, default all cores")
+    parser.add_argument("--outdir", default=".", help="output directory for the tables")
+    args = parser.parse_args()
+
+    tStart, tEnd = plotBasinMaster.parseWindow(args.window) if args.window else (None, None)
+    files = findLogs(args.paths, args.topic)
+
+    t0 = time.time()
+    hours, stats, rows, nJobs = analyze(files, args.field, tStart, tEnd, args.threshold, processes=args.processes)
+    elapsed = time.time() - t0
+
+    os.makedirs(args.outdir, exist_ok=True)
+    daily = dailyTable(hours, stats)
+    storms = stormTable(hours, stats, args.storm)
+    writeTable(os.path.join(args.outdir, args.topic + "_daily.csv"), *daily)
+    writeTable(os.path.join(args.outdir, args.topic + "_storms.csv"), *storms)
+
+    print("{} files, {} rows in {} jobs, {:.1f} s, {:.0f} rows/s".format(len(files), rows, nJobs, elapsed, rows / max(elapsed, 1e-9)))
+    print("{} days, {:.1f} hours above {} in, {} pump cycles, {} storms".format(
+          len(daily[1]), stats[:, ABOVE_SEC].sum() / 3600.0, args.threshold, int(stats[:, PUMP_STARTS].sum()), len(storms[1])))
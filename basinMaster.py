@@ -10,6 +10,22 @@ REVISION HISTORY
   DATE        AUTHOR          CHANGES
   yyyy/mm/dd  --------------- -------------------------------------
   2021/02/10  BrucesHobbies   added pubScribe.py
+  2026/10/19  BrucesHobbies   Status message includes 24 hour rollup summary
+  2026/10/19  BrucesHobbies   Water depth also published to SQLITE destination
+  2026/10/19  BrucesHobbies   Status message reports outbox backlog
+  2026/10/19  BrucesHobbies   Each measurement written to a shared memory ring buffer (pubRing.py)
+  2026/10/19  BrucesHobbies   Alerts and status messages from rules in alertRules.json (alertRules.py)
+  2026/10/19  BrucesHobbies   Sump pump cycle events and anomaly alerts (pumpCycles.py)
+  2026/10/19  BrucesHobbies   Separate sampler and publisher processes (procSplit.py)
+  2026/10/19  BrucesHobbies   Settings in basinMasterCfg.json applied while running (runtimeConfig.py)
+  2026/10/19  BrucesHobbies   Readings, log baseline and alert state kept across restarts (stateSnapshot.py)
+  2026/10/19  BrucesHobbies   HTTP query service for logged history (pubHttp.py)
+  2026/10/19  BrucesHobbies   High water fast path and priority lane for alerts (highWater.py)
+  2026/10/19  BrucesHobbies   Pressure sensor reads with a deadline, systemd watchdog (sensorBus.py, sdNotify.py)
+  2026/10/19  BrucesHobbies   Fast path level follows the depth alert rule in ALERT_RULES_FILE
+  2026/10/19  BrucesHobbies   Email settings prompted for before the processes are split
+  2026/10/19  BrucesHobbies   State restore reads the swinging door log when only that is written
+  2026/10/19  BrucesHobbies   Open rollup buckets kept in the state snapshot
 
 
 OVERVIEW:
@@ -55,10 +71,17 @@ LICENSE:
 import sys
 import os
 import time
-import datetime
 import math
 
 import pubScribe
+import alertRules
+import pumpCycles
+import procSplit
+import runtimeConfig
+import stateSnapshot
+import pubCompress
+import highWater
+import sdNotify
 
 
 #
@@ -83,6 +106,16 @@ US_GAUGE_DELTA_LOG  = 0.5
 ABP_GAUGE_DELTA_LOG = 0.5
 depthGaugeLogAll    = 1     # ignore delta log params and log all measurements
 
+# shared memory ring buffer of the latest measurements for local readers, see pubRing.py
+RING_ENABLED = 1
+
+# pump start/stop, fill rate and cycle period topics from the depth, see pumpCycles.py
+PUMP_CYCLES_ENABLED = 1
+
+# Sensors and pump run in their own high priority process, publishing in another, see procSplit.py
+SPLIT_PROCESSES = 1
+SAMPLER_CPU     = None      # CPU core for the sampler process, e.g. 3, None for any
+
 measTime    = 60            # Seconds between water depth measurements
 pumpOnTime  = 5             # Seconds to run pump for ABP
 pumpOffTime = 5             # Seconds to wait after running pump before reading pressure
@@ -105,10 +138,52 @@ WATER_DEPTH_ALERT         = 9               # Send alert when water depth greate
 WATER_DEPTH_ALERT_ENABLE  = 1               # Enable sending alerts
 minIntervalBtwWaterEmails = 24*3600         # seconds
 
+# High water fast path, a measurement starts at once instead of at the end of the cycle (see highWater.py)
+HIGH_WATER_ENABLED   = 1
+HIGH_WATER_SPOT_SEC  = 5                    # seconds between unpumped spot reads, 0 for none
+HIGH_WATER_MARGIN    = 0.5                  # inches below the depth alert rule at which a spot read starts a measurement
+HIGH_WATER_FLOAT_PIN = None                 # BCM pin of an optional float switch closing to ground, None when not fitted
+
+SENSOR_ALERT_INTERVAL = 24*3600             # seconds between alerts for a pressure sensor bus that stopped responding
+
+# Alert rules are read from this file. On first start it is created from the
+# settings above, edit the file afterwards to change or add rules (see alertRules.py)
+ALERT_RULES_FILE = "alertRules.json"
+
+# Settings are read from this file and applied while running when it is saved.
+# On first start it is created from the settings in this file (see runtimeConfig.py)
+CONFIG_FILE = "basinMasterCfg.json"
+
+# Last readings, delta log baseline and alert throttling are kept in this
+# directory across restarts (see stateSnapshot.py)
+STATE_DIR         = "state"
+STATE_MAX_AGE_SEC = 3600    # older readings are recovered from the end of the csv log instead
+
+# History queries over HTTP, e.g. http://<RPi address>:8080/query?topic=basinMaster/WaterDepth&start=-7d
+HTTP_ENABLED = 1
+HTTP_PORT    = 8080
+
 #
 # === END USER CONFIGURATION ===
 #
 
+# Settings that may be changed in CONFIG_FILE while running
+CONFIG_SCHEMA = {
+    "US_MEAS_AVERAGING":   (int, 1, 100),
+    "US_WELL_DEPTH":       (runtimeConfig.NUMBER, 1, 240),
+    "ABP_SENSOR":          (str, None, None, r"^\d{3}[MBKGP][DG][S1-7]$"),
+    "depthGaugeLogEnable": (int, 0, 1),
+    "US_GAUGE_DELTA_LOG":  (runtimeConfig.NUMBER, 0, 100),
+    "ABP_GAUGE_DELTA_LOG": (runtimeConfig.NUMBER, 0, 100),
+    "depthGaugeLogAll":    (int, 0, 1),
+    "measTime":            (runtimeConfig.NUMBER, 1, 24*3600),
+    "pumpOnTime":          (runtimeConfig.NUMBER, 0, 600),
+    "pumpOffTime":         (runtimeConfig.NUMBER, 0, 600),
+    "PUMP_ON":             (bool, None, None),
+    "HIGH_WATER_SPOT_SEC": (runtimeConfig.NUMBER, 0, 3600),
+    "HIGH_WATER_MARGIN":   (runtimeConfig.NUMBER, 0, 100),
+}
+
 
 if ENABLE_HC_SR04 or ENABLE_HNY_ABP:
     # Needed in both cases for gpio functions
@@ -117,10 +192,18 @@ if ENABLE_HC_SR04 or ENABLE_HNY_ABP:
 if ENABLE_HNY_ABP :
     import sensorHnyAbp
 
+if RING_ENABLED :
+    import pubRing
+
+if HTTP_ENABLED :
+    import pubHttp
+
 
 abp = []
 
 measCnt    = 0            # updated in timer loop
+measCycleCnt = 0          # Calculated during initialization, measCnt at the start of each cycle
+gaugeInterval = None      # tInterval given to gaugeInit
 
 pumpOnCnt  = 0            # Calculated during initialization
 pumpOffCnt = 0            # Calculated during initialization
@@ -139,14 +222,49 @@ last_abp_log = -99.0
 
 us_meas = []              # Ultrasonic measurements for averaging
 
+ring = None               # pubRing.RingWriter when RING_ENABLED
+
+highWaterTrigger = None   # highWater.HighWaterTrigger when HIGH_WATER_ENABLED
+urgent = None             # (trigger UNIX time, reason) of the measurement under way
+
 
 #
 # Initial range and depth sensors
 #
 def gaugeInit(tInterval) : 
-    global abp, measCnt, pumpOnCnt, pumpOffCnt
+    global abp, measCnt, gaugeInterval, ring, highWaterTrigger
+
+    gaugeInterval = tInterval
+    gaugeTimings(tInterval)
+    measCnt = measCycleCnt
+
+    if ENABLE_HC_SR04 or ENABLE_HNY_ABP:
+        hc_sr04_range.sensorInit()            # Needed in both cases for gpio functions
 
-    measCnt = int(measTime/tInterval) - 1
+    if ENABLE_HNY_ABP :
+        print("Water depth pressure sensor:")
+        abp = sensorHnyAbp.SensorHnyAbp(ABP_SENSOR)
+
+    if RING_ENABLED :
+        ring = pubRing.RingWriter(["Ultrasonic (in)", "ABP (in)"])
+
+    if HIGH_WATER_ENABLED :
+        if rules is None :                    # else loadRules has set alertDepth in this process
+            loadAlertDepth()
+        highWaterTrigger = highWater.HighWaterTrigger(highWaterLevel(),
+                                                      spotRead if HIGH_WATER_SPOT_SEC else None,
+                                                      HIGH_WATER_SPOT_SEC, HIGH_WATER_FLOAT_PIN)
+
+    return
+
+
+#
+# Measurement cycle and pump counts from measTime, pumpOnTime and pumpOffTime
+#
+def gaugeTimings(tInterval) :
+    global measCnt, measCycleCnt, pumpOnCnt, pumpOffCnt
+
+    cycleCnt = int(measTime/tInterval) - 1
 
     pumpOffCnt = int(pumpOffTime/tInterval)
     if pumpOffTime % tInterval :
@@ -164,20 +282,39 @@ def gaugeInit(tInterval) :
     if pumpOnTime % tInterval :
         pumpOnCnt += 1
 
-    if measCnt < pumpOnCnt :
-        measCnt = pumpOnCnt
+    if cycleCnt < pumpOnCnt :
+        cycleCnt = pumpOnCnt
 
-    if measCnt <= US_MEAS_AVERAGING :
-        measCnt = US_MEAS_AVERAGING + 1
+    if cycleCnt <= US_MEAS_AVERAGING :
+        cycleCnt = US_MEAS_AVERAGING + 1
 
-    if ENABLE_HC_SR04 or ENABLE_HNY_ABP:
-        hc_sr04_range.sensorInit()            # Needed in both cases for gpio functions
+    measCycleCnt = cycleCnt
+    measCnt = min(measCnt, measCycleCnt)      # a shorter cycle takes effect in the current cycle
 
-    if ENABLE_HNY_ABP :
+    return
+
+
+#
+# Settings changed in CONFIG_FILE, see runtimeConfig.py
+#
+def reconfigure(changed) :
+    global abp
+
+    if gaugeInterval is None :                # sensors are read in another process
+        return
+
+    if "ABP_SENSOR" in changed and ENABLE_HNY_ABP :
+        abp.close()                           # close the bus before it is opened again
         print("Water depth pressure sensor:")
         abp = sensorHnyAbp.SensorHnyAbp(ABP_SENSOR)
 
-    return
+    if changed & {"measTime", "pumpOnTime", "pumpOffTime", "US_MEAS_AVERAGING"} :
+        gaugeTimings(gaugeInterval)
+
+    if highWaterTrigger :
+        highWaterTrigger.level = highWaterLevel()
+        highWaterTrigger.spotSec = HIGH_WATER_SPOT_SEC
+        highWaterTrigger.spotRead = spotRead if HIGH_WATER_SPOT_SEC else None
 
 
 #
@@ -187,17 +324,87 @@ def gaugeClose() :
     if ENABLE_HC_SR04 or ENABLE_HNY_ABP :
         hc_sr04_range.sensorClose()           # Close gpio functions
 
+    if ring :
+        ring.close()
+
+    if ENABLE_HNY_ABP and abp :
+        abp.close()
+
+
+#
+# One reading without running the pump, for the high water fast path
+#
+def spotRead() :
+    if ENABLE_HNY_ABP :
+        status, result, tempC = abp.readAbpStatusTemp()
+        return round(abp.pres2inwc(result), 2) if status == 0 else -99
+
+    dist = hc_sr04_range.sensorRead()
+    return round(US_WELL_DEPTH - dist, 2) if dist else -99
+
+
+#
+# Fast path level follows the alert rules: the lowest "above" of the enabled
+#   threshold rules on the water depth, less HIGH_WATER_MARGIN. The sampler
+#   reads ALERT_RULES_FILE itself when the rules run in another process.
+#
+alertDepth = WATER_DEPTH_ALERT      # None when no rule alerts on high water
+
+def highWaterLevel() :
+    return alertDepth - HIGH_WATER_MARGIN if alertDepth is not None else None
+
+
+def setAlertDepth(specs) :
+    global alertDepth
+
+    levels = [spec["above"] for spec in specs
+              if spec.get("enabled", True) and spec.get("type", "threshold") == "threshold"
+              and spec.get("topic") == "basinMaster/WaterDepth" and "above" in spec]
+    depth = min(levels) if levels else None
+    if depth != alertDepth :
+        print("High water fast path level: " + ("{} in".format(depth - HIGH_WATER_MARGIN) if levels else "no depth alert rule"))
+    alertDepth = depth
+
+    if highWaterTrigger :
+        highWaterTrigger.level = highWaterLevel()
+
+
+def loadAlertDepth() :
+    specs = alertRules.loadRules(ALERT_RULES_FILE, defaultRules(), actions=["status"])
+    if specs is not None :                    # else the level of the running rules is kept
+        setAlertDepth(specs)
+
+
+#
+# Start a full measurement now when the fast path triggers, see highWater.py
+#
+def highWaterCheck() :
+    global measCnt, urgent
+
+    if highWaterTrigger is None or urgent :
+        return
+
+    # spot reads only while the pump is off and no readings are being taken
+    trigger = highWaterTrigger.check(spotAllowed=measCnt > max(pumpOnCnt, US_MEAS_AVERAGING))
+    if trigger :
+        print("High water {}, measuring now".format(trigger[1]))
+        urgent = trigger
+        measCnt = min(measCnt, pumpOnCnt if ENABLE_HNY_ABP else 1)
+
 
 #
 # Read water depth sensors
+#   Returns ultrasonic and ABP depth, -99 when not measured, and the
+#   (trigger UNIX time, reason) of a high water measurement or None
 #
 def gaugeRead(tInterval) :
     global last_us_result, last_us_t, last_abp_result, last_abp_t
-    global measCnt, us_meas
+    global measCnt, us_meas, urgent
     global last_us_log, last_abp_log
 
     us_result = -99
     abp_result = -99
+    trigger = None
 
     csv_str = ""
     deltaLogResult = 0
@@ -219,9 +426,19 @@ def gaugeRead(tInterval) :
         measCnt -= 1
 
     else :
-        measCnt = int(measTime/tInterval) - 1
+        measCnt = measCycleCnt
         t = time.localtime()
-        
+        trigger, urgent = urgent, None
+
+        if ENABLE_HC_SR04 and trigger :
+            # a high water measurement does not wait for the full series
+            for i in range(2 * US_MEAS_AVERAGING) :
+                if len(us_meas) >= US_MEAS_AVERAGING :
+                    break
+                dist = hc_sr04_range.sensorRead()
+                if dist :
+                    us_meas.append(dist)
+
         if ENABLE_HC_SR04 :
             # Average ultrasonic measurements
             cnt = len(us_meas)
@@ -259,12 +476,35 @@ def gaugeRead(tInterval) :
             else :
                print("Water depth pressure sensor fault...")
 
+        if ring :
+            ring.write(time.time(), [us_result, abp_result])
+
         if (depthGaugeLogEnable and (deltaLogResult or depthGaugeLogAll)) :
             topic = "basinMaster/WaterDepth"
             data = {"Ultrasonic (in)": round(us_result,2), "ABP (in)": round(abp_result,2)}
-            pubScribe.pubRecord(pubScribe.CSV_FILE, topic, data)
+            pubScribe.pubRecord([pubScribe.CSV_FILE, pubScribe.SQLITE], topic, data)
 
-    return us_result, abp_result
+    return us_result, abp_result, trigger
+
+
+#
+# Alert when the pressure sensor bus stops responding, reads are then
+# skipped until the bus is reopened, see sensorBus.py
+#
+abpDegraded = False
+lastSensorAlert = 0
+
+def sensorHealth() :
+    global abpDegraded, lastSensorAlert
+
+    if not ENABLE_HNY_ABP or abp.executor.degraded == abpDegraded :
+        return
+
+    abpDegraded = abp.executor.degraded
+    if abpDegraded and time.time() - lastSensorAlert > SENSOR_ALERT_INTERVAL :
+        lastSensorAlert = time.time()
+        topic = "basinMaster/Sensor/Alert"
+        pubScribe.pubRecord(pubScribe.EMAIL_SMS, topic, "Pressure sensor bus not responding, ultrasonic depth continues\n")
 
 
 #
@@ -285,68 +525,354 @@ def sendStatus() :
     s = s + time.strftime("%a, %d %b %Y %H:%M:%S ", last_abp_t)
     s = s + "ABP: {: 6.2f}\n".format(last_abp_result)
 
+    if pubScribe.ROLLUP_ENABLED :
+        tEnd = time.time()
+        summary = pubScribe.pubRollup.summarize("basinMaster/WaterDepth", tEnd - 24*3600, tEnd)
+        if summary :
+            s = s + "Last 24 hours:\n"
+        for field, stats in summary.items() :
+            s = s + "{} min {: 6.2f} max {: 6.2f} mean {: 6.2f}\n".format(field, stats["min"], stats["max"], stats["mean"])
+
+    for dest, stats in pubScribe.outboxStats().items() :
+        if stats["pending"] or stats["dropped"] :
+            s = s + "{} outbox: {} pending, lag {:.0f} s, {} dropped\n".format(dest, stats["pending"], stats["lagSec"], stats["dropped"])
+        if dest.endswith(pubScribe.PRIORITY_LANE) and stats["delivered"] :
+            s = s + "{}: {} delivered, latency last {:.1f} s, max {:.1f} s\n".format(dest, stats["delivered"], stats["latencySec"], stats["maxLatencySec"])
+
+    if alertLatency.count :
+        s = s + "High water trigger to alert: " + alertLatency.summary() + "\n"
+
     topic = "basinMaster/Status"
     pubScribe.pubRecord(pubScribe.EMAIL_SMS, topic, s)
 
 
 #
-# Test / debug main
+# Rules written to ALERT_RULES_FILE when it does not exist
 #
-if __name__ == '__main__':
+def defaultRules() :
+    return [
+        {"name": "basinMaster Alert", "type": "threshold", "enabled": bool(WATER_DEPTH_ALERT_ENABLE),
+         "topic": "basinMaster/WaterDepth", "field": ["Ultrasonic (in)", "ABP (in)"],
+         "above": WATER_DEPTH_ALERT, "hysteresis": 0.5, "forSec": 0,
+         "minIntervalSec": minIntervalBtwWaterEmails, "repeatSec": minIntervalBtwWaterEmails,
+         "action": {"dest": [pubScribe.EMAIL_SMS], "topic": "basinMaster/Alert", "message": "Water Depth: {value}\n"}},
 
-    # tInterval = 0.5
-    # tInterval = 1
-    tInterval = 2
+        {"name": "Water rising fast", "type": "rate", "enabled": False,
+         "topic": "basinMaster/WaterDepth", "field": "ABP (in)", "windowSec": 600, "above": 6.0,
+         "minIntervalSec": 3600,
+         "action": {"dest": [pubScribe.EMAIL_SMS], "topic": "basinMaster/Alert", "message": "Water rising {value:.1f} in/hr\n"}},
 
-    waterDepthLastEmailTime = 0
-    lastStatusMsg = 0
+        {"name": "Sensors disagree", "type": "disagree", "enabled": False,
+         "topic": "basinMaster/WaterDepth", "fields": ["Ultrasonic (in)", "ABP (in)"], "above": 2.0,
+         "hysteresis": 0.5, "forSec": 1800, "minIntervalSec": 24*3600,
+         "action": {"dest": [pubScribe.EMAIL_SMS], "topic": "basinMaster/Alert", "message": "Sensors differ by {value:.1f} in\n"}},
+
+        {"name": "Daily status", "type": "daily", "enabled": bool(statusMsgEnabled),
+         "at": "{:02d}:{:02d}".format(*statusMsgHHMM), "action": {"call": "status"}},
+    ]
+
+
+#
+# Publishing side: pubScribe, alert rules and pump cycle detection
+#
+SAMPLE_TOPIC = "basinMaster/Sample"     # each measurement, sampler to publisher only
+
+rules = None
+pumpDetector = None
+httpServer = None
+alertLatency = highWater.LatencyStats()     # high water trigger to alert published
+
+def publisherInit() :
+    global pumpDetector, httpServer
 
     pubScribe.connectPubScribe()
 
-    gaugeInit(tInterval)
+    loadRules()
+    config.watchFile(ALERT_RULES_FILE, loadRules)                   # edited rules replace the running ones
+    pubScribe.subscribe("basinMaster/Pump/#", lambda topic, tsec, data, hdr : rules.onRecord(topic, tsec, data, hdr))
+
+    pumpDetector = pumpCycles.PumpCycleDetector() if PUMP_CYCLES_ENABLED else None
+
+    if HTTP_ENABLED :
+        try :
+            httpServer = pubHttp.QueryServer(port=HTTP_PORT)
+        except OSError as e :
+            print("HTTP query service not started: " + str(e))
 
     if statusMsgEnabled :
         topic = "basinMaster/Status"
         pubScribe.pubRecord(pubScribe.EMAIL_SMS, topic, "Program start")
 
+
+def loadRules() :
+    global rules
+
+    specs = alertRules.loadRules(ALERT_RULES_FILE, defaultRules(), actions=["status"])
+    if specs is None :
+        if rules :
+            print("Keeping the running alert rules")
+            return
+        specs = defaultRules()                                     # never start without alerts
+
+    engine = alertRules.RuleEngine(specs)
+    engine.addAction("status", lambda rule, tsec : sendStatus())
+    if rules :
+        engine.setState(rules.getState())                          # rules kept by name keep their state
+    rules = engine
+    setAlertDepth(specs)
+
+
+#
+# Runtime configuration, every process watches CONFIG_FILE itself
+#
+config = None
+
+def configInit() :
+    global config
+
+    config = runtimeConfig.RuntimeConfig(CONFIG_FILE)
+    config.register("basinMaster", sys.modules[__name__], CONFIG_SCHEMA, reconfigure)
+    config.register("pubScribe", pubScribe, pubScribe.CONFIG_SCHEMA, pubScribe.reconfigure)
+    if pubScribe.EMAIL_SMS_ENABLED :
+        import sendEmail
+        config.register("sendEmail", sendEmail, sendEmail.CONFIG_SCHEMA)
+    config.load()
+
+
+#
+# Email settings are entered at a prompt on first start, which needs a
+#   terminal. Done before the processes are split, the publisher process
+#   has no stdin.
+#
+def emailInit() :
+    if not pubScribe.EMAIL_SMS_ENABLED :
+        return
+
+    import sendEmail
+    try :
+        sendEmail.loadJsonFile()
+    except EOFError :
+        print("emailCfg.json not found and no terminal to enter the email settings. " +
+              "Run python3 basinMaster.py once from a terminal to create it.")
+        sys.exit(1)
+
+
+#
+# State kept across restarts, each process saves the state it owns
+#
+DEPTH_CSV    = "basinMaster_WaterDepth.csv"
+DEPTH_FIELDS = ["Ultrasonic (in)", "ABP (in)"]
+
+snapshot = None
+
+def stateInit(sampler, publisher) :
+    global snapshot
+
+    snapshot = stateSnapshot.Snapshot(STATE_DIR)
+    if sampler :
+        snapshot.register("gauge", gaugeState, gaugeRestore)
+    if publisher :
+        snapshot.register("readings", readingsState, readingsRestore)
+        if pubScribe.ROLLUP_ENABLED :
+            snapshot.register("rollups", pubScribe.pubRollup.getState, pubScribe.pubRollup.setState)
+    snapshot.restore()
+
+
+def gaugeState() :
+    return {"usLog": last_us_log, "abpLog": last_abp_log}
+
+def gaugeRestore(state, tsec) :
+    global last_us_log, last_abp_log
+
+    if state is None or time.time() - tsec > STATE_MAX_AGE_SEC :
+        lastRow, latest = stateSnapshot.csvTail(pubCompress.logFilename(DEPTH_CSV), DEPTH_FIELDS)
+        if lastRow :
+            state = {"usLog": lastRow[1].get(DEPTH_FIELDS[0], -99), "abpLog": lastRow[1].get(DEPTH_FIELDS[1], -99)}
+
+    if state :
+        last_us_log, last_abp_log = state["usLog"], state["abpLog"]
+
+
+def readingsState() :
+    return {"us": [time.mktime(last_us_t), last_us_result], "abp": [time.mktime(last_abp_t), last_abp_result],
+            "rules": rules.getState()}
+
+def readingsRestore(state, tsec) :
+    global last_us_result, last_us_t, last_abp_result, last_abp_t
+
+    if state :
+        rules.setState(state["rules"])                             # alert throttling holds however old
+
+    if state is None or time.time() - tsec > STATE_MAX_AGE_SEC :
+        lastRow, latest = stateSnapshot.csvTail(pubCompress.logFilename(DEPTH_CSV), DEPTH_FIELDS)
+        state = {"us": latest.get(DEPTH_FIELDS[0]), "abp": latest.get(DEPTH_FIELDS[1])}
+
+    if state["us"] :
+        last_us_t, last_us_result = time.localtime(state["us"][0]), state["us"][1]
+    if state["abp"] :
+        last_abp_t, last_abp_result = time.localtime(state["abp"][0]), state["abp"][1]
+
+
+#
+# One measurement of both sensors, trigger is (UNIX time, reason) for a high water measurement
+#
+def handleMeasurement(tsec, usMeas, abpMeas, trigger=None) :
+    global last_us_result, last_us_t, last_abp_result, last_abp_t
+
+    # status message values, set here too when gaugeRead ran in the sampler process
+    if usMeas != -99 :
+        last_us_result, last_us_t = usMeas, time.localtime(tsec)
+    if abpMeas != -99 :
+        last_abp_result, last_abp_t = abpMeas, time.localtime(tsec)
+
+    s = time.strftime("%a, %d %b %Y %H:%M:%S ", time.localtime(tsec))
+    print("{}Ultrasonic depth= {: 6.2f}, ABP depth= {: 6.2f}".format(s, usMeas, abpMeas))
+
+    fired = rules.fired
+    rules.evaluate("basinMaster/WaterDepth", tsec, {"Ultrasonic (in)": usMeas, "ABP (in)": abpMeas})
+    if rules.fired != fired :
+        if trigger :
+            alertLatency.add(time.time() - trigger[0])
+            print("High water alert {:.1f} s after {}".format(alertLatency.last, trigger[1]))
+        snapshot.save()                      # an alert sent just before a crash is not sent again
+
+    if pumpDetector :
+        for topic, record in pumpDetector.add(tsec, abpMeas if ENABLE_HNY_ABP else usMeas) :
+            if topic == pumpCycles.ALERT_TOPIC :
+                pubScribe.pubRecord(pubScribe.EMAIL_SMS, topic, record)
+            else :
+                pubScribe.pubRecord([pubScribe.CSV_FILE, pubScribe.SQLITE], topic, record)
+
+
+#
+# Sampler process: sensors and pump only, records are forwarded to the publisher
+#
+def samplerMain(channel, tInterval) :
+    procSplit.interruptOnTerm()
+    print("Sampler " + procSplit.setRealtime(cpu=SAMPLER_CPU))
+    pubScribe.forward = channel.send
+
+    configInit()
+    stateInit(sampler=True, publisher=False)
+    gaugeInit(tInterval)
+    if HIGH_WATER_ENABLED :
+        config.watchFile(ALERT_RULES_FILE, loadAlertDepth)          # fast path level follows the rules
+
+    try :
+        tNext = time.monotonic()
+        while (True) :
+            highWaterCheck()
+            usMeas, abpMeas, trigger = gaugeRead(tInterval)
+            if usMeas!=-99 or abpMeas!=-99 :
+                data = {"Ultrasonic (in)": usMeas, "ABP (in)": abpMeas}
+                if trigger :
+                    data["Trigger"] = trigger
+                channel.send([], SAMPLE_TOPIC, time.time(), data, urgent=bool(trigger))
+
+            sensorHealth()
+            config.check()
+            snapshot.tick()
+            procSplit.heartbeat()
+
+            tNext += tInterval                   # fixed schedule, no drift from the time spent reading
+            time.sleep(max(tNext - time.monotonic(), 0))
+
+    except KeyboardInterrupt :
+        pass
+
+    snapshot.save()
+    gaugeClose()
+    print("GPIO cleaned up.")
+
+
+#
+# Publisher process: receives sampler records and publishes them
+#
+def publisherMain(channel) :
+    procSplit.interruptOnTerm()
+    procSplit.lowerPriority()
+    configInit()
+    publisherInit()
+    stateInit(sampler=False, publisher=True)
+
+    try :
+        while (True) :
+            for dest, topic, tsec, data, hdr in channel.receive(1.0) :
+                if topic == SAMPLE_TOPIC :
+                    handleMeasurement(tsec, data["Ultrasonic (in)"], data["ABP (in)"], data.get("Trigger"))
+                else :
+                    pubScribe.bus.publish(topic, data, hdr, tsec, dest)
+
+            config.check()
+            snapshot.tick()
+            procSplit.heartbeat()
+
+            # daily status email to email or to SMS text
+            rules.tick()
+
+    except KeyboardInterrupt :
+        pass
+
+    snapshot.save()
+    if httpServer :
+        httpServer.stop()
+    pubScribe.disconnectPubScribe()
+
+
+#
+# Test / debug main
+#
+if __name__ == '__main__':
+
+    # tInterval = 0.5
+    # tInterval = 1
+    tInterval = 2
+
     print("\nPress CTRL+C to exit...\n")
     print("First set of measurement will display in a few minutes...\n")
 
+    configInit()                            # creates CONFIG_FILE on first start
+    emailInit()
+
+    if SPLIT_PROCESSES :
+        config.close()
+        channel = procSplit.SampleChannel()
+        procSplit.supervise({"sampler": (samplerMain, (channel, tInterval)),
+                             "publisher": (publisherMain, (channel,))})
+        print(" Keyboard interrupt caught.")
+        sys.exit(0)
+
+    publisherInit()
+    stateInit(sampler=True, publisher=True)
+    gaugeInit(tInterval)
+
+    watchdog = sdNotify.Watchdog()          # when run as a systemd service with WatchdogSec
+    sdNotify.notify("READY=1")
+
     try :
         while (True) :
-            usMeas, abpMeas = gaugeRead(tInterval)
+            highWaterCheck()
+            usMeas, abpMeas, trigger = gaugeRead(tInterval)
             if usMeas!=-99 or abpMeas!=-99 :
-                s = time.strftime("%a, %d %b %Y %H:%M:%S ", time.localtime())
-                print("{}Ultrasonic depth= {: 6.2f}, ABP depth= {: 6.2f}".format(s, usMeas, abpMeas))
-
-
-                if WATER_DEPTH_ALERT_ENABLE :
-                    if (usMeas != -99) and (usMeas > WATER_DEPTH_ALERT) :
-                        tsec = time.time()
-                        if (tsec > (minIntervalBtwWaterEmails + waterDepthLastEmailTime)) :
-                            # Allowed to send email text message
-                            waterDepthLastEmailTime = tsec
-                            sendAlert("basinMaster Alert", "Water Depth: " + str(usMeas) + "\n")
-
-                    if (abpMeas != -99) and (abpMeas > WATER_DEPTH_ALERT) :
-                        tsec = time.time()
-                        if (tsec > (minIntervalBtwWaterEmails + waterDepthLastEmailTime)) :
-                            # Allowed to send email text message
-                            waterDepthLastEmailTime = tsec
-                            sendAlert("basinMaster Alert", "ABP Water Depth: " + str(abpMeas) + "\n")
-
-            # send daily status email to email or to SMS text
-            t = datetime.datetime.now()
-            tsec = time.time()
-            if (statusMsgEnabled and t.hour==statusMsgHHMM[0] and t.minute==statusMsgHHMM[1] and (tsec >= (lastStatusMsg+12*3600)) ) :
-                lastStatusMsg = tsec
-                sendStatus()
+                handleMeasurement(time.time(), usMeas, abpMeas, trigger)
+
+            sensorHealth()
+            config.check()
+            snapshot.tick()
+            watchdog.kick()
+
+            # daily status email to email or to SMS text
+            rules.tick()
 
             time.sleep(tInterval)
 
     except KeyboardInterrupt :
         print(" Keyboard interrupt caught.")
 
+    sdNotify.notify("STOPPING=1")
+    snapshot.save()
     gaugeClose()
     print("GPIO cleaned up.")
+    if httpServer :
+        httpServer.stop()
     pubScribe.disconnectPubScribe()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+  2026/10/19  BrucesHobbies   Commits in a worker thread, failed commits are not acknowledged
+
+
+OVERVIEW:
+    Collector service for the pubScribe IP_PORT destination. Many basinMaster
+    RPis connect over TCP (see pubIpPort.py for the framing). Each connection
+    names its site in a HELLO frame. Records are stored with the topic
+    "<site>/<topic>", so each site and topic gets its own table in the
+    pubSqlite store.
+
+    Connections are served by one asyncio event loop, so thousands of RPis
+    need no thread per connection. Records from all connections are added to
+    the SQLite store and committed together in one transaction every
+    COLLECTOR_COMMIT_SEC seconds or COLLECTOR_COMMIT_ROWS records. A batch is
+    acknowledged to its client only after the transaction holding it is
+    committed.
+
+    Usage:
+        python3 fleetCollector.py [--port 5555] [--db fleet.db]
+
+    For many connections raise the open file limit first, e.g. ulimit -n 65536
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import time
+import struct
+import sqlite3
+import asyncio
+import argparse
+
+import pubIpPort
+import pubSqlite
+
+
+COLLECTOR_PORT        = 5555
+COLLECTOR_DBNAME      = "fleet.db"
+COLLECTOR_COMMIT_SEC  = 1.0          # commit and acknowledge at least this often
+COLLECTOR_COMMIT_ROWS = 20000        # or when this many records are waiting
+COLLECTOR_MAX_FRAME   = 16 << 20     # bytes, larger frames close the connection
+COLLECTOR_STATS_SEC   = 10           # seconds between statistics lines, 0 for none
+
+
+class Collector :
+    def __init__(self, store, commitSec=COLLECTOR_COMMIT_SEC, commitRows=COLLECTOR_COMMIT_ROWS) :
+        self.store = store
+        self.commitSec = commitSec
+        self.commitRows = commitRows
+
+        self.pendingAcks = []        # (writer, batch seq) waiting for the next commit
+        self.pendingRows = 0
+        self.commitLock = None       # one commit at a time, created in the event loop
+
+        # statistics
+        self.connections = 0
+        self.sites = set()
+        self.records = 0
+        self.batches = 0
+        self.commits = 0
+        self.rejected = 0
+
+    async def handle(self, reader, writer) :
+        site = None
+        self.connections += 1
+        try :
+            while True :
+                length, version, ftype = pubIpPort.FRAME_HDR.unpack(await reader.readexactly(pubIpPort.FRAME_HDR.size))
+                if length < 2 or length - 2 > COLLECTOR_MAX_FRAME :
+                    break
+                payload = await reader.readexactly(length - 2)
+
+                if ftype == pubIpPort.HELLO :
+                    site = payload.decode('utf-8')
+                    self.sites.add(site)
+
+                elif ftype == pubIpPort.BATCH and site is not None :
+                    seq, records = pubIpPort.decodeBatch(payload)
+                    for topic, tsec, data, hdr in records :
+                        self.store.add(site + "/" + topic, tsec, data, hdr)
+                    self.records += len(records)
+                    self.batches += 1
+                    self.pendingRows += len(records)
+                    self.pendingAcks.append((writer, seq))
+                    if self.pendingRows >= self.commitRows and not self.commitLock.locked() :
+                        await self.commit()
+
+        except (asyncio.IncompleteReadError, ConnectionError, struct.error, ValueError, IndexError) :
+            pass
+
+        finally :
+            self.connections -= 1
+            writer.close()
+
+    #
+    # One transaction for everything received since the last commit, then ACKs.
+    #   The transaction runs in a worker thread so connections are served
+    #   meanwhile. Records the store rejects are in its .rejected file and are
+    #   acknowledged. When the commit itself fails the batches are not: their
+    #   connections are closed and the clients send them again.
+    #
+    async def commit(self) :
+        async with self.commitLock :
+            if not self.pendingAcks :
+                return
+            acks = self.pendingAcks
+            pending = self.store.takePending()
+            self.pendingAcks = []
+            self.pendingRows = 0
+
+            try :
+                self.rejected += await asyncio.get_event_loop().run_in_executor(None, self.store.write, pending)
+            except (sqlite3.Error, OSError) as e :
+                print("Commit failed, {} batches not acknowledged: {}".format(len(acks), e))
+                for writer, seq in acks :
+                    writer.close()
+                return
+            self.commits += 1
+
+            for writer, seq in acks :
+                if not writer.is_closing() :
+                    writer.write(pubIpPort.encodeFrame(pubIpPort.ACK, pubIpPort.SEQ.pack(seq)))
+
+    async def commitLoop(self) :
+        while True :
+            await asyncio.sleep(self.commitSec)
+            try :
+                await self.commit()
+            except Exception as e :          # keep committing whatever went wrong
+                print("Commit loop: " + str(e))
+
+    async def statsLoop(self, interval) :
+        lastRecords = self.records
+        lastT = time.time()
+        while True :
+            await asyncio.sleep(interval)
+            now = time.time()
+            print("{} connections, {} sites, {:.0f} records/s, {} records, {} commits, {} rejected".format(
+                  self.connections, len(self.sites), (self.records - lastRecords) / (now - lastT), self.records, self.commits, self.rejected))
+            lastRecords = self.records
+            lastT = now
+
+    async def serve(self, host, port, statsSec=COLLECTOR_STATS_SEC) :
+        self.commitLock = asyncio.Lock()
+        server = await asyncio.start_server(self.handle, host, port, backlog=4096)
+        print("Collector listening on {}:{}".format(host, port))
+        tasks = [asyncio.ensure_future(self.commitLoop())]
+        if statsSec :
+            tasks.append(asyncio.ensure_future(self.statsLoop(statsSec)))
+        async with server :
+            await server.serve_forever()
+
+
+#
+# Allow as many open connections as the hard limit permits
+#
+def raiseFileLimit() :
+    try :
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if hard == resource.RLIM_INFINITY or hard > soft :
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard if hard != resource.RLIM_INFINITY else 65536, hard))
+    except (ImportError, ValueError, OSError) :
+        pass
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Collect basinMaster records from many RPis")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=COLLECTOR_PORT)
+    parser.add_argument("--db", default=COLLECTOR_DBNAME)
+    parser.add_argument("--stats", type=float, default=COLLECTOR_STATS_SEC, help="seconds between statistics lines")
+    args = parser.parse_args()
+
+    raiseFileLimit()
+
+    # commits are driven by the collector, never by the store itself
+    store = pubSqlite.SqliteStore(args.db, batchRows=float("inf"), batchSec=float("inf"))
+    collector = Collector(store)
+
+    try :
+        asyncio.run(collector.serve(args.host, args.port, args.stats))
+    except KeyboardInterrupt :
+        print(" Keyboard interrupt caught.")
+
+    store.close()                    # commits what was received, the connections are gone
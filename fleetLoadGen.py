@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+
+
+OVERVIEW:
+    Load generator for fleetCollector.py. Simulates many basinMaster RPis,
+    each with its own TCP connection using the IP_PORT framing. Every
+    simulated RPi sends a batch of water depth records each interval and
+    waits for the ACK. Reports acknowledged records per second and ACK
+    latency.
+
+    Usage:
+        python3 fleetCollector.py --db /tmp/fleet.db &
+        python3 fleetLoadGen.py --pis 2000 --batch 10 --interval 1 --duration 30
+
+    For many connections raise the open file limit first, e.g. ulimit -n 65536
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+import pubIpPort
+import fleetCollector
+
+
+class LoadStats :
+    def __init__(self) :
+        self.connected = 0
+        self.records = 0
+        self.batches = 0
+        self.errors = 0
+        self.latencies = []
+
+
+#
+# One simulated RPi
+#
+async def simulatePi(idx, host, port, batch, interval, tEnd, stats) :
+    site = "pi{:05d}".format(idx)
+    await asyncio.sleep(random.random() * interval)        # spread the load over the interval
+    try :
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError :
+        stats.errors += 1
+        return
+    stats.connected += 1
+
+    writer.write(pubIpPort.encodeFrame(pubIpPort.HELLO, site.encode('utf-8')))
+    seq = 0
+    depth = random.uniform(2.0, 8.0)
+    try :
+        while time.time() < tEnd :
+            tNext = time.time() + interval
+            records = []
+            for i in range(batch) :
+                depth = min(max(depth + random.uniform(-0.1, 0.12), 0.0), 12.0)
+                records.append(("basinMaster/WaterDepth", time.time(), {"Ultrasonic (in)": round(depth, 2), "ABP (in)": round(depth + 0.1, 2)}, ""))
+
+            seq += 1
+            t0 = time.time()
+            writer.write(pubIpPort.encodeBatch(seq, records))
+            await writer.drain()
+
+            length, version, ftype = pubIpPort.FRAME_HDR.unpack(await reader.readexactly(pubIpPort.FRAME_HDR.size))
+            payload = await reader.readexactly(length - 2)
+            if ftype != pubIpPort.ACK or pubIpPort.SEQ.unpack(payload)[0] != seq :
+                stats.errors += 1
+                break
+
+            stats.latencies.append(time.time() - t0)
+            stats.records += batch
+            stats.batches += 1
+            await asyncio.sleep(max(tNext - time.time(), 0))
+
+    except (asyncio.IncompleteReadError, ConnectionError) :
+        stats.errors += 1
+
+    finally :
+        stats.connected -= 1
+        writer.close()
+
+
+async def run(args) :
+    stats = LoadStats()
+    t0 = time.time()
+    tEnd = t0 + args.duration
+    tasks = [asyncio.ensure_future(simulatePi(i, args.host, args.port, args.batch, args.interval, tEnd, stats))
+             for i in range(args.pis)]
+
+    lastRecords = 0
+    while not all(task.done() for task in tasks) :
+        await asyncio.sleep(min(5, args.duration))
+        now = time.time()
+        print("{:5.0f} s {} connected, {} records acked ({:.0f}/s), {} errors".format(
+              now - t0, stats.connected, stats.records, (stats.records - lastRecords) / 5.0, stats.errors))
+        lastRecords = stats.records
+
+    elapsed = time.time() - t0
+    lat = sorted(stats.latencies)
+    pct = lambda p : lat[min(int(p * len(lat)), len(lat) - 1)] * 1000 if lat else float("nan")
+    print("{} simulated RPis, {} records in {} batches over {:.1f} s: {:.0f} records/s, ACK latency p50 {:.1f} ms p99 {:.1f} ms, {} errors".format(
+          args.pis, stats.records, stats.batches, elapsed, stats.records / elapsed, pct(0.50), pct(0.99), stats.errors))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Simulate many basinMaster RPis sending to fleetCollector")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=fleetCollector.COLLECTOR_PORT)
+    parser.add_argument("--pis", type=int, default=1000, help="number of simulated RPis")
+    parser.add_argument("--batch", type=int, default=10, help="records per batch")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between batches per RPi")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    args = parser.parse_args()
+
+    fleetCollector.raiseFileLimit()
+    asyncio.run(run(args))
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+
+
+OVERVIEW:
+    High water fast path. Without it a depth crossing the alert level is
+    only seen at the end of the next measurement cycle, measTime seconds
+    plus the ABP pump window in the worst case.
+
+    Between measurements the sampler calls check() every tick. It returns
+    (trigger UNIX time, reason) when a full measurement should start now:
+    - an optional float switch closed (GPIO edge, seen within one tick), or
+    - a spot read, e.g. one unpumped ABP reading, every spotSec seconds is
+      at or above level. The tube is not pressurized for a spot read, so it
+      reads low when air has leaked and level is set a margin below the
+      alert depth. basinMaster takes the alert depth from its alert rules.
+    While the water stays high a spot read starts a measurement at most
+    every holdoffSec seconds, so measurements are frequent near the alert
+    depth and the pump does not run continuously.
+
+    The measurement started by a trigger is sent to the publisher in the
+    priority lane of procSplit.SampleChannel, and an alert it raises uses
+    the pubScribe priority outbox lane. LatencyStats keeps the trigger to
+    alert times for the status message.
+
+    Test / debug, alert latency with and without the fast path and priority lane:
+        python3 highWater.py
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import sys
+import time
+
+
+HIGH_WATER_SPOT_SEC    = 5       # seconds between spot reads
+HIGH_WATER_HOLDOFF_SEC = 20      # at least this many seconds between triggered measurements
+FLOAT_BOUNCE_MS        = 200     # float switch debounce
+MISSING_VALUE          = -99
+
+
+class HighWaterTrigger :
+    #
+    # level: spot read depth in inches that starts a measurement, None for no spot reads
+    # spotRead: function returning a depth in inches or MISSING_VALUE, None for no spot reads
+    # floatPin: BCM pin of a float switch closing to ground at high water, None when not fitted
+    #
+    def __init__(self, level, spotRead=None, spotSec=HIGH_WATER_SPOT_SEC, floatPin=None,
+                 holdoffSec=HIGH_WATER_HOLDOFF_SEC) :
+        self.level = level
+        self.spotRead = spotRead
+        self.spotSec = spotSec
+        self.floatPin = floatPin
+        self.holdoffSec = holdoffSec
+
+        self.nextSpot = 0
+        self.lastTrigger = None
+        self.floatEvent = None           # time of a float switch edge, set in the GPIO thread
+
+        # statistics
+        self.spotReads = 0
+        self.triggers = 0
+
+        if floatPin is not None :
+            import RPi.GPIO as GPIO
+            GPIO.setup(floatPin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+            GPIO.add_event_detect(floatPin, GPIO.FALLING, callback=self.floatEdge, bouncetime=FLOAT_BOUNCE_MS)
+            if not GPIO.input(floatPin) :
+                self.floatEvent = time.time()        # already closed at start
+
+    def floatEdge(self, channel) :
+        self.floatEvent = time.time()
+
+    #
+    # (trigger UNIX time, reason) when a measurement should start now, else None
+    #   spotAllowed: False while the pump runs or a measurement is under way
+    #
+    def check(self, spotAllowed=True, now=None) :
+        now = time.time() if now is None else now
+
+        if self.floatEvent is not None :
+            tTrigger, self.floatEvent = self.floatEvent, None
+            return self.fire(tTrigger, "float switch")
+
+        if not self.spotRead or self.level is None or not spotAllowed or now < self.nextSpot :
+            return None
+        if self.lastTrigger is not None and now - self.lastTrigger < self.holdoffSec :
+            return None
+
+        self.nextSpot = now + self.spotSec
+        self.spotReads += 1
+        depth = self.spotRead()
+        if depth != MISSING_VALUE and depth >= self.level :
+            return self.fire(now, "spot read {:.2f} in".format(depth))
+        return None
+
+    def fire(self, tTrigger, reason) :
+        self.lastTrigger = tTrigger
+        self.triggers += 1
+        return tTrigger, reason
+
+
+#
+# Count, last, mean and max of latencies in seconds
+#
+class LatencyStats :
+    def __init__(self) :
+        self.count = 0
+        self.last = 0.0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, sec) :
+        self.count += 1
+        self.last = sec
+        self.total += sec
+        self.max = max(self.max, sec)
+
+    def summary(self) :
+        return "{} alerts, last {:.1f} s, mean {:.1f} s, max {:.1f} s".format(
+               self.count, self.last, self.total / self.count if self.count else 0.0, self.max)
+
+
+#
+# Test / debug
+#
+# Time from the depth crossing the alert level to a measurement that shows
+# it, following the measCnt countdown of basinMaster.gaugeRead
+#
+def simulate(tCross, riseInPerSec, fastPath, alertLevel=9, margin=0.5, tInterval=2,
+             measTime=60, pumpOnTime=5, pumpOffTime=5) :
+    depth = lambda t : alertLevel + (t - tCross) * riseInPerSec
+    cycleCnt = int(measTime / tInterval) - 1
+    pumpOnCnt = int(pumpOffTime / tInterval) + int(pumpOnTime / tInterval) + 2
+    now = [0.0]
+    trigger = HighWaterTrigger(alertLevel - margin, lambda : depth(now[0])) if fastPath else None
+
+    measCnt = cycleCnt
+    urgent = False
+    for k in range(100000) :
+        now[0] = t = k * tInterval
+        if trigger and not urgent and measCnt > pumpOnCnt and trigger.check(now=t) :
+            urgent = True
+            measCnt = min(measCnt, pumpOnCnt)
+        if measCnt :
+            measCnt -= 1
+        else :
+            measCnt = cycleCnt
+            urgent = False
+            if depth(t) >= alertLevel :
+                return t - tCross
+    return None
+
+
+if __name__ == '__main__':
+
+    import random
+    import tempfile
+    import pubOutbox
+
+    random.seed(1)
+    print("Crossing to alert measurement, 200 random crossing times:")
+    for rise, name in ((6 / 3600.0, "6 in/hr"), (60 / 3600.0, "60 in/hr")) :
+        for fastPath in (False, True) :
+            lat = sorted(simulate(300 + random.uniform(0, 600), rise, fastPath) for i in range(200))
+            print("  {:9} {:18} mean {:5.1f} s, max {:5.1f} s".format(
+                  name, "fast path" if fastPath else "measurement cycle", sum(lat) / len(lat), lat[-1]))
+
+    backlog = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    print("\nAlert published to delivered, {} status/log records queued, 20 ms per delivery:".format(backlog))
+    delivered = {}
+
+    def deliver(records) :
+        for record in records :
+            time.sleep(0.02)
+            delivered[record["seq"], record["topic"]] = time.time()
+
+    for lane in (False, True) :
+        directory = tempfile.mkdtemp()
+        outbox = pubOutbox.Outbox("EMAIL_SMS", deliver, directory, batchSize=1)
+        priority = pubOutbox.Outbox("EMAIL_SMS_PRIORITY", deliver, directory, batchSize=1) if lane else outbox
+        for i in range(backlog) :
+            outbox.put("basinMaster/Status", time.time(), "status {}".format(i))
+        t0 = time.time()
+        seq = priority.put("basinMaster/Alert", t0, "Water Depth: 9.2")
+        while (seq, "basinMaster/Alert") not in delivered :
+            time.sleep(0.005)
+        print("  {:18} {:6.0f} ms".format("priority lane" if lane else "shared outbox", (delivered[seq, "basinMaster/Alert"] - t0) * 1000))
+        priority.close(0)
+        outbox.close(0)
+        delivered.clear()
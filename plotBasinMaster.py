@@ -10,6 +10,13 @@ REVISION HISTORY
   DATE        AUTHOR          CHANGES
   yyyy/mm/dd  --------------- -------------------------------------
   2021/02/10  BrucesHobbies   Updated default filenames
+  2026/10/19  BrucesHobbies   Chunked numpy CSV loader, vectorized time conversion
+  2026/10/19  BrucesHobbies   Min/max decimation of plotted lines, redone on zoom/pan
+  2026/10/19  BrucesHobbies   Long time spans plot from pubRollup rollup files
+  2026/10/19  BrucesHobbies   Live mode (--live) tails the csv log and updates the plot
+  2026/10/19  BrucesHobbies   Headless batch mode (--batch) rendering reports in a process pool
+  2026/10/19  BrucesHobbies   Logs written only as swinging door breakpoints are rebuilt with pubCompress
+  2026/10/19  BrucesHobbies   Decimation buckets are pixel columns, all missing columns break the line
 
 
 OVERVIEW:
@@ -45,61 +52,361 @@ import matplotlib.dates as mdates
 import numpy as np
 import math
 import time
-import datetime
 import csv
+import itertools
+import os
+import sys
+import argparse
+import glob
+import multiprocessing
+
+import pubRollup
+import pubCompress
 
 # fig.savefig(filename, bbox_inches='tight')   # save the figure to file
 
 filenames = ["basinMaster_WaterDepth.csv"]
 
 
+CSV_CHUNK_ROWS = 65536     # rows parsed per chunk, bounds loader memory
+MISSING_VALUE  = -99       # sensor fault / no reading sentinel written by basinMaster
+PLOT_DECIMATE  = 1         # non zero plots a min/max envelope per pixel instead of every sample
+ROLLUP_MIN_POINTS = 1000   # use the coarsest rollup that still has this many points over the span
+
+LIVE_REFRESH_SEC = 5       # live mode, seconds between checks for new rows
+LIVE_WINDOW_SEC  = 24*3600 # live mode, initial time window shown while following new data
+LIVE_READ_BYTES  = 1 << 22 # live mode, bytes read per chunk while catching up
+
+BATCH_FORMAT = "png"       # batch mode report format, png or svg
+BATCH_DPI    = 100         # batch mode png resolution
+
+
+#
+# Read the header row and return it as a list of column names
+#
+def readCsvHeader(csvfile) :
+    return next(csv.reader([csvfile.readline()]))
+
+
+#
+# Parse a list of csv lines into a 2-d float array of the requested columns.
+#   Rows that numpy cannot parse (partial last line, text values) fall back
+#   to a per-row parse with unparsable fields set to NaN.
+#
+def parseCsvLines(lines, usecols) :
+    try :
+        return np.loadtxt(lines, delimiter=',', usecols=usecols, ndmin=2, dtype=np.float64)
+    except ValueError :
+        pass
+
+    result = np.full((len(lines), len(usecols)), np.nan)
+    for r, line in enumerate(lines) :
+        fields = line.split(',')
+        for c, idx in enumerate(usecols) :
+            try :
+                result[r, c] = float(fields[idx])
+            except (ValueError, IndexError) :
+                pass
+    return result
+
+
+#
+# Generator returning (tStamp, values) numpy arrays for each chunk of a csv file.
+#   tStamp is a 1-d array of unix seconds, values is a 2-d array with one column
+#   per data column. MISSING_VALUE entries are replaced with NaN.
+#
+def iterCsvChunks(csvfile, ncols, chunkRows=CSV_CHUNK_ROWS) :
+    usecols = [0] + list(range(2, ncols))
+
+    while True :
+        lines = [line for line in itertools.islice(csvfile, chunkRows) if line.strip()]
+        if not lines :
+            break
+
+        chunk = parseCsvLines(lines, usecols)
+        values = chunk[:, 1:]
+        values[values == MISSING_VALUE] = np.nan
+        yield chunk[:, 0], values
+
+
+#
+# Byte offset of the first line at or before tStart in a time sorted csv log.
+#   Bisects on file offsets so only a few lines are read. Lines before tStart
+#   may follow the offset, callers still filter by time.
+#
+def seekTime(filename, tStart) :
+    with open(filename, 'rb') as csvfile :
+        csvfile.readline()                       # header
+        dataStart = lo = csvfile.tell()
+        hi = os.fstat(csvfile.fileno()).st_size
+
+        while hi - lo > 4096 :
+            mid = (lo + hi) // 2
+            csvfile.seek(mid)
+            csvfile.readline()                   # skip partial line
+            try :
+                t = float(csvfile.readline().split(b',')[0])
+            except (ValueError, IndexError) :
+                t = None
+
+            if t is None or t >= tStart :
+                hi = mid
+            else :
+                lo = mid
+
+        if lo > dataStart :
+            csvfile.seek(lo)
+            csvfile.readline()
+            lo = csvfile.tell()
+
+    return lo
+
+
 #
 # Read in a comma seperated variable file. Assumes a header row exists.
 #   Time series with time in seconds in first column.
 #   Ignore text string with date/time from second column
 #   data is columns [2:]
+#   Returns numpy arrays, file is streamed in chunks of CSV_CHUNK_ROWS rows
+#   tStart, tEnd limit the rows returned and only that part of the file is read
 #
-def importCsv(filename) :
-    print("Reading " + filename)
+def importCsv(filename, chunkRows=CSV_CHUNK_ROWS, tStart=None, tEnd=None, verbose=True) :
+    if verbose :
+        print("Reading " + filename)
 
     with open(filename, 'r') as csvfile :
-        csvData = list(csv.reader(csvfile))
+        hdr = readCsvHeader(csvfile)
+        if verbose :
+            print(hdr)
+
+        if tStart is not None :
+            csvfile.seek(seekTime(filename, tStart))
+
+        tChunks = []
+        vChunks = []
+        for tStamp, values in iterCsvChunks(csvfile, len(hdr), chunkRows) :
+            if tStart is not None or tEnd is not None :
+                keep = np.ones(len(tStamp), dtype=bool)
+                if tStart is not None :
+                    keep &= (tStamp >= tStart)
+                if tEnd is not None :
+                    keep &= (tStamp <= tEnd)
+                tChunks.append(tStamp[keep])
+                vChunks.append(values[keep])
+                if tEnd is not None and len(tStamp) and tStamp[-1] > tEnd :
+                    break
+            else :
+                tChunks.append(tStamp)
+                vChunks.append(values)
+
+    names = hdr[2:]
+    if tChunks :
+        tStamp = np.concatenate(tChunks)
+        values = np.concatenate(vChunks)
+    else :
+        tStamp = np.empty(0)
+        values = np.empty((0, len(names)))
+
+    data = {name : values[:, idx] for idx, name in enumerate(names)}
+    if verbose :
+        print("{} rows".format(len(tStamp)))
+
+    return names, tStamp, data
+
+
+#
+# First and last timestamp of a csv log without reading the whole file
+#
+def csvTimeSpan(filename) :
+    with open(filename, 'rb') as csvfile :
+        csvfile.readline()                       # header
+        first = csvfile.readline()
+
+        csvfile.seek(0, os.SEEK_END)
+        size = csvfile.tell()
+        csvfile.seek(max(size - 4096, 0))
+        lines = [line for line in csvfile.read().splitlines() if line.strip()]
+
+    try :
+        return float(first.split(b',')[0]), float(lines[-1].split(b',')[0])
+    except (ValueError, IndexError) :
+        return None
+
+
+#
+# Read a topic log, from the coarsest rollup file that still has minPoints
+#   points over the log's time span, or from the raw log otherwise.
+#   A rollup is used only when its first bucket is at or before the start of
+#   the window (tStart or the raw log's first timestamp), e.g. rollups started
+#   after years of raw logging are not, until rebuilt with pubRollup.py.
+#   A log written only as swinging door breakpoints (pubScribe COMPRESS_ONLY)
+#   is rebuilt from <topic>_sdt.csv.
+#   Returns names, tStamp, data and bands {name: (min, max)} (empty for raw logs).
+#   tStart, tEnd limit the time window read.
+#
+def importBest(filename, minPoints=ROLLUP_MIN_POINTS, tStart=None, tEnd=None, verbose=True) :
+    logFile = pubCompress.logFilename(filename)
+    span = csvTimeSpan(logFile) if os.path.isfile(logFile) else None
+    if span :
+        span = (span[0] if tStart is None else max(span[0], tStart), span[1] if tEnd is None else min(span[1], tEnd))
+    res = pubRollup.selectResolution(span[1] - span[0], minPoints) if span else None
+
+    if res :
+        rollupFile = filename[:-len(".csv")] + "_" + res[0] + ".csv"
+        rollupSpan = csvTimeSpan(rollupFile) if os.path.isfile(rollupFile) else None
+        if rollupSpan and rollupSpan[0] > span[0] :
+            if verbose :
+                print(rollupFile + " starts after the window, reading the raw log")
+            rollupSpan = None
+        if rollupSpan :
+            names, tStamp, rollup = importCsv(rollupFile, tStart=tStart, tEnd=tEnd, verbose=verbose)
+            fields = [name[:-len(" mean")] for name in names if name.endswith(" mean")]
+            data = {field : rollup[field + " mean"] for field in fields}
+            bands = {field : (rollup[field + " min"], rollup[field + " max"]) for field in fields}
+            return fields, tStamp, data, bands
+
+    if logFile != filename :
+        names, tStamp, data = importCompressed(logFile, tStart=tStart, tEnd=tEnd, verbose=verbose)
+    else :
+        names, tStamp, data = importCsv(filename, tStart=tStart, tEnd=tEnd, verbose=verbose)
+    return names, tStamp, data, {}
+
+
+#
+# Read a swinging door breakpoint file rebuilt as regular samples
+#   (pubCompress.expandFile). Same return values as importCsv.
+#
+def importCompressed(filename, tStart=None, tEnd=None, verbose=True) :
+    if verbose :
+        print("Reading " + filename + " (breakpoints)")
+
+    names, times, values = pubCompress.expandFile(filename, tStart=tStart, tEnd=tEnd)
+    tStamp = np.array(times, dtype=np.float64)
+    data = {name : np.array([v if pubCompress.isNumber(v) else np.nan for v in values[name]], dtype=np.float64) for name in names}
+    if verbose :
+        print("{} rows".format(len(tStamp)))
+
+    return names, tStamp, data
+
+
+#
+# Convert unix seconds to local time datetime64 values for plotting.
+#   UTC offset is looked up once per distinct hour so DST changes are honored.
+#
+def localDatetimes(tStamp) :
+    tStamp = np.asarray(tStamp, dtype=np.float64)
+    if not len(tStamp) :
+        return tStamp.astype('datetime64[us]')
+
+    hours, inverse = np.unique(np.floor(tStamp / 3600.0), return_inverse=True)
+    offsets = np.array([time.localtime(h * 3600.0).tm_gmtoff for h in hours], dtype=np.float64)
+
+    return ((tStamp + offsets[inverse]) * 1e6).astype('datetime64[us]')
+
+
+#
+# Min/max envelope decimation of a time sorted series.
+#   Keeps the points of x within [xMin, xMax] (plus one neighbor each side so
+#   lines run to the plot edge) and, when there are more than two points per
+#   bucket, keeps only the minimum and maximum of each bucket in time order.
+#   Buckets are equal slices of [xMin, xMax], one per pixel column. A bucket
+#   whose samples are all NaN (MISSING_VALUE) keeps a NaN so the line breaks
+#   there instead of bridging the outage. Spikes such as pump-out drops
+#   survive decimation.
+#
+def minMaxDecimate(x, y, xMin, xMax, nBuckets) :
+    i0 = max(np.searchsorted(x, xMin, 'left') - 1, 0)
+    i1 = min(np.searchsorted(x, xMax, 'right') + 1, len(x))
+    xs = x[i0:i1]
+    ys = y[i0:i1]
 
-    hdr = csvData[0]
-    print(hdr)
+    n = len(xs)
+    nBuckets = max(int(nBuckets), 1)
+    if n <= 2 * nBuckets :
+        return xs, ys
 
-    tStamp = []
-    for row in csvData[1:] :
-        tStamp.append(float(row[0]))
+    # bucket of each point, the neighbors outside [xMin, xMax] get their own
+    bucket = np.floor((xs - xMin) * (nBuckets / ((xMax - xMin) or 1.0))).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
 
-    data = {name : [] for name in hdr[2:]}
-    print(data)
+    # NaN counts as larger than any value for both, so it is the min / max
+    # only of a bucket of all NaN
+    missing = np.isnan(ys)
+    iMin = firstOfBuckets(np.where(missing, np.inf, ys), starts)
+    iMax = firstOfBuckets(np.where(missing, np.inf, -ys), starts)
 
-    for row in csvData[1:] :
-        for idx in range(2,len(hdr)) :
-            n = float(row[idx])
-            if n == -99 :
-                n = np.nan
-            data[hdr[idx]].append(n)
+    idx = np.unique(np.concatenate((iMin, iMax)))      # sorted, min/max in time order
+    return xs[idx], ys[idx]
 
-    return hdr[2:], tStamp, data
+
+#
+# Index of the first minimum of v in each bucket, buckets start at starts
+#
+def firstOfBuckets(v, starts) :
+    counts = np.diff(np.append(starts, len(v)))
+    isMin = v == np.repeat(np.minimum.reduceat(v, starts), counts)
+    pos = np.flatnonzero(isMin)
+    group = np.searchsorted(starts, pos, 'right')
+    return pos[np.r_[True, group[1:] != group[:-1]]]
+
+
+#
+# Line whose data is re-decimated from the full resolution series whenever
+#   the x axis limits or the figure size change.
+#
+class DecimatedLine :
+    def __init__(self, ax, x, y, **kwargs) :
+        self.ax = ax
+        self.x = x
+        self.y = y
+
+        xs, ys = minMaxDecimate(x, y, x[0], x[-1], self.buckets()) if len(x) else (x, y)
+        self.line, = ax.plot(xs, ys, **kwargs)
+
+        ax.callbacks.connect('xlim_changed', self.update)
+        ax.figure.canvas.mpl_connect('resize_event', self.update)
+
+    def buckets(self) :
+        return int(self.ax.bbox.width) or 1000
+
+    def setData(self, x, y) :
+        self.x = x
+        self.y = y
+
+    def update(self, event=None) :
+        if not len(self.x) :
+            return
+        xMin, xMax = self.ax.get_xlim()
+        xs, ys = minMaxDecimate(self.x, self.y, xMin, xMax, self.buckets())
+        self.line.set_data(xs, ys)
+        self.ax.figure.canvas.draw_idle()
 
 
 #
 # Plot single or multiple variables {"key":[]} on common subplot
+#   bands {"key":(min, max)} are shaded behind the line of the same key
 #
-def plotMultiVar(tStamp, data, title) :
+def plotMultiVar(tStamp, data, title, bands={}) :
 
-    t = [datetime.datetime.fromtimestamp(ts) for ts in tStamp]
+    t = localDatetimes(tStamp)
+    tNum = mdates.date2num(t)
 
     fig = plt.figure()
     ax1 = fig.add_subplot(1, 1, 1)
 
+    ax1.decimatedLines = []     # callbacks are weak references, keep lines alive
     for item in data :
         # print(item)
-        ax1.plot(t, data[item], label=item)
+        if PLOT_DECIMATE :
+            ax1.decimatedLines.append(DecimatedLine(ax1, tNum, data[item], label=item))
+            color = ax1.decimatedLines[-1].line.get_color()
+        else :
+            color = ax1.plot(tNum, data[item], label=item)[0].get_color()
         # ax1.plot(t, data[item], marker='d', label=item)
 
+        if item in bands :
+            ax1.fill_between(tNum, bands[item][0], bands[item][1], color=color, alpha=0.25, linewidth=0)
+
     ax1.set_title(title)
     #ax1.set_xlabel('Time')
     ax1.set_ylabel('Depth')
@@ -111,21 +418,274 @@ def plotMultiVar(tStamp, data, title) :
 
     ax1.grid(which='both')
 
+    ax1.xaxis_date()
     plt.gcf().autofmt_xdate()    # slant labels
     dateFmt = mdates.DateFormatter('%Y-%m-%d %H:%M')
     plt.gca().xaxis.set_major_formatter(dateFmt)
 
     # plt.show(block=False)
 
+    return fig, ax1
+
+
+#
+# Numpy array that grows in place, amortized O(1) per appended row
+#
+class GrowingArray :
+    def __init__(self, ncols, capacity=4096) :
+        self.buf = np.empty((capacity, ncols))
+        self.n = 0
+
+    def extend(self, rows) :
+        need = self.n + len(rows)
+        if need > len(self.buf) :
+            buf = np.empty((max(need, 2 * len(self.buf)), self.buf.shape[1]))
+            buf[:self.n] = self.buf[:self.n]
+            self.buf = buf
+        self.buf[self.n:need] = rows
+        self.n = need
+
+    def clear(self) :
+        self.n = 0
+
+    def view(self) :
+        return self.buf[:self.n]
+
+
+#
+# Follows a growing csv log from the last read offset.
+#   poll() returns only rows appended since the previous call. A partial last
+#   line is kept until it is completed. If the file shrinks (rotated or
+#   truncated) it is read again from the start and poll() reports a reset.
+#
+class CsvTail :
+    def __init__(self, filename) :
+        self.filename = filename
+        self.hdr = None
+        self.offset = 0
+        self.partial = b''
+
+    def poll(self) :
+        reset = False
+        try :
+            size = os.path.getsize(self.filename)
+        except OSError :
+            return reset, np.empty(0), None
+
+        if size < self.offset :
+            self.hdr = None
+            self.offset = 0
+            self.partial = b''
+            reset = True
+
+        tChunks = []
+        vChunks = []
+        with open(self.filename, 'rb') as csvfile :
+            csvfile.seek(self.offset)
+            while self.offset < size :
+                block = csvfile.read(min(LIVE_READ_BYTES, size - self.offset))
+                if not block :
+                    break
+                self.offset += len(block)
+
+                lines = (self.partial + block).split(b'\n')
+                self.partial = lines.pop()       # incomplete last line, empty if block ended on newline
+
+                if self.hdr is None and lines :
+                    self.hdr = next(csv.reader([lines.pop(0).decode()]))
+
+                lines = [line.decode() for line in lines if line.strip()]
+                if lines and self.hdr :
+                    chunk = parseCsvLines(lines, [0] + list(range(2, len(self.hdr))))
+                    values = chunk[:, 1:]
+                    values[values == MISSING_VALUE] = np.nan
+                    tChunks.append(chunk[:, 0])
+                    vChunks.append(values)
+
+        if not tChunks :
+            return reset, np.empty(0), None
+
+        return reset, np.concatenate(tChunks), np.concatenate(vChunks)
+
+
+#
+# Live plot of a csv log. New rows are appended to in memory arrays and the
+#   plot lines are updated in place every LIVE_REFRESH_SEC seconds. While the
+#   right edge of the view is at the newest sample the view follows new data.
+#
+def plotLive(filename, refreshSec=LIVE_REFRESH_SEC, windowSec=LIVE_WINDOW_SEC) :
+    tail = CsvTail(filename)
+    reset, tStamp, values = tail.poll()
+    if tail.hdr is None :
+        print("No header in " + filename)
+        return None
+
+    names = tail.hdr[2:]
+    if values is None :
+        values = np.empty((0, len(names)))
+
+    fig, ax1 = plotMultiVar(tStamp, {name : values[:, idx] for idx, name in enumerate(names)}, filename + " (live)")
+
+    store = GrowingArray(len(names) + 1)
+    store.extend(np.column_stack((mdates.date2num(localDatetimes(tStamp)), values)))
+    if store.n :
+        xLast = store.view()[-1, 0]
+        ax1.set_xlim(xLast - windowSec / 86400.0, xLast + 0.02 * windowSec / 86400.0)
+
+    def refresh() :
+        reset, tStamp, values = tail.poll()
+        if reset :
+            store.clear()
+        if not len(tStamp) and not reset :
+            return
+
+        xMin, xMax = ax1.get_xlim()
+        following = (not store.n) or (xMax >= store.view()[-1, 0])
+
+        store.extend(np.column_stack((mdates.date2num(localDatetimes(tStamp)), values)))
+        rows = store.view()
+
+        if ax1.decimatedLines :
+            for idx, line in enumerate(ax1.decimatedLines) :
+                line.setData(rows[:, 0], rows[:, idx + 1])
+        else :
+            for idx, line in enumerate(ax1.get_lines()) :
+                line.set_data(rows[:, 0], rows[:, idx + 1])
+
+        if following and store.n :
+            width = xMax - xMin
+            xLast = rows[-1, 0]
+            ax1.set_xlim(xLast - 0.98 * width, xLast + 0.02 * width)    # re-decimates lines
+        else :
+            for line in ax1.decimatedLines :
+                line.update()
+
+        ax1.relim()
+        ax1.autoscale_view(scalex=False)
+        fig.canvas.draw_idle()
+
+    timer = fig.canvas.new_timer(interval=int(refreshSec * 1000))
+    timer.add_callback(refresh)
+    timer.start()
+    fig.liveTimer = timer       # keep timer alive with the figure
+
+    return fig, ax1
+
+
+#
+# Topic csv logs in a list of files and directories, derived files excluded
+#
+def findTopicFiles(paths) :
+    result = []
+    for path in paths :
+        if os.path.isdir(path) :
+            files = set(glob.glob(os.path.join(path, "*.csv")))
+            # topics written only as swinging door breakpoints, by their log name
+            files |= set(f[:-len(pubCompress.COMPRESS_SUFFIX + ".csv")] + ".csv" for f in files if f.endswith(pubCompress.COMPRESS_SUFFIX + ".csv"))
+            result += sorted(f for f in files if pubRollup.isTopicLog(f))
+        else :
+            result.append(path)
+    return result
+
+
+#
+# Parse a time window "START,END" of "YYYY-mm-dd" or "YYYY-mm-dd HH:MM" local times.
+#   Either side may be empty for an open ended window.
+#
+def parseWindow(window) :
+    result = []
+    for s in window.split(',') :
+        s = s.strip()
+        if not s :
+            result.append(None)
+            continue
+        fmt = '%Y-%m-%d %H:%M' if ':' in s else '%Y-%m-%d'
+        result.append(time.mktime(time.strptime(s, fmt)))
+    if len(result) != 2 :
+        raise ValueError("time window must be START,END: " + window)
+    return tuple(result)
+
+
+#
+# Render one report (batch worker). job is (filename, tStart, tEnd, outdir, fmt)
+#   Returns (output filename, rows plotted, seconds)
+#
+def renderReport(job) :
+    filename, tStart, tEnd, outdir, fmt = job
+    t0 = time.time()
+
+    plt.switch_backend('Agg')
+    hdr, tStamp, data, bands = importBest(filename, tStart=tStart, tEnd=tEnd, verbose=False)
+
+    base = os.path.basename(filename)[:-len(".csv")]
+    if tStart is not None or tEnd is not None :
+        tsFmt = lambda ts : time.strftime('%Y%m%d%H%M', time.localtime(ts)) if ts is not None else ""
+        base += "_" + tsFmt(tStart) + "-" + tsFmt(tEnd)
+    outfile = os.path.join(outdir, base + "." + fmt)
+
+    fig, ax1 = plotMultiVar(tStamp, data, base, bands)
+    if len(tStamp) :
+        fig.savefig(outfile, bbox_inches='tight', dpi=BATCH_DPI)
+    plt.close(fig)
+
+    return outfile if len(tStamp) else None, len(tStamp), time.time() - t0
+
+
+#
+# Headless batch rendering of every file for every time window in a process pool
+#
+def batchReports(paths, windows, outdir=".", fmt=BATCH_FORMAT, processes=None) :
+    plt.switch_backend('Agg')
+    os.makedirs(outdir, exist_ok=True)
+    jobs = [(filename, tStart, tEnd, outdir, fmt) for filename in findTopicFiles(paths) for tStart, tEnd in windows]
+
+    t0 = time.time()
+    nReports = 0
+    nRows = 0
+    with multiprocessing.Pool(processes) as pool :
+        for outfile, rows, sec in pool.imap_unordered(renderReport, jobs) :
+            if outfile :
+                nReports += 1
+                nRows += rows
+                print("{} ({} rows, {:.2f} s)".format(outfile, rows, sec))
+
+    elapsed = time.time() - t0
+    print("{} reports of {} jobs, {} rows in {:.1f} s: {:.1f} reports/s, {:.0f} rows/s on {} processes".format(
+          nReports, len(jobs), nRows, elapsed, nReports / max(elapsed, 1e-9), nRows / max(elapsed, 1e-9), processes or os.cpu_count()))
+
+    return nReports
+
 
 #
 # Plot the files
 #
 if __name__ == "__main__" :
 
+    parser = argparse.ArgumentParser(description="Plot basinMaster csv logs")
+    parser.add_argument("filenames", nargs="*", default=filenames, help="topic csv files")
+    parser.add_argument("--live", action="store_true", help="follow the files and update plots as rows are added")
+    parser.add_argument("--refresh", type=float, default=LIVE_REFRESH_SEC, help="live mode refresh interval (s)")
+    parser.add_argument("--batch", action="store_true", help="render report files without a display, filenames may be directories")
+    parser.add_argument("--window", action="append", default=[], help="batch time window START,END as YYYY-mm-dd[ HH:MM], repeatable")
+    parser.add_argument("--last", type=float, action="append", default=[], help="batch time window of the last N hours, repeatable")
+    parser.add_argument("--outdir", default=".", help="batch output directory")
+    parser.add_argument("--format", default=BATCH_FORMAT, choices=["png", "svg"], help="batch output format")
+    parser.add_argument("--processes", type=int, default=None, help="batch worker processes, default all cores")
+    args = parser.parse_args()
+
+    if args.batch :
+        windows = [parseWindow(w) for w in args.window]
+        windows += [(time.time() - hours * 3600, None) for hours in args.last]
+        batchReports(args.filenames, windows or [(None, None)], args.outdir, args.format, args.processes)
+        sys.exit(0)
+
     # Sump Well Water Depth
-    hdr, tStamp, data = importCsv(filenames)
-    plotMultiVar(tStamp, data, filenames)
+    for filename in args.filenames :
+        if args.live :
+            plotLive(pubCompress.logFilename(filename), args.refresh)
+        else :
+            hdr, tStamp, data, bands = importBest(filename)
+            plotMultiVar(tStamp, data, filename, bands)
 
     plt.show()    # Blocks, user must close plot window
 
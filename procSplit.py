@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+  2026/10/19  BrucesHobbies   Priority lane for urgent records
+  2026/10/19  BrucesHobbies   Child heartbeats and systemd watchdog (sdNotify.py)
+
+
+OVERVIEW:
+    Split of basinMaster into a real-time sampler process and a publisher
+    process, supervised by the parent process.
+
+    - The sampler only reads sensors and runs the pump. It raises its
+      scheduling priority (SCHED_FIFO when run as root, else a lower nice
+      value if permitted) and can be pinned to one CPU core.
+    - The publisher runs pubScribe (csv, email, MQTT, InfluxDB, ...) at a
+      lower priority, so its network calls and garbage collection never run
+      in the sampler's process.
+    - Records go from the sampler to the publisher over a pipe created by
+      the parent before either child starts, so either child can be
+      restarted while the other keeps running. The sampler writes without
+      blocking: a record (at most PIPE_BUF bytes) is written whole or, when
+      the publisher has fallen behind and the pipe is full, dropped and
+      counted. Each record is framed with a sync byte and length and
+      encoded with marshal, which keeps int, float and str types.
+    - A second pipe is a priority lane for urgent records, e.g. a high water
+      measurement. The publisher reads it before the normal lane, so it
+      does not wait behind a backlog of log records.
+    - The supervisor restarts a child that exits after SPLIT_RESTART_SEC.
+    - Each child calls heartbeat() from its main loop. A child that has not
+      done so for SPLIT_HEARTBEAT_SEC, e.g. stuck in a driver call, is
+      killed and restarted. Under systemd the supervisor sends the watchdog
+      notification only while every child is running and responding, so a
+      service that does not recover is restarted by systemd (see sdNotify.py).
+
+    Running this file measures sampler timing jitter with and without a
+    busy publisher:
+        python3 procSplit.py [seconds]
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import signal
+import struct
+import marshal
+import multiprocessing
+
+import sdNotify
+
+
+SPLIT_RT_PRIORITY  = 10        # SCHED_FIFO priority of the sampler when run as root
+SPLIT_SAMPLER_NICE = -10       # nice value of the sampler otherwise, if permitted
+SPLIT_PUBLISH_NICE = 5         # nice value of the publisher
+SPLIT_RESTART_SEC  = 5         # wait before restarting a child that exited
+SPLIT_HEARTBEAT_SEC = 30       # a child without a heartbeat for this long is restarted
+
+FRAME_SYNC = 0xB5
+FRAME_HDR  = struct.Struct("<BH")       # sync, length of the marshal record
+PIPE_BUF   = getattr(select, "PIPE_BUF", 4096)
+
+
+class SampleChannel :
+    def __init__(self) :
+        self.readFd, self.writeFd = os.pipe()
+        self.urgentReadFd, self.urgentWriteFd = os.pipe()     # priority lane, read first
+        os.set_blocking(self.writeFd, False)
+        os.set_blocking(self.urgentWriteFd, False)
+        self.bufs = {self.urgentReadFd: b'', self.readFd: b''}
+        self.sent = 0
+        self.dropped = 0
+        self.resyncs = 0
+
+    #
+    # Sampler side, never blocks. An urgent record is received before any
+    # record still waiting in the normal lane.
+    #
+    def send(self, dest, topic, tsec, data, hdr="", urgent=False) :
+        body = marshal.dumps((dest, topic, tsec, data, hdr))
+        frame = FRAME_HDR.pack(FRAME_SYNC, len(body)) + body
+        if len(frame) > PIPE_BUF :
+            self.dropped += 1                   # could be split by the kernel
+            return False
+        try :
+            os.write(self.urgentWriteFd if urgent else self.writeFd, frame)
+        except OSError as e :
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK) :
+                raise
+            self.dropped += 1
+            return False
+        self.sent += 1
+        return True
+
+    #
+    # Publisher side, records received within timeout seconds as
+    # [(dest, topic, tsec, data, hdr), ...], urgent records first, empty on timeout
+    #
+    def receive(self, timeout=1.0) :
+        ready, w, x = select.select(list(self.bufs), [], [], timeout)
+        for fd in ready :
+            self.bufs[fd] += os.read(fd, 65536)
+
+        records = []
+        for fd in self.bufs :
+            records += self.frames(fd)
+        return records
+
+    def frames(self, fd) :
+        buf = self.bufs[fd]
+        records = []
+        while len(buf) >= FRAME_HDR.size :
+            sync, length = FRAME_HDR.unpack_from(buf)
+            if sync != FRAME_SYNC :
+                # a previous publisher died part way through a frame
+                self.resyncs += 1
+                i = buf.find(bytes((FRAME_SYNC,)), 1)
+                buf = buf[i:] if i > 0 else b''
+                continue
+            if len(buf) < FRAME_HDR.size + length :
+                break
+            body = buf[FRAME_HDR.size : FRAME_HDR.size + length]
+            buf = buf[FRAME_HDR.size + length:]
+            try :
+                records.append(marshal.loads(body))
+            except (ValueError, EOFError, TypeError) :
+                self.resyncs += 1
+        self.bufs[fd] = buf
+        return records
+
+
+#
+# Raise the scheduling priority of this process and optionally pin it to a core.
+#   Returns a description of what was applied.
+#
+def setRealtime(priority=SPLIT_RT_PRIORITY, cpu=None, nice=SPLIT_SAMPLER_NICE) :
+    applied = []
+    if cpu is not None and hasattr(os, "sched_setaffinity") :
+        try :
+            os.sched_setaffinity(0, {cpu})
+            applied.append("cpu {}".format(cpu))
+        except OSError :
+            pass
+
+    try :
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        applied.append("SCHED_FIFO {}".format(priority))
+    except (AttributeError, OSError) :
+        try :
+            os.nice(nice - os.nice(0))
+            applied.append("nice {}".format(os.nice(0)))
+        except OSError :
+            applied.append("normal priority")
+    return ", ".join(applied)
+
+
+def lowerPriority(nice=SPLIT_PUBLISH_NICE) :
+    try :
+        os.nice(max(nice - os.nice(0), 0))
+    except OSError :
+        pass
+
+
+#
+# Children end on SIGTERM the same way as on CTRL+C
+#
+def interruptOnTerm() :
+    def handler(signum, frame) :
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, handler)
+
+
+#
+# Heartbeat of this child process, shared with the supervisor
+#
+beat = None
+
+def heartbeat() :
+    if beat is not None :
+        beat.value = time.monotonic()
+
+def runChild(function, args, childBeat) :
+    global beat
+    beat = childBeat
+    function(*args)
+
+
+#
+# Run the children and restart any that exits or stops calling heartbeat().
+#   children: {name: (function, args)}, functions run in a child process
+#
+def supervise(children, restartSec=SPLIT_RESTART_SEC, heartbeatSec=SPLIT_HEARTBEAT_SEC) :
+    procs = {}
+    beats = {}
+    restartAt = {name : 0 for name in children}
+    watchdog = sdNotify.Watchdog()
+    ready = False
+
+    def start(name) :
+        function, args = children[name]
+        beats[name] = multiprocessing.Value('d', time.monotonic(), lock=False)     # time to start up
+        p = multiprocessing.Process(target=runChild, args=(function, args, beats[name]), name=name)
+        p.start()
+        procs[name] = p
+        print("Started {} process {}".format(name, p.pid))
+
+    try :
+        while True :
+            healthy = True
+            for name in children :
+                p = procs.get(name)
+                if p is not None and p.is_alive() and time.monotonic() - beats[name].value > heartbeatSec :
+                    print("{} process {} not responding for {:.0f} s, killed".format(name, p.pid, time.monotonic() - beats[name].value))
+                    p.kill()
+                    p.join(5)
+                if p is not None and not p.is_alive() :
+                    print("{} process {} exited with {}, restart in {} s".format(name, p.pid, p.exitcode, restartSec))
+                    restartAt[name] = time.time() + restartSec
+                    del procs[name]
+                if name not in procs and time.time() >= restartAt[name] :
+                    start(name)
+                healthy = healthy and name in procs
+
+            if healthy :
+                if not ready :
+                    sdNotify.notify("READY=1")
+                    ready = True
+                watchdog.kick()
+            time.sleep(0.5)
+
+    except KeyboardInterrupt :
+        pass
+
+    sdNotify.notify("STOPPING=1")
+
+    for p in procs.values() :
+        p.join(10)
+        if p.is_alive() :
+            p.terminate()
+            p.join(5)
+
+
+#
+# Test / debug, timing jitter of a sampler loop while a publisher is busy
+#
+def _sampler(channel, period, seconds, realtime, results) :
+    if realtime :
+        print("Sampler: " + setRealtime())
+    late = []
+    tNext = time.monotonic()
+    tEnd = tNext + seconds
+    while tNext < tEnd :
+        tNext += period
+        time.sleep(max(tNext - time.monotonic(), 0))
+        late.append(time.monotonic() - tNext)
+        channel.send(["CSV_FILE"], "test/Sample", time.time(), {"Late (ms)": late[-1] * 1000})
+    late.sort()
+    results.put((late[len(late) // 2] * 1000, late[int(len(late) * 0.99)] * 1000, late[-1] * 1000, channel.dropped))
+
+
+def _publisher(channel, busy) :
+    lowerPriority()
+    n = 0
+    tEnd = time.time() + 600
+    while time.time() < tEnd :
+        n += len(channel.receive(0.01))
+        if busy :
+            junk = [str(i) * 10 for i in range(200000)]         # allocation and CPU load
+            del junk
+
+
+if __name__ == '__main__':
+
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    for busy in (False, True) :
+        channel = SampleChannel()
+        results = multiprocessing.Queue()
+        pub = multiprocessing.Process(target=_publisher, args=(channel, busy), daemon=True)
+        pub.start()
+        sampler = multiprocessing.Process(target=_sampler, args=(channel, 0.01, seconds, True, results))
+        sampler.start()
+        p50, p99, worst, dropped = results.get()
+        sampler.join()
+        pub.terminate()
+        print("publisher {}: sampler lateness p50 {:.3f} ms, p99 {:.3f} ms, max {:.3f} ms, {} dropped".format(
+              "busy" if busy else "idle", p50, p99, worst, dropped))
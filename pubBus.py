@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+
+
+OVERVIEW:
+    In-process publish-subscribe bus for pubScribe.
+
+    Callbacks subscribe to topic patterns with MQTT style wildcards:
+        basinMaster/WaterDepth      exactly this topic
+        basinMaster/+               any one level, e.g. basinMaster/Alert
+        basinMaster/#               basinMaster and everything below it
+        #                           every topic
+
+    Patterns are stored in a trie with one node per topic level, so matching
+    a topic walks at most its depth through the trie (times the number of
+    wildcard branches) no matter how many callbacks are subscribed. Matches
+    are cached per topic until the subscriptions change.
+
+    A subscription may be given a destination name (pubScribe MQTT, CSV_FILE,
+    ...). Such a subscriber only receives records whose dest list contains
+    that name. Subscribers without a name receive every matching record.
+
+    callback(topic, tsec, data, hdr)
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import sys
+import time
+import threading
+import traceback
+
+
+class TrieNode :
+    __slots__ = ("children", "subs", "multi")
+
+    def __init__(self) :
+        self.children = {}       # level: TrieNode, including '+'
+        self.subs = []           # subscriptions ending at this node
+        self.multi = []          # subscriptions ending with '#' below this node
+
+
+class Subscription :
+    __slots__ = ("pattern", "callback", "name", "order", "calls", "errors")
+
+    def __init__(self, pattern, callback, name, order) :
+        self.pattern = pattern
+        self.callback = callback
+        self.name = name
+        self.order = order       # subscribers are called in subscription order
+        self.calls = 0
+        self.errors = 0
+
+
+class TopicBus :
+    def __init__(self) :
+        self.root = TrieNode()
+        self.cache = {}                      # topic: [Subscription, ...]
+        self.count = 0
+        self.lock = threading.Lock()         # protects the trie and cache
+
+    #
+    # Subscribe callback to a topic pattern, returns the subscription for unsubscribe()
+    #
+    def subscribe(self, pattern, callback, name=None) :
+        levels = pattern.split('/')
+        if '#' in levels[:-1] or any(('#' in l or '+' in l) and len(l) > 1 for l in levels) :
+            raise ValueError("Invalid topic pattern: " + pattern)
+
+        with self.lock :
+            self.count += 1
+            sub = Subscription(pattern, callback, name, self.count)
+            node = self.root
+            for level in levels[:-1] :
+                node = node.children.setdefault(level, TrieNode())
+            if levels[-1] == '#' :
+                node.multi.append(sub)
+            else :
+                node = node.children.setdefault(levels[-1], TrieNode())
+                node.subs.append(sub)
+            self.cache = {}
+        return sub
+
+    def unsubscribe(self, sub) :
+        with self.lock :
+            levels = sub.pattern.split('/')
+            path = [self.root]
+            for level in levels[:-1] :
+                path.append(path[-1].children.get(level))
+                if path[-1] is None :
+                    return False
+
+            if levels[-1] == '#' :
+                subs = path[-1].multi
+            else :
+                path.append(path[-1].children.get(levels[-1]))
+                if path[-1] is None :
+                    return False
+                subs = path[-1].subs
+            if sub not in subs :
+                return False
+            subs.remove(sub)
+
+            # prune empty nodes
+            for i in range(len(path) - 1, 0, -1) :
+                node = path[i]
+                if node.children or node.subs or node.multi :
+                    break
+                del path[i-1].children[levels[i-1]]
+
+            self.cache = {}
+        return True
+
+    #
+    # Subscriptions matching a topic, in subscription order
+    #
+    def match(self, topic) :
+        subs = self.cache.get(topic)
+        if subs is not None :
+            return subs
+
+        with self.lock :
+            levels = topic.split('/')
+            found = []
+            nodes = [self.root]
+            for level in levels :
+                nextNodes = []
+                for node in nodes :
+                    found += node.multi
+                    for key in (level, '+') :
+                        child = node.children.get(key)
+                        if child is not None :
+                            nextNodes.append(child)
+                nodes = nextNodes
+                if not nodes :
+                    break
+            for node in nodes :
+                found += node.subs
+                found += node.multi          # 'a/#' also matches 'a'
+
+            subs = sorted(set(found), key=lambda s : s.order)
+            self.cache[topic] = subs
+        return subs
+
+    #
+    # Call every matching subscriber. dest is a destination name or list of
+    # names, None delivers to named subscribers too. A failing subscriber is
+    # reported and does not stop the others.
+    #
+    def publish(self, topic, data, hdr="", tsec=None, dest=None) :
+        if tsec is None :
+            tsec = time.time()
+        n = 0
+        for sub in self.match(topic) :
+            if sub.name is not None and dest is not None and sub.name not in dest :
+                continue
+            sub.calls += 1
+            n += 1
+            try :
+                sub.callback(topic, tsec, data, hdr)
+            except Exception :
+                sub.errors += 1
+                print("Subscriber " + (sub.name or sub.pattern) + " failed on " + topic)
+                traceback.print_exc()
+        return n
+
+    def subscriptions(self) :
+        result = []
+        stack = [self.root]
+        while stack :
+            node = stack.pop()
+            result += node.subs + node.multi
+            stack += node.children.values()
+        return result
+
+
+#
+# Test / debug, publish cost against the number of subscribers
+#
+if __name__ == '__main__':
+
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    received = []
+
+    for nSubs in (10, 100, 1000, 10000) :
+        bus = TopicBus()
+        for i in range(nSubs) :
+            bus.subscribe("site{}/sensor/+".format(i), lambda topic, tsec, data, hdr : None)
+        bus.subscribe("site0/#", lambda topic, tsec, data, hdr : received.append(topic))
+        bus.subscribe("+/sensor/WaterDepth", lambda topic, tsec, data, hdr : None, name="CSV_FILE")
+
+        t0 = time.time()
+        for i in range(messages) :
+            bus.publish("site{}/sensor/WaterDepth".format(i % 50), {"ABP (in)": 4.0}, dest=["CSV_FILE"])
+        elapsed = time.time() - t0
+        print("{:6d} subscribers: {:.2f} us per publish".format(nSubs, elapsed / messages * 1e6))
+
+    assert [s.pattern for s in bus.match("site0/sensor/WaterDepth")] == ["site0/sensor/+", "site0/#", "+/sensor/WaterDepth"]
+    assert bus.match("site0") and not bus.match("site1")
+    print("site0/# received {} records".format(len(received)))
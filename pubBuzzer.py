@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+
+
+OVERVIEW:
+    Buzzer driver for the pubScribe BUZZER destination. One PWM channel is
+    created at start and reused, and one scheduler thread plays patterns
+    from a priority queue, so any number of alerts costs no more threads.
+
+    A pattern is the BUZZER record, all keys optional:
+        Frequency   Hz                                   default 700
+        Dutycycle   percent                              default 10
+        Duration    seconds of tone, same as On          default 10
+        On, Off     seconds of tone and of silence per repeat
+        Repeat      number of On/Off repeats             default 1
+        Priority    higher plays first                   default 0
+
+    A pattern of higher Priority than the one playing stops it at once and
+    plays first, the stopped pattern then continues with its remaining
+    repeats. A pattern equal to one already queued or playing is merged with
+    it (the larger Repeat is kept), so an alert storm does not grow the
+    queue. At most BUZZER_MAX_QUEUED patterns wait, beyond that the lowest
+    priority pattern is dropped.
+
+    Test / debug, without a buzzer:
+        python3 pubBuzzer.py
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import sys
+import time
+import heapq
+import threading
+
+
+BUZZER_FREQUENCY  = 700      # Hz
+BUZZER_DUTYCYCLE  = 10       # percent
+BUZZER_DURATION   = 10       # seconds
+BUZZER_MAX_QUEUED = 8        # patterns waiting to play
+
+
+class Pattern :
+    def __init__(self, data, seq) :
+        self.frequency = data.get('Frequency', BUZZER_FREQUENCY)
+        self.dutycycle = data.get('Dutycycle', BUZZER_DUTYCYCLE)
+        self.onSec = data.get('On', data.get('Duration', BUZZER_DURATION))
+        self.offSec = data.get('Off', 0)
+        self.repeat = max(int(data.get('Repeat', 1)), 1)        # repeats left to play
+        self.priority = data.get('Priority', 0)
+        self.seq = seq
+
+    def key(self) :
+        return (self.frequency, self.dutycycle, self.onSec, self.offSec, self.priority)
+
+    # heap order, highest priority first then oldest first
+    def __lt__(self, other) :
+        return (-self.priority, self.seq) < (-other.priority, other.seq)
+
+
+class BuzzerDriver :
+    #
+    # pwm: RPi.GPIO.PWM object for the buzzer pin, or any object with the same methods
+    #
+    def __init__(self, pwm, maxQueued=BUZZER_MAX_QUEUED) :
+        self.pwm = pwm
+        self.maxQueued = maxQueued
+        self.pwm.start(0)                    # silent until a pattern plays
+
+        self.queue = []                      # heap of Pattern
+        self.current = None
+        self.preempt = False
+        self.seq = 0
+        self.cond = threading.Condition()
+
+        # statistics
+        self.played = 0
+        self.merged = 0
+        self.preempted = 0
+        self.dropped = 0
+
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    #
+    # Queue a pattern, returns at once
+    #
+    def play(self, data) :
+        with self.cond :
+            self.seq += 1
+            pattern = Pattern(data, self.seq)
+
+            for other in self.queue + ([self.current] if self.current else []) :
+                if other.key() == pattern.key() :
+                    other.repeat = max(other.repeat, pattern.repeat)
+                    self.merged += 1
+                    return
+
+            if len(self.queue) >= self.maxQueued :
+                lowest = max(self.queue)
+                self.dropped += 1
+                if not pattern < lowest :
+                    return
+                self.queue.remove(lowest)
+                heapq.heapify(self.queue)
+
+            heapq.heappush(self.queue, pattern)
+            if self.current and pattern.priority > self.current.priority :
+                self.preempt = True
+            self.cond.notify()
+
+    #
+    # Silence the buzzer and forget queued patterns
+    #
+    def clear(self) :
+        with self.cond :
+            self.queue = []
+            if self.current :
+                self.current.repeat = 0
+                self.preempt = True
+            self.cond.notify()
+
+    #
+    # Wait on the condition until tEnd, False when stopped or preempted first
+    #
+    def waitUntil(self, tEnd) :
+        while self.running and not self.preempt :
+            remaining = tEnd - time.monotonic()
+            if remaining <= 0 :
+                return True
+            self.cond.wait(remaining)
+        return False
+
+    def run(self) :
+        with self.cond :
+            while self.running :
+                if not self.queue :
+                    self.cond.wait()
+                    continue
+
+                pattern = self.current = heapq.heappop(self.queue)
+                self.preempt = False
+                while pattern.repeat > 0 :
+                    self.pwm.ChangeFrequency(pattern.frequency)
+                    self.pwm.ChangeDutyCycle(pattern.dutycycle)
+                    done = self.waitUntil(time.monotonic() + pattern.onSec)
+                    self.pwm.ChangeDutyCycle(0)
+                    if not done :
+                        break
+                    pattern.repeat -= 1
+                    if pattern.repeat and not self.waitUntil(time.monotonic() + pattern.offSec) :
+                        break
+
+                self.current = None
+                if pattern.repeat > 0 and self.running :
+                    self.preempted += 1
+                    heapq.heappush(self.queue, pattern)     # continues after the higher priority pattern
+                else :
+                    self.played += 1
+
+    def stop(self) :
+        with self.cond :
+            self.running = False
+            self.cond.notify()
+        self.thread.join()
+        self.pwm.stop()
+
+
+#
+# Test / debug, prints the tone changes of a few overlapping patterns and
+# measures an alert storm
+#
+if __name__ == '__main__':
+
+    class PrintPwm :
+        def __init__(self, quiet=False) :
+            self.quiet = quiet
+            self.t0 = time.monotonic()
+            self.changes = 0
+
+        def log(self, s) :
+            self.changes += 1
+            if not self.quiet :
+                print("{:6.2f} s  {}".format(time.monotonic() - self.t0, s))
+
+        def start(self, dc) :
+            self.log("start {}%".format(dc))
+
+        def ChangeFrequency(self, f) :
+            self.log("frequency {} Hz".format(f))
+
+        def ChangeDutyCycle(self, dc) :
+            self.log("duty cycle {}%".format(dc))
+
+        def stop(self) :
+            self.log("stop")
+
+    driver = BuzzerDriver(PrintPwm())
+    driver.play({'Frequency': 500, 'Dutycycle': 20, 'On': 0.2, 'Off': 0.2, 'Repeat': 3})
+    time.sleep(0.3)
+    driver.play({'Frequency': 2000, 'Dutycycle': 50, 'On': 0.1, 'Off': 0.1, 'Repeat': 2, 'Priority': 5})
+    time.sleep(1.5)
+    driver.stop()
+    print("played {}, preempted {}\n".format(driver.played, driver.preempted))
+
+    alerts = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    driver = BuzzerDriver(PrintPwm(quiet=True))
+    threads = threading.active_count()
+    t0 = time.time()
+    for i in range(alerts) :
+        driver.play({'Frequency': 700 + (i % 20) * 100, 'On': 0.01, 'Priority': i % 3})
+    elapsed = time.time() - t0
+    print("{} alerts in {:.2f} s: {:.0f} alerts/s, threads {} -> {}, queued {}, merged {}, dropped {}".format(
+          alerts, elapsed, alerts / elapsed, threads, threading.active_count(), len(driver.queue), driver.merged, driver.dropped))
+    driver.stop()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+  2026/10/19  BrucesHobbies   Breakpoint file helpers for readers of COMPRESS_ONLY logs
+
+
+OVERVIEW:
+    Swinging door compression of logged records, a pubScribe stage that
+    keeps only the breakpoints of a piecewise linear series.
+
+    Each numeric field has an error bound E. From the last stored
+    breakpoint A every sample narrows the range of slopes of a line from A
+    that stays within E of all samples since A (the "door"). When a new
+    sample can no longer be the end of such a line the previous sample is
+    stored as a breakpoint and becomes the new A. All fields of a record are
+    stored together, so a breakpoint is stored when any field needs one.
+
+    Breakpoints are real samples, and linear interpolation between them is
+    within E of every sample that was dropped. A breakpoint is also stored:
+    - for the first sample and, on flush(), the last sample
+    - when a field becomes or stops being missing (-99) or not a number,
+      or a text field changes, so gaps are never interpolated over
+    - at least every maxSec seconds
+
+    interpolate() and expand() rebuild the series from stored breakpoints.
+    pubScribe writes the breakpoints of <topic>.csv to <topic>_sdt.csv, with
+    COMPRESS_ONLY nothing else. Readers find the file to read with
+    logFilename() and rebuild regular samples from it with expandFile().
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import sys
+import csv
+import time
+import bisect
+
+
+MISSING_VALUE    = -99
+COMPRESS_SUFFIX  = "_sdt"          # breakpoints of <topic>.csv are in <topic>_sdt.csv
+EXPAND_STEP_SEC  = 60              # sample spacing rebuilt by expandFile()
+COMPRESS_MAX_SEC = 6 * 3600      # store a breakpoint at least this often
+
+
+def isNumber(v) :
+    return isinstance(v, (int, float)) and not isinstance(v, bool) and v != MISSING_VALUE and v == v
+
+
+class SwingingDoor :
+    #
+    # bounds: {field: error bound}, fields not listed use defaultBound
+    #
+    def __init__(self, bounds=None, defaultBound=0.0, maxSec=COMPRESS_MAX_SEC) :
+        self.bounds = dict(bounds or {})
+        self.defaultBound = defaultBound
+        self.maxSec = maxSec
+
+        self.anchor = None               # (tsec, data) of the last breakpoint
+        self.last = None                 # (tsec, data) of the last sample
+        self.lastStored = True
+        self.key = None                  # fields, which are numbers, and the text values
+        self.lo = {}                     # field: lowest slope from anchor within all doors
+        self.hi = {}
+
+        # statistics
+        self.samples = 0
+        self.stored = 0
+
+    def shape(self, data) :
+        return tuple((k, True) if isNumber(v) else (k, v) for k, v in data.items())
+
+    def restart(self, tsec, data) :
+        self.anchor = (tsec, data)
+        self.lo = dict.fromkeys(self.lo, float("-inf"))
+        self.hi = dict.fromkeys(self.hi, float("inf"))
+
+    #
+    # Add a sample, returns the breakpoints to store now as [(tsec, data), ...]
+    #
+    def add(self, tsec, data) :
+        self.samples += 1
+        out = []
+        key = self.shape(data)
+
+        if self.anchor is None or key != self.key or tsec <= self.last[0] :
+            if self.last is not None and not self.lastStored :
+                out.append(self.last)
+            self.key = key
+            self.lo = {k : float("-inf") for k, num in key if num is True}
+            self.hi = {k : float("inf") for k in self.lo}
+            self.restart(tsec, data)
+            out.append((tsec, data))
+            self.last = (tsec, data)
+            self.lastStored = True
+            self.stored += len(out)
+            return out
+
+        t0, d0 = self.anchor
+        dt = tsec - t0
+        fits = dt < self.maxSec and all(self.lo[k] <= (data[k] - d0[k]) / dt <= self.hi[k] for k in self.lo)
+
+        if not fits and not self.lastStored :
+            # the previous sample still ends a line within every door
+            out.append(self.last)
+            self.restart(*self.last)
+            t0, d0 = self.anchor
+            dt = tsec - t0
+
+        for k in self.lo :
+            e = self.bounds.get(k, self.defaultBound)
+            v = data[k] - d0[k]
+            self.lo[k] = max(self.lo[k], (v - e) / dt)
+            self.hi[k] = min(self.hi[k], (v + e) / dt)
+
+        self.last = (tsec, data)
+        self.lastStored = False
+        self.stored += len(out)
+        return out
+
+    #
+    # Store the last sample so the series ends where the data does
+    #
+    def flush(self) :
+        if self.last is None or self.lastStored :
+            return []
+        self.lastStored = True
+        self.restart(*self.last)
+        self.stored += 1
+        return [self.last]
+
+    def ratio(self) :
+        return self.samples / float(max(self.stored, 1))
+
+
+#
+# Decoder: value of a field at time t from breakpoint times and values.
+#   Between breakpoints the value is linear, outside it is None. A missing
+#   breakpoint value makes the segments on either side missing.
+#
+def interpolate(tBp, vBp, t) :
+    i = bisect.bisect_left(tBp, t)
+    if i < len(tBp) and tBp[i] == t :
+        return vBp[i]
+    if i == 0 or i == len(tBp) :
+        return None
+    v0, v1 = vBp[i-1], vBp[i]
+    if not isNumber(v0) or not isNumber(v1) :
+        return None
+    return v0 + (v1 - v0) * (t - tBp[i-1]) / (tBp[i] - tBp[i-1])
+
+
+#
+# Rebuild a series at the given times.
+#   breakpoints: [(tsec, {field: value}), ...] in time order
+#   Returns {field: [value or None per time]}
+#
+def expand(breakpoints, times) :
+    tBp = [t for t, data in breakpoints]
+    fields = []
+    for t, data in breakpoints :
+        fields += [k for k in data if k not in fields]
+    result = {}
+    for k in fields :
+        vBp = [data.get(k) for t, data in breakpoints]
+        result[k] = [interpolate(tBp, vBp, t) for t in times]
+    return result
+
+
+#
+# Breakpoint file of a topic csv log
+#
+def sdtFilename(filename) :
+    return filename[:-len(".csv")] + COMPRESS_SUFFIX + ".csv"
+
+
+#
+# True for a breakpoint file, also when rotated on schema drift (<name>_sdt.YYYYMMDD-HHMMSS.csv)
+#
+def isSdtFilename(filename) :
+    return os.path.basename(filename).split('.')[0].endswith(COMPRESS_SUFFIX)
+
+
+#
+# File to read a topic csv log from: the log itself, or its breakpoint file
+#   when only that one exists (pubScribe COMPRESS_ONLY)
+#
+def logFilename(filename) :
+    if not os.path.isfile(filename) and os.path.isfile(sdtFilename(filename)) :
+        return sdtFilename(filename)
+    return filename
+
+
+#
+# Read the breakpoints of a breakpoint csv file between tStart and tEnd, plus
+#   the one on either side so the series is rebuilt up to the window edges.
+#   Returns fields, [(tsec, {field: float or text}), ...]
+#
+def readBreakpoints(filename, tStart=None, tEnd=None) :
+    breakpoints = []
+    with open(filename, 'r', newline='') as f :
+        reader = csv.reader(f)
+        fields = next(reader, [])[2:]
+        for row in reader :
+            try :
+                tsec = float(row[0])
+            except (ValueError, IndexError) :
+                continue
+            if tStart is not None and tsec < tStart :
+                breakpoints = []
+            data = {}
+            for k, v in zip(fields, row[2:]) :
+                try :
+                    data[k] = float(v)
+                except ValueError :
+                    data[k] = v
+            breakpoints.append((tsec, data))
+            if tEnd is not None and tsec > tEnd :
+                break
+    return fields, breakpoints
+
+
+#
+# Rebuild a breakpoint csv file as samples every stepSec seconds, plus the
+#   breakpoints themselves so stored extremes are kept exactly.
+#   tStart, tEnd limit the time window.
+#   Returns fields, times, {field: [value or None per time]}
+#
+def expandFile(filename, stepSec=EXPAND_STEP_SEC, tStart=None, tEnd=None) :
+    fields, breakpoints = readBreakpoints(filename, tStart, tEnd)
+    if not breakpoints :
+        return fields, [], {k : [] for k in fields}
+
+    t0 = breakpoints[0][0] if tStart is None else max(tStart, breakpoints[0][0])
+    t1 = breakpoints[-1][0] if tEnd is None else min(tEnd, breakpoints[-1][0])
+    times = set(t for t, data in breakpoints if t0 <= t <= t1)
+    t = (t0 // stepSec + 1) * stepSec
+    while t < t1 :
+        times.add(t)
+        t += stepSec
+    times = sorted(times)
+
+    values = expand(breakpoints, times)
+    return fields, times, {k : values.get(k, [None] * len(times)) for k in fields}
+
+
+#
+# Test / debug, simulated sump water depth with pump cycles and sensor noise
+#
+if __name__ == '__main__':
+    import random
+
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    bounds = {"Ultrasonic (in)": 0.25, "ABP (in)": 0.1}
+
+    random.seed(1)
+    series = []
+    depth = 4.0
+    t = 1.6e9
+    for i in range(samples) :
+        depth += 0.004                               # slow inflow
+        if depth > 9.0 :
+            depth = 3.0                              # pump cycle
+        us = round(depth + random.gauss(0, 0.05), 2)
+        abp = round(depth + random.gauss(0, 0.02), 2)
+        if i % 5000 == 1234 :
+            us = MISSING_VALUE                       # sensor fault
+        series.append((t, {"Ultrasonic (in)": us, "ABP (in)": abp}))
+        t += 60
+
+    door = SwingingDoor(bounds)
+    t0 = time.time()
+    stored = []
+    for tsec, data in series :
+        stored += door.add(tsec, data)
+    stored += door.flush()
+    elapsed = time.time() - t0
+
+    times = [tsec for tsec, data in series]
+    rebuilt = expand(stored, times)
+    maxErr = {}
+    for k in bounds :
+        errs = [abs(v - data[k]) for v, (tsec, data) in zip(rebuilt[k], series) if isNumber(data[k]) and v is not None]
+        maxErr[k] = round(max(errs), 3)
+        assert maxErr[k] <= bounds[k] + 1e-9
+    missing = sum(1 for v, (tsec, data) in zip(rebuilt["Ultrasonic (in)"], series) if v != data["Ultrasonic (in)"] and not isNumber(data["Ultrasonic (in)"]))
+
+    print("{} samples -> {} breakpoints, {:.1f}x smaller, {:.1f} us per sample".format(
+          door.samples, len(stored), door.ratio(), elapsed / samples * 1e6))
+    print("max error {} (bounds {}), missing samples not kept: {}".format(maxErr, bounds, missing))
@@ -0,0 +1,483 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+  2026/10/19  BrucesHobbies   Rollups used only when they cover the window, open bucket copied under lock
+  2026/10/19  BrucesHobbies   Topics written only as swinging door breakpoints are rebuilt with pubCompress
+
+
+OVERVIEW:
+    Embedded HTTP query service for the csv logs written by pubScribe, so a
+    phone browser can fetch history without copying files off the RPi.
+
+        GET /topics
+            {"basinMaster/WaterDepth": ["Ultrasonic (in)", "ABP (in)"], ...}
+
+        GET /query?topic=basinMaster/WaterDepth&field=ABP (in)&start=-7d&points=300
+            topic    required
+            field    optional, repeat for more, default all numeric fields
+            start    UNIX time or relative to now: -90m, -24h, -7d, default -24h
+            end      UNIX time, relative or now, default now
+            points   number of buckets, default HTTP_POINTS, at most HTTP_MAX_POINTS
+            stats    comma separated from min,max,mean, default all three
+
+            {"topic": ..., "start": ..., "end": ..., "bucketSec": ..., "source": "hour",
+             "t": [bucket start times],
+             "ABP (in)": {"min": [...], "max": [...], "mean": [...]}}
+
+    The range is split into at most points buckets. Each bucket has the min,
+    max and mean of the field, so a week of depth readings is a few kB. The
+    coarsest pubRollup resolution (minute, hour, day) with buckets no larger
+    than the requested ones is merged into the requested buckets. Shorter
+    ranges are read from the raw csv log, found by binary search on time so
+    only the requested rows are read. A topic written only as swinging door
+    breakpoints (<topic>_sdt.csv) is rebuilt from them with pubCompress.
+
+    Bucket edges are aligned to multiples of the bucket size, so repeated
+    queries such as start=-7d give the same response until a new bucket
+    starts. Responses carry an ETag, If-None-Match gets 304 Not Modified,
+    and the last HTTP_CACHE_ENTRIES responses are cached until their source
+    files change. Responses are gzip compressed when the client accepts it.
+
+    Test / debug, serve the csv logs in the current directory:
+        python3 pubHttp.py [port]
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import sys
+import glob
+import gzip
+import json
+import time
+import hashlib
+import threading
+import collections
+import http.server
+import urllib.parse
+
+import pubRollup
+import pubCompress
+
+
+HTTP_POINTS        = 300           # buckets when the query does not say
+HTTP_MAX_POINTS    = 5000
+HTTP_CACHE_ENTRIES = 32            # cached responses
+HTTP_GZIP_BYTES    = 1024          # compress responses larger than this
+
+MISSING_VALUE = -99
+STAT_NAMES    = ["min", "max", "mean"]
+UNITS         = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+class QueryError(Exception) :
+    pass
+
+
+#
+# UNIX time from "1792400000", "now" or "-7d"
+#
+def parseTime(s, now) :
+    s = s.strip()
+    if s == "now" :
+        return now
+    try :
+        if s[-1] in UNITS :
+            return now + float(s[:-1]) * UNITS[s[-1]]
+        return float(s)
+    except (ValueError, IndexError) :
+        raise QueryError("bad time " + s)
+
+
+#
+# Topics with a raw csv log in the current directory and their fields
+#
+def topicFiles() :
+    topics = {}
+    for filename in sorted(glob.glob("*.csv")) :
+        logFile = filename
+        if filename.endswith(pubCompress.COMPRESS_SUFFIX + ".csv") :
+            # written only as swinging door breakpoints (pubScribe COMPRESS_ONLY)
+            filename = filename[:-len(pubCompress.COMPRESS_SUFFIX + ".csv")] + ".csv"
+            if os.path.isfile(filename) :
+                continue
+        elif not pubRollup.isTopicLog(filename) :
+            continue
+        with open(logFile, 'r') as f :
+            header = f.readline().rstrip('\r\n').split(',')
+        topics[filename[:-4].replace('_', '/')] = header[2:]
+    return topics
+
+
+#
+# UNIX time at the start of a raw csv line, None for the header or a cut line
+#
+def lineTime(line) :
+    try :
+        return float(line[:line.index(b',')])
+    except ValueError :
+        return None
+
+
+#
+# Position of the first line of an open binary csv file with time >= tStart
+#
+def seekTime(f, tStart) :
+    f.seek(0, os.SEEK_END)
+    lo, hi = 0, f.tell()
+    while hi - lo > 4096 :
+        mid = (lo + hi) // 2
+        f.seek(mid)
+        f.readline()                                  # rest of the line mid is in
+        t = lineTime(f.readline())
+        if t is None or t >= tStart :
+            hi = mid
+        else :
+            lo = mid
+    f.seek(lo)
+    if lo :
+        f.readline()
+
+
+#
+# Add a sample to the [count, min, max, sum] of its bucket and field
+#
+def addSample(buckets, idx, field, value) :
+    stats = buckets.setdefault(idx, {}).get(field)
+    if stats is None :
+        buckets[idx][field] = [1, value, value, value]
+    else :
+        stats[0] += 1
+        stats[1] = min(stats[1], value)
+        stats[2] = max(stats[2], value)
+        stats[3] += value
+
+
+#
+# Per bucket [count, min, max, sum] of each field from the raw csv log
+#
+def rawBuckets(topic, fields, tStart, bucketSec, nBuckets) :
+    filename = pubCompress.logFilename(pubRollup.topicFilename(topic))
+    if pubCompress.isSdtFilename(filename) :
+        return breakpointBuckets(filename, fields, tStart, bucketSec, nBuckets)
+
+    buckets = {}
+    with open(filename, 'rb') as f :
+        header = f.readline().decode('utf-8').rstrip('\r\n').split(',')
+        columns = [(field, header.index(field)) for field in fields if field in header]
+        tEnd = tStart + bucketSec * nBuckets
+
+        seekTime(f, tStart)
+        for line in f :
+            t = lineTime(line)
+            if t is None or t < tStart :
+                continue
+            if t >= tEnd :
+                break
+            cols = line.decode('utf-8', 'replace').rstrip('\r\n').split(',')
+            idx = int((t - tStart) // bucketSec)
+            for field, col in columns :
+                try :
+                    value = float(cols[col])
+                except (ValueError, IndexError) :
+                    continue
+                if value == MISSING_VALUE :
+                    continue
+                addSample(buckets, idx, field, value)
+    return buckets
+
+
+#
+# Per bucket [count, min, max, sum] of each field from a swinging door
+#   breakpoint file, rebuilt as regular samples by pubCompress.expandFile
+#
+def breakpointBuckets(filename, fields, tStart, bucketSec, nBuckets) :
+    tEnd = tStart + bucketSec * nBuckets
+    names, times, values = pubCompress.expandFile(filename, tStart=tStart, tEnd=tEnd)
+    buckets = {}
+    for field in fields :
+        for t, value in zip(times, values.get(field, [])) :
+            if t < tEnd and pubCompress.isNumber(value) :
+                addSample(buckets, int((t - tStart) // bucketSec), field, value)
+    return buckets
+
+
+#
+# UNIX time of the first data line of a csv file, None when missing or empty
+#
+def firstTime(filename) :
+    try :
+        with open(filename, 'rb') as f :
+            f.readline()                         # header
+            return lineTime(f.readline())
+    except OSError :
+        return None
+
+
+#
+# Per bucket [count, min, max, sum] of each field merged from rollup rows
+#
+def rollupBuckets(topic, fields, resName, tStart, bucketSec, nBuckets) :
+    tEnd = tStart + bucketSec * nBuckets
+    names, rows = pubRollup.readRollup(topic, resName, tStart, tEnd - 1)
+
+    current = pubRollup.openBucket(topic, resName)                # open bucket held in memory, copied
+    if current and tStart <= current[0] < tEnd :
+        rows.append((current[0], current[2]))
+
+    buckets = {}
+    for bucket, bucketStats in rows :
+        idx = int((bucket - tStart) // bucketSec)
+        for field in fields :
+            s = bucketStats.get(field)
+            if s :
+                buckets.setdefault(idx, {})[field] = pubRollup.mergeStats(buckets.get(idx, {}).get(field), s)
+    return buckets
+
+
+#
+# Checked and aligned query: (topic, fields, stats, tStart, bucketSec, nBuckets)
+#
+def plan(params, now=None) :
+    now = time.time() if now is None else now
+    topic = params.get("topic", [""])[0]
+    topics = topicFiles()
+    if topic not in topics :
+        raise QueryError("unknown topic " + topic)
+
+    fields = params.get("field") or topics[topic]
+    stats = params.get("stats", [",".join(STAT_NAMES)])[0].split(",")
+    if not set(stats) <= set(STAT_NAMES) :
+        raise QueryError("stats are " + ",".join(STAT_NAMES))
+    try :
+        points = min(max(int(params.get("points", [HTTP_POINTS])[0]), 1), HTTP_MAX_POINTS)
+    except ValueError :
+        raise QueryError("bad points")
+
+    tStart = parseTime(params.get("start", ["-24h"])[0], now)
+    tEnd = parseTime(params.get("end", ["now"])[0], now)
+    if tEnd <= tStart :
+        raise QueryError("end is before start")
+
+    # aligned buckets, so the same relative query gives the same buckets for a while
+    bucketSec = max(int(-(-(tEnd - tStart) // points)), 1)
+    tStart = int(tStart // bucketSec) * bucketSec
+    nBuckets = int(-(-(tEnd - tStart) // bucketSec))
+    return (topic, tuple(fields), tuple(stats), tStart, bucketSec, nBuckets)
+
+
+#
+# Answer a planned query, returns (response dict, files read)
+#
+def answer(plan) :
+    topic, fields, stats, tStart, bucketSec, nBuckets = plan
+
+    # a rollup is used only when it covers the start of the window, rollups
+    # started after raw logging began do not until rebuilt with pubRollup.py
+    res = pubRollup.selectResolution(bucketSec, 1)
+    source = res[0] if res else "raw"
+    rollupStart = firstTime(pubRollup.rollupFilename(topic, source)) if res else None
+    logFile = pubCompress.logFilename(pubRollup.topicFilename(topic))
+    rawStart = firstTime(logFile)
+    if rollupStart is not None and rollupStart <= max(tStart, rawStart or tStart) :
+        buckets = rollupBuckets(topic, fields, source, tStart, bucketSec, nBuckets)
+        files = [pubRollup.rollupFilename(topic, source), logFile]
+    else :
+        source = "raw"
+        buckets = rawBuckets(topic, fields, tStart, bucketSec, nBuckets)
+        files = [logFile]
+
+    result = {"topic": topic, "start": tStart, "end": tStart + nBuckets * bucketSec,
+              "bucketSec": bucketSec, "source": source, "t": []}
+    for field in fields :
+        result[field] = {name : [] for name in stats}
+
+    for idx in sorted(buckets) :
+        result["t"].append(tStart + idx * bucketSec)
+        for field in fields :
+            s = buckets[idx].get(field)
+            values = {"min": s[1], "max": s[2], "mean": s[3] / s[0]} if s else {}
+            for name in stats :
+                v = values.get(name)
+                result[field][name].append(round(v, 3) if v is not None else None)
+
+    return result, files
+
+
+#
+# Cached, ETag tagged responses. An entry is used while the files it was
+# read from are unchanged, the newest data is always in the raw csv log.
+#
+class QueryCache :
+    def __init__(self, entries=HTTP_CACHE_ENTRIES) :
+        self.entries = entries
+        self.cache = collections.OrderedDict()     # plan: (files, stamp, etag, body, gzipBody)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def stamp(self, files) :
+        stamp = []
+        for filename in files :
+            try :
+                st = os.stat(filename)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except OSError :
+                stamp.append(None)
+        return tuple(stamp)
+
+    #
+    # Returns (etag, body, gzipBody) for the parsed query string
+    #
+    def get(self, params, now=None) :
+        key = plan(params, now)
+
+        with self.lock :
+            entry = self.cache.get(key)
+            if entry and entry[1] == self.stamp(entry[0]) :
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return entry[2:]
+            self.misses += 1
+
+        result, files = answer(key)
+        body = json.dumps(result, separators=(',', ':')).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        gzBody = gzip.compress(body, 6) if len(body) > HTTP_GZIP_BYTES else None
+
+        with self.lock :
+            self.cache[key] = (files, self.stamp(files), etag, body, gzBody)
+            while len(self.cache) > self.entries :
+                self.cache.popitem(last=False)
+        return etag, body, gzBody
+
+
+class QueryHandler(http.server.BaseHTTPRequestHandler) :
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True         # headers and body are separate writes on kept alive connections
+    cache = None
+
+    def do_GET(self) :
+        url = urllib.parse.urlsplit(self.path)
+        try :
+            if url.path == "/topics" :
+                body = json.dumps(topicFiles()).encode('utf-8')
+                self.send(200, body)
+            elif url.path == "/query" :
+                etag, body, gzBody = self.cache.get(urllib.parse.parse_qs(url.query))
+                if self.headers.get("If-None-Match") == etag :
+                    self.send(304, b"", etag)
+                elif gzBody and "gzip" in self.headers.get("Accept-Encoding", "") :
+                    self.send(200, gzBody, etag, "gzip")
+                else :
+                    self.send(200, body, etag)
+            else :
+                self.send(404, b'{"error":"use /topics or /query"}')
+        except QueryError as e :
+            self.send(400, json.dumps({"error": str(e)}).encode('utf-8'))
+        except (IOError, ValueError) as e :
+            self.send(500, json.dumps({"error": str(e)}).encode('utf-8'))
+
+    def send(self, code, body, etag=None, encoding=None) :
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")             # always revalidate with the ETag
+        if etag :
+            self.send_header("ETag", etag)
+        if encoding :
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) :
+        pass
+
+
+class QueryServer :
+    def __init__(self, host="0.0.0.0", port=8080, cacheEntries=HTTP_CACHE_ENTRIES) :
+        handler = type("Handler", (QueryHandler,), {"cache": QueryCache(cacheEntries)})
+        self.server = http.server.ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.cache = handler.cache
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) :
+        self.server.shutdown()
+        self.server.server_close()
+
+
+#
+# Test / debug, serve the current directory, or with --bench measure a week query on a generated log
+#
+if __name__ == '__main__':
+
+    if "--bench" in sys.argv :
+        import tempfile
+        import http.client
+
+        os.chdir(tempfile.mkdtemp())
+        topic = "basinMaster/WaterDepth"
+        t0 = int(time.time()) - 30 * 86400
+        with open(pubRollup.topicFilename(topic), 'w') as f :
+            f.write("UNIX time (s),DateTime,Ultrasonic (in),ABP (in)\n")
+            for i in range(30 * 1440) :
+                f.write("{},x,{:.2f},{:.2f}\n".format(t0 + i * 60, 4 + (i % 600) / 100.0, 4.1 + (i % 600) / 100.0))
+        pubRollup.rebuild(topic)
+        rawBytes = os.path.getsize(pubRollup.topicFilename(topic))
+
+        server = QueryServer("127.0.0.1", 0)
+        conn = http.client.HTTPConnection("127.0.0.1", server.server.server_address[1])
+        for qs in ["topic={}&start=-7d&points=300".format(topic), "topic={}&start=-3h&points=300".format(topic)] :
+            for attempt in ("first", "cached", "conditional") :
+                headers = {"Accept-Encoding": "gzip"}
+                if attempt == "conditional" :
+                    headers["If-None-Match"] = etag
+                t = time.time()
+                conn.request("GET", "/query?" + urllib.parse.quote(qs, safe="=&"), headers=headers)
+                resp = conn.getresponse()
+                body = resp.read()
+                ms = (time.time() - t) * 1000
+                etag = resp.getheader("ETag")
+                print("{:40s} {:11s} {} {:6d} bytes {:7.2f} ms".format(qs[len("topic=" + topic) + 1:], attempt, resp.status, len(body), ms))
+            result, files = answer(plan(urllib.parse.parse_qs(qs)))
+            print("    source {}, {} buckets of {} s".format(result["source"], len(result["t"]), result["bucketSec"]))
+        print("cache hits {}, misses {}, raw log {:.1f} MB".format(server.cache.hits, server.cache.misses, rawBytes / 1e6))
+        server.stop()
+        sys.exit(0)
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+    server = QueryServer(port=port)
+    print("Serving {} on port {}, try /topics or /query?topic=...&start=-7d".format(os.getcwd(), port))
+    try :
+        while True :
+            time.sleep(1)
+    except KeyboardInterrupt :
+        server.stop()
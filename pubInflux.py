@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+  2026/10/19  BrucesHobbies   4xx responses other than 429 drop the batch instead of retrying it
+  2026/10/19  BrucesHobbies   InfluxRejected is a pubOutbox.PermanentError, the outbox keeps the records
+
+
+OVERVIEW:
+    InfluxDB destination for pubScribe using the InfluxDB 1.x HTTP /write
+    endpoint and line protocol. No influxdb python package is required.
+
+    A record published to topic "basinMaster/WaterDepth" with data
+    {"Ultrasonic (in)": 4.2, "ABP (in)": 4.35} becomes the line:
+
+        WaterDepth,topic=basinMaster/WaterDepth,host=rpi Ultrasonic\ (in)=4.2,ABP\ (in)=4.35 1634567890123
+
+    measurement = last level of the topic
+    tags        = topic, host name and INFLUX_TAGS from pubScribe
+    fields      = dict keys (or hdr columns for lists), -99 values are left out
+                  str records are written as the string field "msg"
+
+    Lines are held in a buffer and sent in one gzip compressed POST when
+    batchRows lines are waiting or the oldest line is batchSec seconds old.
+    The HTTP connection is kept open between posts. If a post fails with a
+    network error, a 5xx or a 429 (too many requests) response the lines
+    stay in the buffer (up to maxBuffer lines, oldest dropped first) and are
+    sent with the next flush. Any other 4xx response, e.g. a bad line or an
+    unknown database, will not succeed on retry, so the response is printed
+    and the batch is dropped. Through pubOutbox (write()) it raises
+    InfluxRejected, a pubOutbox.PermanentError, and the outbox moves the
+    refused records to its rejected file instead.
+
+    Running this file starts a local HTTP stand-in for InfluxDB and measures
+    write throughput:
+        python3 pubInflux.py [records]
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import sys
+import time
+import gzip
+import socket
+import threading
+import http.client
+import urllib.parse
+import collections
+
+import pubOutbox
+
+
+INFLUX_BATCH_ROWS  = 1000      # post when this many lines are buffered
+INFLUX_BATCH_SEC   = 10        # post when the oldest buffered line is this old
+INFLUX_MAX_BUFFER  = 100000    # lines kept while the server is unreachable
+INFLUX_GZIP        = 1         # gzip compress posts
+INFLUX_TIMEOUT     = 10        # seconds
+
+MISSING_VALUE = -99
+
+
+class InfluxRejected(http.client.HTTPException, pubOutbox.PermanentError) :
+    pass
+
+
+#
+# Line protocol escaping
+#
+def escapeKey(s) :
+    return str(s).replace('\\', '\\\\').replace(',', '\\,').replace('=', '\\=').replace(' ', '\\ ')
+
+
+def escapeMeasurement(s) :
+    return str(s).replace('\\', '\\\\').replace(',', '\\,').replace(' ', '\\ ')
+
+
+def fieldValue(v) :
+    if isinstance(v, bool) :
+        return "true" if v else "false"
+    if isinstance(v, (int, float)) :
+        return repr(float(v))
+    return '"' + str(v).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+#
+# Encode one record as a line of line protocol, None if it has no fields
+#
+def encodeLine(topic, tsec, data, hdr="", tags={}) :
+    if isinstance(data, dict) :
+        items = data.items()
+    elif isinstance(data, list) :
+        names = hdr.split(',') if hdr else []
+        names += ["col" + str(idx) for idx in range(len(names) + 1, len(data) + 1)]
+        items = zip(names, data)
+    else :
+        items = [("msg", str(data))]
+
+    fields = ",".join(escapeKey(k) + "=" + fieldValue(v) for k, v in items
+                      if v is not None and not (isinstance(v, (int, float)) and v == MISSING_VALUE))
+    if not fields :
+        return None
+
+    measurement = escapeMeasurement(topic.rsplit('/', 1)[-1] or topic)
+    tagStr = "".join("," + escapeKey(k) + "=" + escapeKey(v) for k, v in sorted(tags.items()) if v != "")
+
+    return measurement + tagStr + " " + fields + " " + str(int(tsec * 1000))
+
+
+class InfluxWriter :
+    def __init__(self, host, port, dbname, user="", password="", tags={},
+                 batchRows=INFLUX_BATCH_ROWS, batchSec=INFLUX_BATCH_SEC, maxBuffer=INFLUX_MAX_BUFFER,
+                 compress=INFLUX_GZIP) :
+        self.host = host
+        self.port = port
+        self.tags = dict(tags)
+        self.tags.setdefault("host", socket.gethostname())
+
+        query = {"db": dbname, "precision": "ms"}
+        if user :
+            query["u"] = user
+            query["p"] = password
+        self.path = "/write?" + urllib.parse.urlencode(query)
+
+        self.batchRows = batchRows
+        self.batchSec = batchSec
+        self.maxBuffer = maxBuffer
+        self.compress = compress
+
+        self.conn = None
+        self.lines = collections.deque(maxlen=maxBuffer)
+        self.oldest = None
+        self.retryAt = 0                   # no size triggered posts before this time after a failure
+        self.lock = threading.Lock()       # protects lines, oldest
+        self.sendLock = threading.Lock()   # one post at a time
+
+        # statistics
+        self.linesSent = 0
+        self.bytesSent = 0
+        self.posts = 0
+        self.errors = 0
+        self.dropped = 0
+        self.rejected = 0
+
+        self.running = True
+        self.thread = threading.Thread(target=self.flushLoop, daemon=True)
+        self.thread.start()
+
+    #
+    # Queue one record
+    #
+    def add(self, topic, tsec, data, hdr="") :
+        line = encodeLine(topic, tsec, data, hdr, dict(self.tags, topic=topic))
+        if line is None :
+            return
+
+        with self.lock :
+            if len(self.lines) == self.maxBuffer :
+                self.dropped += 1              # oldest line is discarded by the deque
+            self.lines.append(line)
+            if self.oldest is None :
+                self.oldest = time.time()
+            full = len(self.lines) >= self.batchRows and time.time() >= self.retryAt
+
+        if full :
+            self.flush()
+
+    #
+    # Post buffered lines, returns True when the buffer was sent or rejected
+    #
+    def flush(self) :
+        with self.sendLock :
+            with self.lock :
+                lines = list(self.lines)
+                self.lines.clear()
+                self.oldest = None
+
+            if not lines :
+                return True
+
+            try :
+                self.post(lines)
+                self.linesSent += len(lines)
+                return True
+
+            except InfluxRejected as e :
+                self.reject(lines, e)
+                return True
+
+            except (OSError, http.client.HTTPException) as e :
+                self.errors += 1
+                print("InfluxDB write failed: " + str(e))
+                self.close()
+
+                with self.lock :       # keep for the next flush, newest lines win
+                    lines += self.lines
+                    self.dropped += max(len(lines) - self.maxBuffer, 0)
+                    self.lines = collections.deque(lines[-self.maxBuffer:], maxlen=self.maxBuffer)
+                    self.oldest = time.time()
+                    self.retryAt = self.oldest + self.batchSec
+                return False
+
+    #
+    # Post records now, raises an exception on failure, InfluxRejected when a
+    #   retry can not succeed (used by pubOutbox). records are dicts with
+    #   topic, t, data and hdr
+    #
+    def write(self, records) :
+        lines = []
+        for r in records :
+            line = encodeLine(r["topic"], r["t"], r["data"], r.get("hdr", ""), dict(self.tags, topic=r["topic"]))
+            if line is not None :
+                lines.append(line)
+
+        with self.sendLock :
+            try :
+                if lines :
+                    self.post(lines)
+            except InfluxRejected :
+                self.rejected += len(lines)
+                raise
+            except (OSError, http.client.HTTPException) :
+                self.errors += 1
+                self.close()
+                raise
+        self.linesSent += len(lines)
+
+    def post(self, lines) :
+        body = ("\n".join(lines) + "\n").encode('utf-8')
+        headers = {"Content-Type": "text/plain; charset=utf-8"}
+        if self.compress :
+            body = gzip.compress(body, 5)
+            headers["Content-Encoding"] = "gzip"
+
+        if self.conn is None :
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=INFLUX_TIMEOUT)
+
+        self.conn.request("POST", self.path, body, headers)
+        response = self.conn.getresponse()
+        text = response.read()
+        if response.status not in (200, 204) :
+            message = "HTTP " + str(response.status) + " " + text.decode('utf-8', 'replace')
+            if 400 <= response.status < 500 and response.status != 429 :
+                raise InfluxRejected(message)
+            raise http.client.HTTPException(message)
+
+        self.posts += 1
+        self.bytesSent += len(body)
+
+    def reject(self, lines, e) :
+        self.rejected += len(lines)
+        print("InfluxDB rejected {} lines, dropped: {}".format(len(lines), e))
+
+    def flushLoop(self) :
+        while self.running :
+            time.sleep(1)
+            with self.lock :
+                due = self.oldest is not None and (time.time() - self.oldest) >= self.batchSec
+            if due :
+                self.flush()
+
+    def close(self) :
+        if self.conn is not None :
+            self.conn.close()
+            self.conn = None
+
+    def stop(self) :
+        self.running = False
+        self.flush()
+        self.close()
+
+
+#
+# Local HTTP stand-in for the InfluxDB /write endpoint, counts lines received
+#
+def startStandIn(port=0) :
+    import http.server
+
+    class WriteHandler(http.server.BaseHTTPRequestHandler) :
+        protocol_version = "HTTP/1.1"
+        linesReceived = 0
+
+        def do_POST(self) :
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.headers.get("Content-Encoding") == "gzip" :
+                body = gzip.decompress(body)
+            WriteHandler.linesReceived += body.count(b"\n")
+            self.send_response(204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args) :
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), WriteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, WriteHandler
+
+
+#
+# Test / debug, throughput against the local stand-in
+#
+if __name__ == '__main__':
+
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    server, handler = startStandIn()
+    writer = InfluxWriter("127.0.0.1", server.server_address[1], "sensor_data")
+
+    t0 = time.time()
+    for i in range(records) :
+        writer.add("basinMaster/WaterDepth", t0 + i, {"Ultrasonic (in)": 4.0 + (i % 10) / 10.0, "ABP (in)": 4.25})
+    writer.stop()
+    elapsed = time.time() - t0
+
+    print("{} records in {:.2f} s: {:.0f} records/s, {} posts, {:.1f} bytes/record, {} received".format(
+          records, elapsed, records / elapsed, writer.posts, writer.bytesSent / max(writer.linesSent, 1), handler.linesReceived))
+
+    server.shutdown()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+  2026/10/19  BrucesHobbies   Long topics are cut on a UTF-8 character boundary
+
+
+OVERVIEW:
+    IP_PORT destination for pubScribe. Sends records over TCP to a
+    fleetCollector.py service that gathers data from many basinMaster RPis
+    without an MQTT broker.
+
+    Frames are length prefixed binary, big endian:
+        frame   = length (u32, bytes after this field), version (u8), type (u8), payload
+        HELLO   = site name (utf-8)                      sent once per connection
+        BATCH   = batch seq (u32), count (u16), records
+        ACK     = batch seq (u32)                        collector -> client, after commit
+
+    record  = topic length (u8), topic, UNIX time (f64), kind (u8), body
+        kind 0: numeric dict  count (u8), then per field: key length (u8), key, value (f64)
+        kind 1: other         length (u32), JSON [data, hdr]
+
+    The client sends a batch and waits for its ACK, so records are only
+    dropped from the client once the collector has committed them. On any
+    error the connection is closed and opened again on the next send.
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import sys
+import time
+import json
+import struct
+import socket
+import threading
+import collections
+
+
+IP_PORT_VERSION    = 1
+IP_PORT_BATCH_ROWS = 100       # records per batch
+IP_PORT_BATCH_SEC  = 10        # send a partial batch after this many seconds
+IP_PORT_MAX_BUFFER = 100000    # records kept while the collector is unreachable
+IP_PORT_TIMEOUT    = 10        # seconds for connect and ACK
+
+HELLO = 1
+BATCH = 2
+ACK   = 3
+
+FRAME_HDR = struct.Struct(">IBB")
+BATCH_HDR = struct.Struct(">IH")
+SEQ       = struct.Struct(">I")
+DOUBLE    = struct.Struct(">d")
+
+
+#
+# Encoding
+#
+def encodeFrame(ftype, payload) :
+    return FRAME_HDR.pack(len(payload) + 2, IP_PORT_VERSION, ftype) + payload
+
+
+#
+# UTF-8 bytes of s cut to at most n bytes on a character boundary
+#
+def utf8Prefix(s, n) :
+    b = s.encode('utf-8')
+    if len(b) <= n :
+        return b
+    return b[:n].decode('utf-8', 'ignore').encode('utf-8')
+
+
+def encodeRecord(topic, tsec, data, hdr="") :
+    t = utf8Prefix(topic, 255)
+    parts = [bytes((len(t),)), t, DOUBLE.pack(tsec)]
+
+    numeric = isinstance(data, dict) and len(data) < 256 and all(
+        isinstance(v, (int, float)) and not isinstance(v, bool) and len(str(k).encode('utf-8')) < 256 for k, v in data.items())
+
+    if numeric :
+        parts.append(bytes((0, len(data))))
+        for k, v in data.items() :
+            key = str(k).encode('utf-8')
+            parts += [bytes((len(key),)), key, DOUBLE.pack(v)]
+    else :
+        body = json.dumps([data, hdr]).encode('utf-8')
+        parts += [b'\x01', SEQ.pack(len(body)), body]
+
+    return b''.join(parts)
+
+
+def encodeBatch(seq, records) :
+    # records: list of (topic, tsec, data, hdr)
+    return encodeFrame(BATCH, BATCH_HDR.pack(seq, len(records)) + b''.join(encodeRecord(*r) for r in records))
+
+
+#
+# Decoding, returns (seq, [(topic, tsec, data, hdr), ...])
+#
+def decodeBatch(payload) :
+    seq, count = BATCH_HDR.unpack_from(payload, 0)
+    pos = BATCH_HDR.size
+    records = []
+    for i in range(count) :
+        n = payload[pos]
+        topic = payload[pos+1 : pos+1+n].decode('utf-8')
+        pos += 1 + n
+        tsec = DOUBLE.unpack_from(payload, pos)[0]
+        kind = payload[pos + 8]
+        pos += 9
+
+        if kind == 0 :
+            nFields = payload[pos]
+            pos += 1
+            data = {}
+            for j in range(nFields) :
+                n = payload[pos]
+                key = payload[pos+1 : pos+1+n].decode('utf-8')
+                pos += 1 + n
+                data[key] = DOUBLE.unpack_from(payload, pos)[0]
+                pos += 8
+            hdr = ""
+        else :
+            n = SEQ.unpack_from(payload, pos)[0]
+            data, hdr = json.loads(payload[pos+4 : pos+4+n].decode('utf-8'))
+            pos += 4 + n
+
+        records.append((topic, tsec, data, hdr))
+    return seq, records
+
+
+def recvExact(sock, n) :
+    buf = b''
+    while len(buf) < n :
+        chunk = sock.recv(n - len(buf))
+        if not chunk :
+            raise IOError("connection closed")
+        buf += chunk
+    return buf
+
+
+class IpPortClient :
+    def __init__(self, host, port, site=None, batchRows=IP_PORT_BATCH_ROWS, batchSec=IP_PORT_BATCH_SEC,
+                 maxBuffer=IP_PORT_MAX_BUFFER) :
+        self.host = host
+        self.port = port
+        self.site = site or socket.gethostname()
+        self.batchRows = batchRows
+        self.batchSec = batchSec
+
+        self.sock = None
+        self.seq = 0
+        self.sendLock = threading.Lock()     # one batch on the wire at a time
+
+        self.records = collections.deque(maxlen=maxBuffer)
+        self.oldest = None
+        self.retryAt = 0
+        self.lock = threading.Lock()         # protects records, oldest
+
+        # statistics
+        self.sent = 0
+        self.errors = 0
+        self.dropped = 0
+
+        self.running = True
+        threading.Thread(target=self.flushLoop, daemon=True).start()
+
+    def connect(self) :
+        self.sock = socket.create_connection((self.host, self.port), IP_PORT_TIMEOUT)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.sendall(encodeFrame(HELLO, self.site.encode('utf-8')))
+
+    def close(self) :
+        if self.sock is not None :
+            try :
+                self.sock.close()
+            except OSError :
+                pass
+            self.sock = None
+
+    #
+    # Send records and wait for the collector's ACK, raises on failure.
+    #   records are dicts with topic, t, data and hdr (pubOutbox) or tuples
+    #
+    def deliver(self, records) :
+        records = [(r["topic"], r["t"], r["data"], r.get("hdr", "")) if isinstance(r, dict) else r for r in records]
+        with self.sendLock :
+            try :
+                if self.sock is None :
+                    self.connect()
+                for i in range(0, len(records), 65535) :
+                    self.seq = (self.seq + 1) & 0xFFFFFFFF
+                    self.sock.sendall(encodeBatch(self.seq, records[i:i+65535]))
+
+                    length, version, ftype = FRAME_HDR.unpack(recvExact(self.sock, FRAME_HDR.size))
+                    payload = recvExact(self.sock, length - 2)
+                    if ftype != ACK or SEQ.unpack(payload)[0] != self.seq :
+                        raise IOError("unexpected reply from collector")
+            except (OSError, struct.error) :
+                self.errors += 1
+                self.close()
+                raise
+        self.sent += len(records)
+
+    #
+    # Queue one record, sent in batches by size or age (no outbox)
+    #
+    def add(self, topic, tsec, data, hdr="") :
+        with self.lock :
+            if len(self.records) == self.records.maxlen :
+                self.dropped += 1
+            self.records.append((topic, tsec, data, hdr))
+            if self.oldest is None :
+                self.oldest = time.time()
+            full = len(self.records) >= self.batchRows and time.time() >= self.retryAt
+        if full :
+            self.flush()
+
+    def flush(self) :
+        with self.lock :
+            records = list(self.records)
+            self.records.clear()
+            self.oldest = None
+        if not records :
+            return True
+
+        try :
+            self.deliver(records)
+            return True
+        except (OSError, struct.error) as e :
+            print("IP_PORT send failed: " + str(e))
+            with self.lock :
+                records += self.records
+                self.dropped += max(len(records) - self.records.maxlen, 0)
+                self.records = collections.deque(records[-self.records.maxlen:], maxlen=self.records.maxlen)
+                self.oldest = time.time()
+                self.retryAt = self.oldest + self.batchSec
+            return False
+
+    def flushLoop(self) :
+        while self.running :
+            time.sleep(1)
+            with self.lock :
+                due = self.oldest is not None and (time.time() - self.oldest) >= self.batchSec
+            if due :
+                self.flush()
+
+    def stop(self) :
+        self.running = False
+        self.flush()
+        self.close()
+
+
+#
+# Test / debug, send a few records to a collector: python3 pubIpPort.py host port
+#
+if __name__ == '__main__':
+
+    host = sys.argv[1] if len(sys.argv) > 1 else "localhost"
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 5555
+
+    client = IpPortClient(host, port)
+    client.deliver([("basinMaster/WaterDepth", time.time(), {"Ultrasonic (in)": 4.2, "ABP (in)": 4.35}, ""),
+                    ("basinMaster/Status", time.time(), "Program start", "")])
+    print("Sent {} records to {}:{} as site {}".format(client.sent, host, port, client.site))
+    client.stop()
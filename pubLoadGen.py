@@ -0,0 +1,372 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+
+
+OVERVIEW:
+    Load generator for the pubScribe fan-out path, to measure how many
+    topics and records per second a RPi sustains before a destination falls
+    behind.
+
+    pubRecord() is called at a fixed rate for each step of --rates with
+    records spread over --topics synthetic topics. Each topic has one kind
+    of payload, dict, list or str, in the proportions of --mix. Records go
+    to every destination in --dests. EMAIL_SMS only receives alert records,
+    at --email-rate per second.
+
+    Destinations are served by local stand-ins, so no network services are
+    needed:
+        MQTT        pubMqtt.startStandIn()
+        INFLUX_DB   pubInflux.startStandIn()
+        IP_PORT     fleetCollector.Collector with a SQLite store
+        EMAIL_SMS   SMTP stand-in with STARTTLS and a self signed certificate
+        CSV_FILE and SQLITE write to files in a scratch directory
+    The stand-ins are threads of this process, so on a RPi they use some of
+    the CPU being measured. Run them on another host for exact limits.
+
+    Every --report seconds one line is printed with:
+        records/s sent
+        pubRecord latency (p50, p99, max)
+        outbox backlog per destination
+        process RSS
+    After the last step a table summarizes each step. A step is marked
+    saturated when it sent less than 95% of its rate or its backlog kept
+    growing.
+
+    Usage:
+        python3 pubLoadGen.py --topics 2000 --rates 100,1000,5000 --duration 30
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import sys
+import ssl
+import time
+import json
+import random
+import socket
+import asyncio
+import argparse
+import datetime
+import tempfile
+import threading
+import socketserver
+
+import pubScribe
+
+
+LOAD_REPORT_SEC = 5          # seconds between report lines
+LOAD_SATURATED  = 0.95       # a step sending less than this part of its rate is saturated
+
+
+#
+# Resident set size in MB, from /proc on Linux
+#
+def rssMB() :
+    try :
+        with open("/proc/self/status") as f :
+            for line in f :
+                if line.startswith("VmRSS:") :
+                    return int(line.split()[1]) / 1024.0
+    except IOError :
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def freePort() :
+    with socket.socket() as s :
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+#
+# Self signed certificate for the SMTP stand-in, smtplib does not verify it
+#
+def selfSignedCert(directory) :
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256()))
+
+    certFile = os.path.join(directory, "standin.crt")
+    keyFile = os.path.join(directory, "standin.key")
+    with open(certFile, 'wb') as f :
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(keyFile, 'wb') as f :
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL,
+                                  serialization.NoEncryption()))
+    return certFile, keyFile
+
+
+#
+# Minimal SMTP stand-in for sendEmail: EHLO, STARTTLS, AUTH PLAIN, MAIL,
+# RCPT, DATA and QUIT. Counts messages.
+#
+def startSmtpStandIn(directory, port=0) :
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(*selfSignedCert(directory))
+
+    class SmtpHandler(socketserver.StreamRequestHandler) :
+        messages = 0
+
+        def reply(self, s) :
+            self.wfile.write((s + "\r\n").encode())
+            self.wfile.flush()
+
+        def handle(self) :
+            tls = False
+            self.reply("220 localhost stand-in")
+            while True :
+                line = self.rfile.readline()
+                if not line :
+                    break
+                cmd = line.decode('utf-8', 'replace').strip().upper()
+
+                if cmd.startswith(("EHLO", "HELO")) :
+                    self.reply("250-localhost\r\n250 AUTH PLAIN" if tls else "250-localhost\r\n250 STARTTLS")
+                elif cmd == "STARTTLS" :
+                    self.reply("220 ready")
+                    self.request = context.wrap_socket(self.request, server_side=True)
+                    self.rfile = self.request.makefile('rb')
+                    self.wfile = self.request.makefile('wb')
+                    tls = True
+                elif cmd.startswith("AUTH") :
+                    self.reply("235 accepted")
+                elif cmd == "DATA" :
+                    self.reply("354 end with .")
+                    while self.rfile.readline() not in (b".\r\n", b".\n", b"") :
+                        pass
+                    SmtpHandler.messages += 1
+                    self.reply("250 queued")
+                elif cmd == "QUIT" :
+                    self.reply("221 bye")
+                    break
+                else :
+                    self.reply("250 ok")
+
+    class Server(socketserver.ThreadingTCPServer) :
+        daemon_threads = True
+        allow_reuse_address = True
+
+    server = Server(("127.0.0.1", port), SmtpHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, SmtpHandler
+
+
+#
+# fleetCollector in its own thread and event loop
+#
+def startCollector(directory) :
+    import pubSqlite
+    import fleetCollector
+
+    store = pubSqlite.SqliteStore(os.path.join(directory, "fleet.db"), batchRows=float("inf"), batchSec=float("inf"))
+    collector = fleetCollector.Collector(store)
+    port = freePort()
+    threading.Thread(target=lambda : asyncio.run(collector.serve("127.0.0.1", port, 0)), daemon=True).start()
+    time.sleep(0.5)
+    return port, collector
+
+
+#
+# Point the enabled destinations at the stand-ins, returns {dest: function() -> records received}
+#
+def startStandIns(dests, directory) :
+    received = {}
+    for name in ("CSV_FILE", "MQTT", "EMAIL_SMS", "INFLUX_DB", "SQLITE", "IP_PORT", "BUZZER") :
+        setattr(pubScribe, name + "_ENABLED", int(name in dests))
+
+    pubScribe.OUTBOX_DIR = os.path.join(directory, "outbox")
+    pubScribe.SQLITE_DBNAME = os.path.join(directory, "load.db")
+
+    if "MQTT" in dests :
+        import pubMqtt
+        server, handler = pubMqtt.startStandIn()
+        pubScribe.MQTT_HOST, pubScribe.MQTT_PORT = server.server_address
+        received["MQTT"] = lambda handler=handler : handler.messages
+
+    if "INFLUX_DB" in dests :
+        import pubInflux
+        server, handler = pubInflux.startStandIn()
+        pubScribe.INFLUX_HOST, pubScribe.INFLUX_PORT = server.server_address
+        received["INFLUX_DB"] = lambda handler=handler : handler.linesReceived
+
+    if "IP_PORT" in dests :
+        port, collector = startCollector(directory)
+        pubScribe.IP_PORT_HOST, pubScribe.IP_PORT_PORT = "127.0.0.1", port
+        received["IP_PORT"] = lambda : collector.records
+
+    if "EMAIL_SMS" in dests :
+        import sendEmail
+        server, handler = startSmtpStandIn(directory)
+        sendEmail.SMTPSERVERTLSPORT = "127.0.0.1:{}".format(server.server_address[1])
+        sendEmail.password_key()
+        with open("emailCfg.json", 'w') as f :
+            json.dump({"token": sendEmail.password_encrypt("load"), "FROM_USERID": "load@localhost",
+                       "ALERT_USERID": "alert@localhost", "STATUS_USERID": "status@localhost"}, f)
+        received["EMAIL_SMS"] = lambda handler=handler : handler.messages
+
+    return received
+
+
+#
+# Synthetic topics, each with one payload kind so csv headers stay stable
+#
+def makeTopics(count, mix) :
+    kinds = random.choices(["dict", "list", "str"], weights=mix, k=count)
+    return [("load/site{:02d}/sensor{:05d}".format(i % 16, i), kind) for i, kind in enumerate(kinds)]
+
+
+def makeRecord(kind, i) :
+    if kind == "dict" :
+        return {"Depth (in)": round(4 + (i % 97) / 10.0, 2), "Temp (C)": round(20 + (i % 13) / 4.0, 2)}, ""
+    if kind == "list" :
+        return [round((i % 89) / 8.0, 3), i % 1000, 0.95, -99], "Current,Count,PF,Spare"
+    return "event {} level {:.1f}".format(i, (i % 50) / 5.0), ""
+
+
+#
+# Outbox backlog by destination
+#
+def backlogs() :
+    return {dest : stats["pending"] for dest, stats in pubScribe.outboxStats().items()}
+
+
+def pct(values, p) :
+    return values[min(int(p * len(values)), len(values) - 1)] * 1000 if values else float("nan")
+
+
+#
+# One step at a fixed rate, returns its summary
+#
+def runStep(rate, duration, topics, dests, emailRate, reportSec) :
+    dataDests = [d for d in dests if d != "EMAIL_SMS"]
+    sent = emails = 0
+    allLatencies = []
+    latencies = []
+    backlogStart = sum(backlogs().values())
+
+    t0 = time.perf_counter()
+    tReport = t0 + reportSec
+    lastSent = 0
+    while True :
+        now = time.perf_counter()
+        if now - t0 >= duration :
+            break
+
+        if now >= tReport :
+            latencies.sort()
+            print("{:5.0f} s {:6.0f} records/s sent, pubRecord p50 {:.3f} p99 {:.3f} max {:.1f} ms, backlog {}, RSS {:.1f} MB".format(
+                  now - t0, (sent - lastSent) / reportSec, pct(latencies, 0.50), pct(latencies, 0.99),
+                  latencies[-1] * 1000 if latencies else 0, backlogs(), rssMB()))
+            allLatencies += latencies
+            latencies = []
+            lastSent = sent
+            tReport += reportSec
+
+        if "EMAIL_SMS" in dests and emails < int((now - t0) * emailRate) :
+            emails += 1
+            pubScribe.pubRecord(pubScribe.EMAIL_SMS, "load/Alert", "Load test alert {}".format(emails))
+
+        due = min(int((now - t0) * rate) - sent, 1000)
+        if due <= 0 :
+            time.sleep(min(0.002, (sent + 1) / rate - (now - t0)))
+            continue
+
+        for i in range(sent, sent + due) :
+            topic, kind = topics[i % len(topics)]
+            data, hdr = makeRecord(kind, i)
+            t = time.perf_counter()
+            pubScribe.pubRecord(dataDests, topic, data, hdr)
+            latencies.append(time.perf_counter() - t)
+        sent += due
+
+    elapsed = time.perf_counter() - t0
+    allLatencies += latencies
+    allLatencies.sort()
+    backlog = sum(backlogs().values())
+    achieved = sent / elapsed
+    saturated = achieved < LOAD_SATURATED * rate or backlog - backlogStart > rate * reportSec
+    return {"rate": rate, "achieved": achieved, "p50": pct(allLatencies, 0.50), "p99": pct(allLatencies, 0.99),
+            "max": allLatencies[-1] * 1000 if allLatencies else 0, "backlog": backlog, "rss": rssMB(),
+            "saturated": saturated}
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Measure pubScribe throughput and latency with many topics")
+    parser.add_argument("--topics", type=int, default=1000, help="number of synthetic topics")
+    parser.add_argument("--rates", default="100,500,2000", help="records/s of each step, comma separated")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per step")
+    parser.add_argument("--mix", default="60,20,20", help="dict,list,str payload weights")
+    parser.add_argument("--dests", default="CSV_FILE,MQTT,INFLUX_DB,SQLITE,IP_PORT,EMAIL_SMS",
+                        help="destinations, comma separated")
+    parser.add_argument("--email-rate", type=float, default=0.2, help="alert emails per second")
+    parser.add_argument("--report", type=float, default=LOAD_REPORT_SEC, help="seconds between report lines")
+    parser.add_argument("--dir", default=None, help="scratch directory for csv, SQLite and outbox files")
+    args = parser.parse_args()
+
+    directory = os.path.abspath(args.dir or tempfile.mkdtemp(prefix="pubLoadGen"))
+    if not os.path.isdir(directory) :
+        os.makedirs(directory)
+    os.chdir(directory)                                  # csv files are written to the current directory
+    print("Scratch directory " + directory)
+
+    dests = [d.strip() for d in args.dests.split(",") if d.strip()]
+    received = startStandIns(dests, directory)
+    topics = makeTopics(args.topics, [float(w) for w in args.mix.split(",")])
+
+    pubScribe.connectPubScribe()
+    print("{} topics, destinations {}, RSS {:.1f} MB".format(len(topics), dests, rssMB()))
+
+    results = []
+    for rate in [float(r) for r in args.rates.split(",")] :
+        print("\n--- {:.0f} records/s for {:.0f} s ---".format(rate, args.duration))
+        results.append(runStep(rate, args.duration, topics, dests, args.email_rate, args.report))
+
+    t = time.time()
+    pubScribe.disconnectPubScribe()                      # waits for the outboxes to drain
+    print("\nDisconnected in {:.1f} s, received by stand-ins: {}".format(
+          time.time() - t, {dest : count() for dest, count in received.items()}))
+
+    print("\n  rate/s  achieved/s  p50 ms  p99 ms   max ms  backlog  RSS MB")
+    for r in results :
+        print("{:8.0f}  {:10.0f}  {:6.3f}  {:6.3f}  {:7.1f}  {:7d}  {:6.1f}  {}".format(
+              r["rate"], r["achieved"], r["p50"], r["p99"], r["max"], r["backlog"], r["rss"],
+              "saturated" if r["saturated"] else ""))
@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+
+
+OVERVIEW:
+    MQTT destination for pubScribe using paho-mqtt.
+
+    - The paho network loop runs in its own thread (loop_start) so keepalive
+      pings, QoS acknowledgements and reconnects happen without pubRecord.
+    - Connection is made with connect_async and lost connections are retried
+      by paho with a backoff from MQTT_RECONNECT_MIN to MQTT_RECONNECT_MAX s.
+    - At most maxInflight QoS 1 messages wait for PUBACK at a time and at most
+      maxQueued more are queued by paho, so a slow broker cannot use up memory.
+    - batchSamples > 1 sends that many samples of a topic in one payload,
+      a JSON list of {"t": UNIX time, "data": record}. A partial batch is sent
+      after batchSec seconds. With batchSamples = 1 the payload is the record
+      itself, as before.
+    - Time from publish to PUBACK is kept for the last 1000 messages and
+      reported by stats().
+
+    Running this file starts a local stand-in for a mosquitto broker and
+    measures publish throughput and latency:
+        python3 pubMqtt.py [messages] [batchSamples]
+
+    Requires:
+        sudo pip3 install paho-mqtt
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import sys
+import time
+import json
+import threading
+import collections
+
+import paho.mqtt.client as mqtt
+
+
+MQTT_RECONNECT_MIN = 1       # seconds
+MQTT_RECONNECT_MAX = 120     # seconds
+MQTT_ACK_TIMEOUT   = 30      # seconds to wait for PUBACKs when delivering for pubOutbox
+
+
+#
+# paho-mqtt 2.x needs the callback API version, 1.x does not have it
+#
+def newClient(clientId="") :
+    if hasattr(mqtt, "CallbackAPIVersion") :
+        return mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, clientId)
+    return mqtt.Client(clientId)
+
+
+def payload(data) :
+    if isinstance(data, str) :
+        return data
+    return json.dumps(data)
+
+
+class MqttPublisher :
+    def __init__(self, host, port=1883, keepalive=45, clientId="", qos=1,
+                 maxInflight=20, maxQueued=10000, batchSamples=1, batchSec=10) :
+        self.qos = qos
+        self.batchSamples = batchSamples
+        self.batchSec = batchSec
+
+        self.connected = threading.Event()
+        self.lock = threading.RLock()         # protects batches, sendTimes
+        self.batches = {}                     # topic: [first sample time, [{"t":, "data":}, ...]]
+        self.sendTimes = {}                   # mid: publish time, for latency
+        self.earlyAcks = {}                   # mid: ack time, acks seen before publish() returned
+        self.latencies = collections.deque(maxlen=1000)
+
+        # statistics
+        self.published = 0
+        self.acked = 0
+        self.rejected = 0                     # not queued, paho queue full
+        self.reconnects = 0
+
+        self.client = newClient(clientId)
+        self.client.on_connect = self.onConnect
+        self.client.on_disconnect = self.onDisconnect
+        self.client.on_publish = self.onPublish
+        self.client.max_inflight_messages_set(maxInflight)
+        self.client.max_queued_messages_set(maxQueued)
+        self.client.reconnect_delay_set(MQTT_RECONNECT_MIN, MQTT_RECONNECT_MAX)
+
+        self.client.connect_async(host, port, keepalive)
+        self.client.loop_start()
+
+        self.running = True
+        if batchSamples > 1 :
+            threading.Thread(target=self.batchLoop, daemon=True).start()
+
+    #
+    # paho callbacks, run on the network thread. Extra arguments differ
+    # between paho callback API versions 1 and 2.
+    #
+    def onConnect(self, client, userdata, flags, rc, *args) :
+        if rc == 0 :
+            if self.published :
+                self.reconnects += 1
+            self.connected.set()
+        else :
+            print("MQTT connect refused: " + str(rc))
+
+    def onDisconnect(self, client, userdata, *args) :
+        self.connected.clear()
+
+    def onPublish(self, client, userdata, mid, *args) :
+        now = time.time()
+        with self.lock :
+            t = self.sendTimes.pop(mid, None)
+            if t is None :
+                self.earlyAcks[mid] = now
+            self.acked += 1
+        if t is not None :
+            self.latencies.append(now - t)
+
+    #
+    # Publish one sample now, returns paho MQTTMessageInfo
+    #
+    def publishNow(self, topic, msg) :
+        t = time.time()
+        info = self.client.publish(topic, msg, self.qos)    # not under self.lock, paho locks inside
+        if info.rc == mqtt.MQTT_ERR_QUEUE_SIZE :
+            self.rejected += 1
+            return info
+
+        with self.lock :
+            ackTime = self.earlyAcks.pop(info.mid, None)     # on_publish can run before publish() returns
+            if ackTime is None :
+                self.sendTimes[info.mid] = t
+            self.published += 1
+        if ackTime is not None :
+            self.latencies.append(ackTime - t)
+        return info
+
+    #
+    # Publish a record, batched per topic when batchSamples > 1
+    #
+    def publish(self, topic, data, tsec=None) :
+        if self.batchSamples <= 1 :
+            return self.publishNow(topic, payload(data))
+
+        with self.lock :
+            batch = self.batches.setdefault(topic, [time.time(), []])
+            batch[1].append({"t": tsec if tsec is not None else time.time(), "data": data})
+            if len(batch[1]) < self.batchSamples :
+                return None
+            samples = self.batches.pop(topic)[1]
+
+        return self.publishNow(topic, json.dumps(samples))
+
+    def flushBatches(self, olderThan=0) :
+        now = time.time()
+        with self.lock :
+            due = [topic for topic, batch in self.batches.items() if now - batch[0] >= olderThan]
+            samples = [(topic, self.batches.pop(topic)[1]) for topic in due]
+        for topic, s in samples :
+            self.publishNow(topic, json.dumps(s))
+
+    def batchLoop(self) :
+        while self.running :
+            time.sleep(1)
+            self.flushBatches(self.batchSec)
+
+    #
+    # Deliver records for pubOutbox. Publishes them, batched per topic, and
+    # waits for the broker to acknowledge. Raises an exception on failure so
+    # the outbox keeps the records.
+    #
+    def deliver(self, records) :
+        if not self.connected.is_set() :
+            raise IOError("MQTT not connected")
+
+        infos = []
+        run = []
+        for i, record in enumerate(records) :
+            run.append(record)
+            last = (i == len(records) - 1) or (records[i+1]["topic"] != record["topic"])
+            if last or len(run) >= self.batchSamples :
+                if self.batchSamples <= 1 :
+                    msg = payload(run[0]["data"])
+                else :
+                    msg = json.dumps([{"t": r["t"], "data": r["data"]} for r in run])
+                info = self.publishNow(record["topic"], msg)
+                if info.rc != mqtt.MQTT_ERR_SUCCESS :
+                    raise IOError("MQTT publish failed: " + mqtt.error_string(info.rc))
+                infos.append(info)
+                run = []
+
+        tEnd = time.time() + MQTT_ACK_TIMEOUT
+        for info in infos :
+            if self.qos :
+                info.wait_for_publish(max(tEnd - time.time(), 0.001))
+                if not info.is_published() :
+                    raise IOError("MQTT publish not acknowledged")
+
+    #
+    # Latency and throughput statistics
+    #
+    def stats(self) :
+        lat = sorted(self.latencies)
+        pct = lambda p : round(lat[min(int(p * len(lat)), len(lat) - 1)] * 1000, 2) if lat else None
+        with self.lock :
+            inflight = len(self.sendTimes)
+        return {"connected": self.connected.is_set(), "published": self.published, "acked": self.acked,
+                "inflight": inflight, "rejected": self.rejected, "reconnects": self.reconnects,
+                "latency50ms": pct(0.50), "latency99ms": pct(0.99)}
+
+    def stop(self) :
+        self.running = False
+        self.flushBatches()
+        self.client.disconnect()
+        self.client.loop_stop()
+
+
+#
+# Minimal MQTT 3.1.1 broker stand-in for benchmarks. Answers CONNECT,
+# PUBLISH (QoS 0 and 1), PINGREQ and DISCONNECT, and counts messages.
+#
+def startStandIn(port=0) :
+    import socketserver
+
+    class BrokerHandler(socketserver.BaseRequestHandler) :
+        messages = 0
+
+        def readPacket(self, rfile) :
+            first = rfile.read(1)
+            if not first :
+                return None, None
+            length = 0
+            shift = 0
+            while True :
+                b = rfile.read(1)[0]
+                length += (b & 0x7F) << shift
+                shift += 7
+                if not (b & 0x80) :
+                    break
+            return first[0], rfile.read(length)
+
+        def handle(self) :
+            rfile = self.request.makefile('rb')
+            while True :
+                ptype, body = self.readPacket(rfile)
+                if ptype is None :
+                    break
+                kind = ptype >> 4
+                if kind == 1 :                          # CONNECT
+                    self.request.sendall(b'\x20\x02\x00\x00')
+                elif kind == 3 :                        # PUBLISH
+                    BrokerHandler.messages += 1
+                    qos = (ptype >> 1) & 3
+                    if qos :
+                        topicLen = (body[0] << 8) + body[1]
+                        pid = body[2 + topicLen : 4 + topicLen]
+                        self.request.sendall(b'\x40\x02' + pid)
+                elif kind == 12 :                       # PINGREQ
+                    self.request.sendall(b'\xd0\x00')
+                elif kind == 14 :                       # DISCONNECT
+                    break
+
+    class Server(socketserver.ThreadingTCPServer) :
+        daemon_threads = True
+        allow_reuse_address = True
+
+    server = Server(("127.0.0.1", port), BrokerHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, BrokerHandler
+
+
+#
+# Test / debug, throughput and latency against the local stand-in
+#
+if __name__ == '__main__':
+
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    batchSamples = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    server, handler = startStandIn()
+    publisher = MqttPublisher("127.0.0.1", server.server_address[1], batchSamples=batchSamples)
+    publisher.connected.wait(5)
+
+    t0 = time.time()
+    for i in range(messages) :
+        while publisher.stats()["inflight"] >= 5000 :      # stay under the paho queue limit
+            time.sleep(0.001)
+        publisher.publish("basinMaster/WaterDepth", {"Ultrasonic (in)": 4.0, "ABP (in)": 4.0 + i / 1000.0}, t0 + i)
+    publisher.flushBatches()
+    while publisher.stats()["inflight"] and time.time() - t0 < 60 :
+        time.sleep(0.01)
+    elapsed = time.time() - t0
+
+    stats = publisher.stats()
+    print("{} samples in {:.2f} s: {:.0f} samples/s, {} messages acked, latency p50 {} ms p99 {} ms, broker received {}".format(
+          messages, elapsed, messages / elapsed, stats["acked"], stats["latency50ms"], stats["latency99ms"], handler.messages))
+
+    publisher.stop()
+    server.shutdown()
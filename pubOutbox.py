@@ -0,0 +1,416 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+  2026/10/19  BrucesHobbies   Delivery latency metrics, retryMax per outbox
+  2026/10/19  BrucesHobbies   Records failing maxAttempts deliveries move to <name>.rejected
+  2026/10/19  BrucesHobbies   Only records refused with PermanentError are rejected, other failures retry
+  2026/10/19  BrucesHobbies   Fixed sequence number reuse after a restart with a one record segment
+
+
+OVERVIEW:
+    Durable outbox for pubScribe destinations that can be unreachable (MQTT
+    broker, InfluxDB host, SMTP server).
+
+    pubRecord appends each record for the destination to an append-only log
+    on disk and returns. A replay thread per destination reads the records
+    after the last acknowledged sequence number and delivers them in batches.
+    Once a batch is delivered its last sequence number is written to the ack
+    file. If delivery fails the batch is retried with exponential backoff, so
+    after an outage the backlog is sent in large batches and there is no gap
+    in the time series. Delivery is at least once: a crash between delivery
+    and writing the ack resends that batch.
+
+    A record the destination never accepts, e.g. one it can not parse, must
+    not hold up the lane for ever. deliver() raises PermanentError (or a
+    subclass such as pubInflux.InfluxRejected) when the destination refused
+    the batch and a retry can not succeed. The records of that batch are then
+    sent one at a time, and a record refused on its own is appended to the
+    rejected file and the lane moves on to the next one. Any other exception,
+    e.g. a refused connection or a timeout, is retried for as long as the
+    outage lasts. Rejected records can be sent again by hand.
+
+    Files for destination NAME:
+        outbox/NAME/000000000001.log    records, one JSON object per line
+        outbox/NAME/000000004097.log    new segment every OUTBOX_SEGMENT_BYTES
+        outbox/NAME/ack                 last delivered sequence number
+        outbox/NAME.rejected            rejected records with the error, one JSON object per line
+
+    When the segments exceed maxBytes the oldest segment is discarded and its
+    records are counted in stats()['dropped'].
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import time
+import json
+import threading
+
+
+OUTBOX_DIR           = "outbox"
+OUTBOX_MAX_BYTES     = 50 * 1024 * 1024    # per destination
+OUTBOX_SEGMENT_BYTES = 1024 * 1024
+OUTBOX_BATCH_SIZE    = 1000                # records per delivery
+OUTBOX_FSYNC         = 0                   # fsync each record, slower and more SD card wear
+OUTBOX_RETRY_MIN     = 2                   # seconds, first retry after a failure
+OUTBOX_RETRY_MAX     = 300                 # seconds, longest retry interval
+
+
+#
+# Raised by deliver() when the destination refused the records for good
+#
+class PermanentError(Exception) :
+    pass
+
+
+class Outbox :
+    #
+    # name: destination name, used as the directory name
+    # deliver: function(list of records) raising an exception on failure,
+    #     PermanentError when a retry can not succeed,
+    #     each record is a dict with seq, t, topic, data and hdr
+    # lingerSec: wait up to this long for a batch to fill before delivering
+    # retryMax: longest retry interval after failures, seconds
+    #
+    def __init__(self, name, deliver, dirname=OUTBOX_DIR, maxBytes=OUTBOX_MAX_BYTES,
+                 batchSize=OUTBOX_BATCH_SIZE, lingerSec=0, segmentBytes=OUTBOX_SEGMENT_BYTES,
+                 retryMax=OUTBOX_RETRY_MAX) :
+        self.name = name
+        self.deliver = deliver
+        self.dir = os.path.join(dirname, name)
+        self.maxBytes = maxBytes
+        self.batchSize = batchSize
+        self.lingerSec = lingerSec
+        self.segmentBytes = segmentBytes
+        self.retryMax = retryMax
+        self.rejectedPath = os.path.join(dirname, name + ".rejected")
+
+        os.makedirs(self.dir, exist_ok=True)
+
+        self.lock = threading.Lock()         # protects segments, sequence numbers, reader position
+        self.wake = threading.Event()
+        self.stopEvent = threading.Event()
+
+        self.ackSeq = self.readAck()
+        self.segments = self.listSegments()  # [[startSeq, path, bytes], ...] oldest first
+        self.nextSeq = max(self.lastSeq() + 1, self.ackSeq + 1)
+        self.writeFile = None
+
+        self.readSeg = None                  # startSeq of the segment being read
+        self.readPos = 0                     # byte offset in that segment
+
+        # metrics
+        self.delivered = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.failures = 0
+        self.lastError = ""
+        self.failing = False                 # last delivery attempt failed
+        self.oldestPendingT = None           # record time of the oldest undelivered record
+        self.latencySec = 0.0                # record time to delivered, oldest record of the last batch
+        self.maxLatencySec = 0.0
+
+        self.thread = threading.Thread(target=self.replayLoop, name="outbox-" + name, daemon=True)
+        self.thread.start()
+
+    #
+    # Files
+    #
+    def segmentPath(self, startSeq) :
+        return os.path.join(self.dir, "{:012d}.log".format(startSeq))
+
+    def listSegments(self) :
+        segments = []
+        for f in os.listdir(self.dir) :
+            if f.endswith(".log") and f[:-4].isdigit() :
+                path = os.path.join(self.dir, f)
+                segments.append([int(f[:-4]), path, os.path.getsize(path)])
+        return sorted(segments)
+
+    def lastSeq(self) :
+        # sequence number of the last complete record on disk
+        if not self.segments :
+            return 0
+        with open(self.segments[-1][1], 'rb') as f :
+            offset = max(self.segments[-1][2] - 65536, 0)
+            f.seek(offset)
+            lines = f.read().split(b'\n')
+            if offset :
+                lines = lines[1:]                # starts inside a record
+            for line in reversed(lines) :
+                try :
+                    return json.loads(line)["seq"]
+                except (ValueError, KeyError) :
+                    pass
+        return self.segments[-1][0] - 1
+
+    def readAck(self) :
+        try :
+            with open(os.path.join(self.dir, "ack"), 'r') as f :
+                return int(f.read().strip() or 0)
+        except (IOError, ValueError) :
+            return 0
+
+    def writeAck(self, seq) :
+        path = os.path.join(self.dir, "ack")
+        with open(path + ".tmp", 'w') as f :
+            f.write(str(seq))
+        os.replace(path + ".tmp", path)
+
+    #
+    # Append a record, returns its sequence number
+    #
+    def put(self, topic, tsec, data, hdr="") :
+        with self.lock :
+            seq = self.nextSeq
+            self.nextSeq += 1
+            line = (json.dumps({"seq": seq, "t": tsec, "topic": topic, "data": data, "hdr": hdr}) + "\n").encode('utf-8')
+
+            if self.writeFile is None or self.segments[-1][2] >= self.segmentBytes :
+                if self.writeFile is not None :
+                    self.writeFile.close()
+                self.segments.append([seq, self.segmentPath(seq), 0])
+                self.writeFile = open(self.segments[-1][1], 'ab')
+
+            self.writeFile.write(line)
+            self.writeFile.flush()
+            if OUTBOX_FSYNC :
+                os.fsync(self.writeFile.fileno())
+            self.segments[-1][2] += len(line)
+
+            self.enforceCap()
+
+        self.wake.set()
+        return seq
+
+    #
+    # Drop oldest segments while over maxBytes, never the segment being written
+    #
+    def enforceCap(self) :
+        while len(self.segments) > 1 and sum(s[2] for s in self.segments) > self.maxBytes :
+            startSeq, path, size = self.segments.pop(0)
+            lastSeq = self.segments[0][0] - 1
+            self.dropped += max(lastSeq - max(self.ackSeq, startSeq - 1), 0)
+            os.remove(path)
+            if lastSeq > self.ackSeq :
+                self.ackSeq = lastSeq
+                self.writeAck(lastSeq)
+            if self.readSeg == startSeq :
+                self.readSeg = None
+
+    #
+    # Read up to limit undelivered records, batchSize when None.
+    #   Returns (records, (segment startSeq, offset) after the last record)
+    #
+    def readBatch(self, limit=None) :
+        limit = limit or self.batchSize
+        with self.lock :
+            segments = [list(s) for s in self.segments]
+            readSeg, readPos = self.readSeg, self.readPos
+            ackSeq = self.ackSeq
+
+        records = []
+        endPos = (readSeg, readPos)
+        for startSeq, path, size in segments :
+            if readSeg is not None and startSeq < readSeg :
+                continue
+            offset = readPos if startSeq == readSeg else 0
+
+            try :
+                with open(path, 'rb') as f :
+                    f.seek(offset)
+                    data = f.read(size - offset)
+            except IOError :
+                continue                         # dropped by enforceCap meanwhile
+
+            for line in data.split(b'\n')[:-1] :   # only complete lines
+                offset += len(line) + 1
+                try :
+                    record = json.loads(line)
+                except ValueError :
+                    continue
+                if record["seq"] > ackSeq :
+                    records.append(record)
+                endPos = (startSeq, offset)
+                if len(records) >= limit :
+                    return records, endPos
+
+        return records, endPos
+
+    #
+    # Record a delivered batch and delete segments that are fully delivered
+    #
+    def commit(self, lastSeq, endPos) :
+        with self.lock :
+            if lastSeq > self.ackSeq :
+                self.ackSeq = lastSeq
+                self.writeAck(lastSeq)
+            self.readSeg, self.readPos = endPos
+
+            while len(self.segments) > 1 and self.segments[1][0] - 1 <= self.ackSeq :
+                startSeq, path, size = self.segments.pop(0)
+                os.remove(path)
+
+    #
+    # Move a record that was never accepted to the rejected file
+    #
+    def reject(self, record, endPos, error) :
+        print("Outbox " + self.name + " rejected record " + str(record["seq"]) + ": " + error)
+        with open(self.rejectedPath, 'a') as f :
+            f.write(json.dumps(dict(record, error=error)) + "\n")
+        self.rejected += 1
+        self.commit(record["seq"], endPos)
+
+    def replayLoop(self) :
+        retry = OUTBOX_RETRY_MIN
+        singleUntil = 0                          # send one record at a time up to this sequence number
+        while not self.stopEvent.is_set() :
+            single = self.ackSeq < singleUntil
+            records, endPos = self.readBatch(1 if single else None)
+            if not records :
+                self.oldestPendingT = None
+                self.wake.wait(1.0)
+                self.wake.clear()
+                continue
+
+            self.oldestPendingT = records[0]["t"]
+
+            if not single and len(records) < self.batchSize and self.lingerSec and (time.time() - records[0]["t"]) < self.lingerSec :
+                self.stopEvent.wait(min(self.lingerSec - (time.time() - records[0]["t"]), 1.0))
+                continue
+
+            try :
+                self.deliver(records)
+            except PermanentError as e :
+                self.failures += 1
+                self.lastError = str(e)
+                if len(records) == 1 :
+                    self.reject(records[0], endPos, self.lastError)
+                else :
+                    singleUntil = records[-1]["seq"]     # find the refused records
+                continue
+            except Exception as e :
+                self.failures += 1
+                self.failing = True
+                self.lastError = str(e)
+                print("Outbox " + self.name + " delivery failed, retry in " + str(retry) + " s: " + self.lastError)
+                self.stopEvent.wait(retry)
+                retry = min(retry * 2, self.retryMax)
+                continue
+
+            retry = OUTBOX_RETRY_MIN
+            self.failing = False
+            self.delivered += len(records)
+            self.latencySec = time.time() - records[0]["t"]
+            self.maxLatencySec = max(self.maxLatencySec, self.latencySec)
+            self.commit(records[-1]["seq"], endPos)
+
+    #
+    # Lag and delivery metrics
+    #
+    def stats(self) :
+        with self.lock :
+            pending = self.nextSeq - 1 - self.ackSeq
+            size = sum(s[2] for s in self.segments)
+        oldest = self.oldestPendingT if pending else None
+        return {"pending": pending,
+                "lagSec": round(time.time() - oldest, 1) if oldest else 0.0,
+                "bytes": size,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "rejected": self.rejected,
+                "failures": self.failures,
+                "latencySec": round(self.latencySec, 3),
+                "maxLatencySec": round(self.maxLatencySec, 3),
+                "lastError": self.lastError}
+
+    #
+    # Stop the replay thread, waits up to timeout seconds for pending records
+    #
+    def close(self, timeout=5) :
+        tEnd = time.time() + timeout
+        while self.stats()["pending"] and not self.failing and time.time() < tEnd :
+            time.sleep(0.1)
+        self.stopEvent.set()
+        self.wake.set()
+        self.thread.join(2)
+        with self.lock :
+            if self.writeFile is not None :
+                self.writeFile.close()
+                self.writeFile = None
+
+
+#
+# Test / debug, simulated outage of a destination
+#
+if __name__ == '__main__':
+    import tempfile
+
+    state = {"up": False, "received": []}
+
+    def deliver(records) :
+        if not state["up"] :
+            raise IOError("destination down")
+        if any(r["data"] == "bad" for r in records) :
+            raise PermanentError("destination can not parse the record")
+        state["received"] += [r["seq"] for r in records]
+
+    OUTBOX_RETRY_MIN = 0.5
+    outbox = Outbox("test", deliver, tempfile.mkdtemp(), batchSize=500, retryMax=1)
+
+    for i in range(2000) :
+        outbox.put("basinMaster/WaterDepth", time.time(), {"ABP (in)": 4.0 + i / 1000.0})
+    time.sleep(1)
+    print("Outage:    ", outbox.stats())
+
+    state["up"] = True
+    time.sleep(3)
+    print("Recovered: ", outbox.stats())
+    print("Received {} records, in order: {}".format(len(state["received"]), state["received"] == sorted(state["received"])))
+
+    for data in ["ok 1", "bad", "ok 2"] :
+        outbox.put("basinMaster/Status", time.time(), data)
+    time.sleep(1)
+    print("Bad record:", outbox.stats())
+    print("Received {} records, rejected file: {}".format(len(state["received"]), open(outbox.rejectedPath).read().strip()))
+    outbox.close()
+
+    # restart while the destination is down and the newest segment holds one record
+    state = {"up": False, "received": []}
+    directory = tempfile.mkdtemp()
+    outbox = Outbox("restart", deliver, directory, batchSize=1)
+    outbox.put("basinMaster/Alert", time.time(), "first")
+    outbox.close(0)
+    outbox = Outbox("restart", deliver, directory, batchSize=1)
+    outbox.put("basinMaster/Alert", time.time(), "second")
+    state["up"] = True
+    time.sleep(1.5)
+    print("Restart:    pending {}, received {}: {}".format(outbox.stats()["pending"], state["received"],
+          "ok" if state["received"] == [1, 2] else "FAILED"))
+    outbox.close()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+
+
+OVERVIEW:
+    Shared memory ring buffer of the latest samples for local consumers
+    (dashboard, LCD display, watchdog) so they do not re-read the csv file or
+    need MQTT.
+
+    The writer (basinMaster.py) memory maps a fixed size file, by default in
+    /dev/shm so it stays in RAM, and writes each sample into the next slot.
+    Readers map the same file read only. There are no locks: each slot holds
+    the sample number it contains, written as 2n-1 before the slot is updated
+    and 2n after. A reader copies a slot and keeps it only if the slot held 2n
+    both before and after the copy, otherwise the writer lapped it and the
+    sample is skipped. The writer never waits for readers.
+
+    File layout, little endian:
+        header  magic (8s), version (u32), fields (u32), slots (u32), slot size (u32),
+                samples written (u64), field names (32 bytes each, utf-8)
+        slot    sample number seqlock (u64), UNIX time (f64), one f64 per field
+
+    Read the latest samples from the command line:
+        python3 pubRing.py [n] [--follow] [--path /dev/shm/basinMaster_ring]
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import sys
+import time
+import mmap
+import struct
+
+
+RING_PATH  = "/dev/shm/basinMaster_ring" if os.path.isdir("/dev/shm") else "basinMaster_ring"
+RING_SLOTS = 1440                      # one day of samples at one per minute
+
+RING_MAGIC   = b"BMRING01"
+RING_VERSION = 1
+NAME_BYTES   = 32
+
+HEADER    = struct.Struct("<8sIIII")
+COUNT     = struct.Struct("<Q")
+COUNT_POS = HEADER.size
+NAMES_POS = COUNT_POS + COUNT.size
+SLOT_HDR  = struct.Struct("<Qd")
+
+
+def layout(nFields, slots) :
+    slotsPos = NAMES_POS + nFields * NAME_BYTES
+    slotsPos = (slotsPos + 63) & ~63
+    slotSize = SLOT_HDR.size + 8 * nFields
+    return slotsPos, slotSize, slotsPos + slots * slotSize
+
+
+class RingWriter :
+    #
+    # fields: list of field names, e.g. ["Ultrasonic (in)", "ABP (in)"]
+    # An existing ring with the same fields and size is continued.
+    #
+    def __init__(self, fields, path=RING_PATH, slots=RING_SLOTS) :
+        self.fields = list(fields)
+        self.path = path
+        self.slots = slots
+        self.slotsPos, self.slotSize, size = layout(len(self.fields), slots)
+        self.values = struct.Struct("<{}d".format(len(self.fields)))
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try :
+            reuse = os.fstat(fd).st_size == size
+            os.ftruncate(fd, size)
+            self.mm = mmap.mmap(fd, size)
+        finally :
+            os.close(fd)
+
+        names = b''.join(f.encode('utf-8')[:NAME_BYTES].ljust(NAME_BYTES, b'\0') for f in self.fields)
+        if not reuse or self.mm[:HEADER.size] != self.header() or self.mm[NAMES_POS:NAMES_POS + len(names)] != names :
+            self.mm[:] = bytes(size)
+            self.mm[NAMES_POS:NAMES_POS + len(names)] = names
+            self.mm[:HEADER.size] = self.header()
+        self.count = COUNT.unpack_from(self.mm, COUNT_POS)[0]
+
+    def header(self) :
+        return HEADER.pack(RING_MAGIC, RING_VERSION, len(self.fields), self.slots, self.slotSize)
+
+    #
+    # Write one sample, data is a dict keyed by field name or a list in field order
+    #
+    def write(self, tsec, data) :
+        if isinstance(data, dict) :
+            values = [data.get(f, float("nan")) for f in self.fields]
+        else :
+            values = data
+        n = self.count + 1
+        pos = self.slotsPos + ((n - 1) % self.slots) * self.slotSize
+
+        COUNT.pack_into(self.mm, pos, 2*n - 1)              # slot being written
+        self.values.pack_into(self.mm, pos + SLOT_HDR.size, *values)
+        struct.pack_into("<d", self.mm, pos + 8, tsec)
+        COUNT.pack_into(self.mm, pos, 2*n)                  # slot complete
+        COUNT.pack_into(self.mm, COUNT_POS, n)
+        self.count = n
+
+    #
+    # pubScribe subscriber, see pubScribe.subscribe()
+    #
+    def add(self, topic, tsec, data, hdr="") :
+        self.write(tsec, data)
+
+    def close(self) :
+        self.mm.close()
+
+
+class RingReader :
+    def __init__(self, path=RING_PATH) :
+        with open(path, 'rb') as f :
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, nFields, self.slots, self.slotSize = HEADER.unpack_from(self.mm, 0)
+        if magic != RING_MAGIC or version != RING_VERSION :
+            raise ValueError(path + " is not a basinMaster ring buffer")
+        self.fields = [self.mm[NAMES_POS + i*NAME_BYTES : NAMES_POS + (i+1)*NAME_BYTES].rstrip(b'\0').decode('utf-8')
+                       for i in range(nFields)]
+        self.slotsPos = layout(nFields, self.slots)[0]
+        self.sample = struct.Struct("<Qd{}d".format(nFields))
+        self.lapped = 0                          # samples overwritten while being read
+
+    def count(self) :
+        return COUNT.unpack_from(self.mm, COUNT_POS)[0]
+
+    #
+    # Sample number n as (n, tsec, (values...)), None if it is no longer in the ring
+    #
+    def read(self, n) :
+        pos = self.slotsPos + ((n - 1) % self.slots) * self.slotSize
+        sample = self.sample.unpack_from(self.mm, pos)
+        if sample[0] != 2*n or COUNT.unpack_from(self.mm, pos)[0] != 2*n :
+            self.lapped += 1
+            return None
+        return n, sample[1], sample[2:]
+
+    #
+    # Latest n samples, oldest first
+    #
+    def latest(self, n=1) :
+        count = self.count()
+        first = max(count - min(n, self.slots) + 1, 1)
+        return [s for s in (self.read(i) for i in range(first, count + 1)) if s is not None]
+
+    #
+    # Samples written after sample number 'after', oldest first
+    #
+    def since(self, after) :
+        count = self.count()
+        return self.latest(count - after) if count > after else []
+
+    def close(self) :
+        self.mm.close()
+
+
+#
+# Test / debug, print the latest samples
+#
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print the latest samples from the basinMaster ring buffer")
+    parser.add_argument("n", type=int, nargs="?", default=10, help="number of samples")
+    parser.add_argument("--path", default=RING_PATH)
+    parser.add_argument("--follow", action="store_true", help="keep printing new samples")
+    parser.add_argument("--bench", action="store_true", help="measure write and read rates on a temporary ring")
+    args = parser.parse_args()
+
+    if args.bench :
+        import tempfile
+        path = os.path.join(tempfile.mkdtemp(), "ring")
+        writer = RingWriter(["Ultrasonic (in)", "ABP (in)"], path, 1024)
+        reader = RingReader(path)
+        t0 = time.time()
+        for i in range(200000) :
+            writer.write(t0 + i, [4.0 + i / 1e5, 4.1])
+        tw = time.time() - t0
+        t0 = time.time()
+        for i in range(1000) :
+            samples = reader.latest(100)
+        tr = time.time() - t0
+        print("write {:.2f} us per sample, latest(100) {:.1f} us, last {}".format(tw / 200000 * 1e6, tr / 1000 * 1e6, samples[-1]))
+        sys.exit(0)
+
+    reader = RingReader(args.path)
+    print("UNIX time (s),DateTime," + ",".join(reader.fields))
+    last = 0
+    for n, tsec, values in reader.latest(args.n) :
+        print("{:.0f},{},{}".format(tsec, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(tsec)), ",".join(str(v) for v in values)))
+        last = n
+
+    while args.follow :
+        time.sleep(1)
+        for n, tsec, values in reader.since(max(last, reader.count() - reader.slots)) :
+            print("{:.0f},{},{}".format(tsec, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(tsec)), ",".join(str(v) for v in values)))
+            last = n
@@ -0,0 +1,543 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+  2026/10/19  BrucesHobbies   Buckets start at local time boundaries, new fields start a new file
+  2026/10/19  BrucesHobbies   Lock for the open buckets, read by other threads with openBucket()
+  2026/10/19  BrucesHobbies   Open buckets kept in the state snapshot, no resolutions finer than the records
+  2026/10/19  BrucesHobbies   isTopicLog() and DERIVED_SUFFIXES shared by plotBasinMaster and pubHttp
+
+
+OVERVIEW:
+    Downsampled rollups of published records. For each topic and numeric
+    field, pubScribe keeps one open bucket per resolution (minute, hour, day)
+    holding count, min, max, sum, first and last. Each record updates the open
+    buckets in O(1). When a record lands in a new bucket the closed bucket is
+    appended as a row to the rollup csv file next to the raw topic csv file:
+
+        basinMaster_WaterDepth.csv          raw log written by pubScribe
+        basinMaster_WaterDepth_minute.csv   one row per minute
+        basinMaster_WaterDepth_hour.csv     one row per hour
+        basinMaster_WaterDepth_day.csv      one row per day
+
+    Rollup rows have the same first two columns as the raw log followed by
+    "<field> count,<field> min,<field> max,<field> mean,<field> first,<field> last"
+    for each field, so plotBasinMaster can read them with importCsv.
+
+    Buckets start on local time boundaries, so a day bucket runs from local
+    midnight to the next local midnight (23 or 25 hours on DST changes) and
+    the DateTime column is local time like the raw log. Rollups written
+    before this change have UTC day buckets, rebuild them as shown below.
+
+    Fields that first appear after the rollup file was started (schema drift)
+    are added to the rollup the way pubSchema adds them to the raw log: the
+    old file is renamed to <name>.YYYYMMDD-HHMMSS.csv and a new file with
+    the grown header is started.
+
+    Open buckets are written out on close, so a restart can leave two rows with
+    the same bucket time. readRollup() merges them. An open bucket (the whole
+    current day for the day rollup) is also kept in the state snapshot with
+    getState() and setState(), so after a power cut it continues from the last
+    snapshot. A restored bucket the rollup file already has is dropped.
+
+    A resolution no coarser than the seconds between the records of a topic
+    (sampleSec, set by pubScribe from ROLLUP_SAMPLE_SEC) would hold one record
+    per bucket and be larger than the raw log, so it is not kept for that
+    topic. resolutions(topic) lists the ones that are.
+
+    addRecord() and flushAll() hold rollupLock while they change the open
+    buckets. Other threads, e.g. the pubHttp handlers, read an open bucket
+    with openBucket(), which returns a copy taken under the same lock.
+
+    To build rollups for an existing raw log logged every 60 s:
+        python3 pubRollup.py basinMaster/WaterDepth [--sample-sec 60]
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import csv
+import argparse
+import time
+import datetime
+import threading
+
+import stateSnapshot
+import pubCompress
+
+
+# Resolution name and bucket size in seconds, finest first
+ROLLUP_RESOLUTIONS = [("minute", 60), ("hour", 3600), ("day", 86400)]
+
+MISSING_VALUE = -99        # sensor fault sentinel, not included in rollups
+
+STATS = ["count", "min", "max", "mean", "first", "last"]
+
+
+#
+# Filenames
+#
+def topicFilename(topic) :
+    return topic.replace('/','_') + ".csv"
+
+
+def rollupFilename(topic, resName) :
+    return topic.replace('/','_') + "_" + resName + ".csv"
+
+
+# csv files next to the topic logs that are derived from them: rollups,
+# swinging door breakpoints (pubCompress) and analyzeBasinMaster tables
+DERIVED_SUFFIXES = tuple("_" + name + ".csv" for name, sec in ROLLUP_RESOLUTIONS) + \
+                   (pubCompress.COMPRESS_SUFFIX + ".csv", "_daily.csv", "_storms.csv")
+
+
+#
+# True for a <source>_<topic>.csv log written by pubScribe. Not for files
+#   derived from it or logs rotated on schema drift (<name>.YYYYMMDD-HHMMSS.csv)
+#
+def isTopicLog(filename) :
+    name = os.path.basename(filename)
+    return name.count('.') == 1 and not name.endswith(DERIVED_SUFFIXES)
+
+
+#
+# Bucket statistics for one field: [count, min, max, sum, first, last]
+#
+def newStats(value) :
+    return [1, value, value, value, value, value]
+
+
+def updateStats(stats, value) :
+    stats[0] += 1
+    if value < stats[1] :
+        stats[1] = value
+    if value > stats[2] :
+        stats[2] = value
+    stats[3] += value
+    stats[5] = value
+
+
+def mergeStats(stats, other) :
+    if stats is None :
+        return list(other)
+    stats[0] += other[0]
+    stats[1] = min(stats[1], other[1])
+    stats[2] = max(stats[2], other[2])
+    stats[3] += other[3]
+    stats[5] = other[5]
+    return stats
+
+
+#
+# Start time (s) of the bucket holding tsec, on local time boundaries
+#
+def bucketStart(tsec, resSec) :
+    if resSec < 86400 :
+        offset = time.localtime(tsec).tm_gmtoff
+        return int((tsec + offset) // resSec) * resSec - offset
+
+    t = time.localtime(tsec)
+    return int(time.mktime((t.tm_year, t.tm_mon, t.tm_mday, 0, 0, 0, 0, 0, -1)))
+
+
+#
+# Start time (s) of the bucket after the one starting at start
+#
+def bucketNext(start, resSec) :
+    if resSec < 86400 :
+        return start + resSec
+
+    day = datetime.date.fromtimestamp(start) + datetime.timedelta(days=1)
+    return int(time.mktime((day.year, day.month, day.day, 0, 0, 0, 0, 0, -1)))
+
+
+#
+# Rollup of one topic at one resolution
+#
+class Rollup :
+    def __init__(self, topic, resName, resSec, fields) :
+        self.filename = rollupFilename(topic, resName)
+        self.resName = resName
+        self.resSec = resSec
+        self.fields = list(fields)
+        self.known = set(fields)
+        self.needsNewFile = False # fields were added, start a new file at the next flush
+        self.bucket = None        # start time (s) of the open bucket
+        self.bucketEnd = None     # start time (s) of the bucket after it
+        self.stats = {}           # field: stats list for the open bucket
+        self.pending = None       # list to collect rows in instead of appending to the file
+
+    def add(self, tsec, values) :
+        if self.bucket is None or not self.bucket <= tsec < self.bucketEnd :
+            self.flush()
+            self.bucket = bucketStart(tsec, self.resSec)
+            self.bucketEnd = bucketNext(self.bucket, self.resSec)
+
+        for field, value in values :
+            stats = self.stats.get(field)
+            if stats is None :
+                if field not in self.known :
+                    self.addField(field)
+                self.stats[field] = newStats(value)
+            else :
+                updateStats(stats, value)
+
+    #
+    # New field in the open bucket. Rows already written keep the old header,
+    #   so the file is rotated at the next flush as pubScribe does for the raw log.
+    #
+    def addField(self, field) :
+        self.fields.append(field)
+        self.known.add(field)
+        self.needsNewFile = True
+
+    def header(self) :
+        cols = ['UNIX time (s)', 'DateTime']
+        for field in self.fields :
+            cols += [field + " " + stat for stat in STATS]
+        return ",".join(cols) + "\n"
+
+    def flush(self) :
+        if self.bucket is None or not self.stats :
+            self.stats = {}
+            return
+
+        if self.needsNewFile :
+            self.needsNewFile = False
+            if self.pending :
+                self.writePending()
+            if os.path.isfile(self.filename) :
+                os.rename(self.filename, self.filename[:-4] + time.strftime(".%Y%m%d-%H%M%S.csv", time.localtime(self.bucket)))
+
+        s = ""
+        if not os.path.isfile(self.filename) and not self.pending :
+            s = self.header()
+
+        s += str(self.bucket) + "," + datetime.datetime.fromtimestamp(self.bucket).strftime('%Y-%m-%d %H:%M:%S')
+        for field in self.fields :
+            stats = self.stats.get(field)
+            if stats :
+                s += ",{},{},{},{},{},{}".format(stats[0], stats[1], stats[2], round(stats[3]/stats[0], 4), stats[4], stats[5])
+            else :
+                s += ",0" + "," + ",".join([str(MISSING_VALUE)] * 5)
+
+        if self.pending is not None :
+            self.pending.append(s + '\n')
+        else :
+            with open(self.filename, "a") as csvFile :
+                csvFile.write(s + '\n')
+
+        self.stats = {}
+
+    def writePending(self) :
+        with open(self.filename, "a") as csvFile :
+            csvFile.writelines(self.pending)
+        self.pending = []
+
+
+#
+# Open rollups per topic: {topic: [Rollup, ...]} in ROLLUP_RESOLUTIONS order
+#
+topicRollups = {}
+rollupLock = threading.Lock()
+
+sampleSec = {}             # topic: seconds between its records, finer resolutions are not kept
+
+
+#
+# Resolutions kept for topic, (resName, resSec) finest first
+#
+def resolutions(topic) :
+    return [(name, sec) for name, sec in ROLLUP_RESOLUTIONS if sec > sampleSec.get(topic, 0)]
+
+
+#
+# Numeric (field, value) pairs of a record, skipping missing values.
+#   dict records use their keys, list records use the comma separated hdr.
+#
+def numericFields(data, hdr="") :
+    if isinstance(data, dict) :
+        items = data.items()
+    elif isinstance(data, list) and hdr :
+        items = zip(hdr.split(','), data)
+    else :
+        return []
+
+    return [(k, v) for k, v in items
+            if isinstance(v, (int, float)) and not isinstance(v, bool) and v != MISSING_VALUE]
+
+
+#
+# Update rollups of topic with a published record, O(1) per field and resolution
+#
+def addRecord(topic, tsec, data, hdr="") :
+    rollups = topicRollups.get(topic)
+    if rollups is None :
+        if isinstance(data, dict) :
+            fields = list(data.keys())
+        elif hdr :
+            fields = hdr.split(',')
+        else :
+            return
+        rollups = [Rollup(topic, name, sec, fields) for name, sec in resolutions(topic)]
+        topicRollups[topic] = rollups
+
+    values = numericFields(data, hdr)
+    with rollupLock :
+        for rollup in rollups :
+            rollup.add(tsec, values)
+
+
+#
+# Write all open buckets and close the rollups, called before program exits
+#
+def flushAll() :
+    with rollupLock :
+        for rollups in topicRollups.values() :
+            for rollup in rollups :
+                rollup.flush()
+        topicRollups.clear()
+
+
+#
+# Open buckets for the state snapshot:
+#   {topic: [[resName, bucket, fields, {field: stats}, needsNewFile], ...]}
+#
+def getState() :
+    with rollupLock :
+        return {topic : [[r.resName, r.bucket, list(r.fields), {field : list(stats) for field, stats in r.stats.items()}, r.needsNewFile]
+                         for r in rollups if r.bucket is not None and r.stats]
+                for topic, rollups in topicRollups.items()}
+
+
+#
+# Restore open buckets saved by getState(), before the first record.
+#   Buckets of any age are restored, they are written when the next record
+#   starts a new bucket. A bucket at or before the last row of its rollup
+#   file was written after the snapshot and is dropped.
+#
+def setState(state, tsec) :
+    if not state :
+        return
+
+    with rollupLock :
+        for topic, saved in state.items() :
+            if topic in topicRollups or not saved :
+                continue
+
+            fields = []
+            for resName, bucket, bucketFields, stats, needsNewFile in saved :
+                fields += [field for field in bucketFields if field not in fields]
+            rollups = [Rollup(topic, name, sec, fields) for name, sec in resolutions(topic)]
+            topicRollups[topic] = rollups
+
+            for resName, bucket, bucketFields, stats, needsNewFile in saved :
+                for rollup in rollups :
+                    if rollup.resName != resName :
+                        continue
+                    last = lastBucket(rollup.filename)
+                    if last is not None and last >= bucket :
+                        continue
+                    rollup.fields = list(bucketFields) + [field for field in fields if field not in bucketFields]
+                    rollup.needsNewFile = needsNewFile or len(rollup.fields) > len(bucketFields)
+                    rollup.bucket = bucket
+                    rollup.bucketEnd = bucketNext(bucket, rollup.resSec)
+                    rollup.stats = stats
+
+
+#
+# Start time (s) of the last row of a rollup file, None when missing or empty
+#
+def lastBucket(filename) :
+    try :
+        for line in stateSnapshot.reverseLines(filename, maxBytes=stateSnapshot.TAIL_BLOCK_BYTES) :
+            return int(float(line.split(',')[0]))
+    except (IOError, ValueError) :
+        pass
+    return None
+
+
+#
+# Copy of the open bucket of topic at resName: (bucket, fields, {field: stats})
+#   or None when there is none. Safe to call from any thread.
+#
+def openBucket(topic, resName) :
+    rollups = [rollup for rollup in topicRollups.get(topic, []) if rollup.resName == resName]
+    if not rollups :
+        return None
+
+    rollup = rollups[0]
+    with rollupLock :
+        if rollup.bucket is None :
+            return None
+        return rollup.bucket, list(rollup.fields), {field : list(stats) for field, stats in rollup.stats.items()}
+
+
+#
+# Coarsest resolution giving at least minPoints buckets over span seconds.
+#   Returns (resName, resSec) or None when only the raw log is fine enough.
+#
+def selectResolution(span, minPoints, kept=ROLLUP_RESOLUTIONS) :
+    for resName, resSec in reversed(kept) :
+        if span / resSec >= minPoints :
+            return resName, resSec
+    return None
+
+
+#
+# Read rollup rows of a topic between tStart and tEnd.
+#   Returns (fields, rows) where rows is a time sorted list of
+#   (bucket, {field: [count, min, max, sum, first, last]}).
+#   Rows with the same bucket time (restarts) are merged.
+#
+def readRollup(topic, resName, tStart=None, tEnd=None) :
+    filename = rollupFilename(topic, resName)
+    if not os.path.isfile(filename) :
+        return [], []
+
+    with open(filename, 'r') as csvFile :
+        reader = csv.reader(csvFile)
+        hdr = next(reader, [])
+        fields = [col[:-len(" count")] for col in hdr[2::len(STATS)]]
+
+        rows = []
+        for row in reader :
+            bucket = int(float(row[0]))
+            if (tStart is not None and bucket < tStart) or (tEnd is not None and bucket > tEnd) :
+                continue
+
+            bucketStats = {}
+            for idx, field in enumerate(fields) :
+                col = 2 + idx * len(STATS)
+                count = int(float(row[col]))
+                if count :
+                    mn, mx, mean, first, last = [float(v) for v in row[col+1:col+6]]
+                    bucketStats[field] = [count, mn, mx, mean * count, first, last]
+
+            if rows and rows[-1][0] == bucket :
+                for field, stats in bucketStats.items() :
+                    rows[-1][1][field] = mergeStats(rows[-1][1].get(field), stats)
+            else :
+                rows.append((bucket, bucketStats))
+
+    return fields, rows
+
+
+#
+# Per field count, min, max and mean of topic between tStart and tEnd.
+#   Uses the coarsest resolution with at least minBuckets buckets in the
+#   window, plus the open bucket held in memory.
+#
+def summarize(topic, tStart, tEnd, minBuckets=24) :
+    kept = resolutions(topic)
+    if not kept :
+        return {}
+    res = selectResolution(tEnd - tStart, minBuckets, kept) or kept[0]
+
+    fields, rows = readRollup(topic, res[0], tStart, tEnd)
+
+    current = openBucket(topic, res[0])
+    if current and tStart <= current[0] <= tEnd :
+        rows.append((current[0], current[2]))
+        for field in current[1] :
+            if field not in fields :
+                fields.append(field)
+
+    result = {}
+    for bucket, bucketStats in rows :
+        for field, stats in bucketStats.items() :
+            result[field] = mergeStats(result.get(field), stats)
+
+    return {field : {"count": s[0], "min": s[1], "max": s[2], "mean": s[3]/s[0]}
+            for field, s in result.items()}
+
+
+#
+# Build rollups for topic from its raw csv log, replacing existing rollup files
+#
+def rebuild(topic) :
+    for resName, resSec in ROLLUP_RESOLUTIONS :
+        filename = rollupFilename(topic, resName)
+        if os.path.isfile(filename) :
+            os.remove(filename)
+    topicRollups.pop(topic, None)
+
+    with open(topicFilename(topic), 'r') as csvFile :
+        reader = csv.reader(csvFile)
+        hdr = next(reader)
+        fields = hdr[2:]
+        topicRollups[topic] = [Rollup(topic, name, sec, fields) for name, sec in resolutions(topic)]
+        for rollup in topicRollups[topic] :
+            rollup.pending = []
+
+        nRows = 0
+        for row in reader :
+            try :
+                tsec = float(row[0])
+            except (ValueError, IndexError) :
+                continue
+
+            values = []
+            for field, v in zip(fields, row[2:]) :
+                try :
+                    v = float(v)
+                except ValueError :
+                    continue
+                if v != MISSING_VALUE :
+                    values.append((field, v))
+
+            for rollup in topicRollups[topic] :
+                rollup.add(tsec, values)
+            nRows += 1
+
+    for rollup in topicRollups.pop(topic) :
+        rollup.flush()
+        rollup.writePending()
+
+    return nRows
+
+
+#
+# Rebuild rollups from raw logs
+#
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Rebuild rollups from raw csv logs")
+    parser.add_argument("topics", nargs="*", default=["basinMaster/WaterDepth"], help="topics")
+    parser.add_argument("--sample-sec", type=float, default=60, help="seconds between records, finer resolutions are not built")
+    args = parser.parse_args()
+
+    for topic in args.topics :
+        sampleSec[topic] = args.sample_sec
+        t0 = time.time()
+        n = rebuild(topic)
+        print("{}: {} rows rolled up in {:.1f} s".format(topic, n, time.time() - t0))
+
+        tEnd = time.time()
+        for field, s in summarize(topic, tEnd - 24*3600, tEnd).items() :
+            print("  Last 24 h {}: min {:.2f} max {:.2f} mean {:.2f} ({} samples)".format(field, s["min"], s["max"], s["mean"], s["count"]))
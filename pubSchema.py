@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+
+
+OVERVIEW:
+    Per topic schema registry for pubScribe csv records.
+
+    The first record of a topic fixes its field order, from the header row
+    of an existing csv file or else from the record's dict keys. An encoder
+    is compiled once for that order with any per field number formats, and
+    the "UNIX time (s),DateTime," prefix is cached and only rebuilt when the
+    second changes.
+
+    Schema drift is detected when a dict record has different keys than the
+    topic's columns:
+    - keys in a different order are written in column order
+    - missing keys are written as empty values
+    - new keys cannot fit under the existing header, so the schema grows
+      and needsNewFile is set; pubScribe then starts a new csv file
+    Each new key set is reported once and counted in drift.
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import sys
+import time
+
+
+CSV_TIME_COLUMNS = "UNIX time (s),DateTime,"
+
+
+class TopicSchema :
+    def __init__(self, topic, fields=None, formats=None, fmtStr=None) :
+        self.topic = topic
+        self.formats = dict(formats or {})   # field: format string, e.g. {"ABP (in)": "{:.2f}"}
+        self.fmtStr = fmtStr                 # format string for list records
+        self.fields = None                   # column order of dict records
+        self.keys = None                     # key order of the last dict record
+        self.inOrder = False                 # last keys equal the column order
+        self.seen = set()                    # key sets already reported as drift
+        self.drift = 0
+        self.needsNewFile = False
+        self.listFmt = {}                    # len: format string for list records
+
+        self.prefixKey = None
+        self.prefix = ""
+
+        if fields :
+            self.compile(fields)
+
+    #
+    # Compile the dict encoder for a column order
+    #
+    def compile(self, fields) :
+        self.fields = list(fields)
+        self.keys = tuple(self.fields)
+        self.inOrder = True
+        if any(f in self.formats for f in self.fields) :
+            self.rowFmt = ",".join(self.formats.get(f, "{}") for f in self.fields)
+        else :
+            self.rowFmt = None
+
+    def setFormats(self, formats) :
+        self.formats.update(formats)
+        if self.fields :
+            self.compile(self.fields)
+
+    #
+    # Seed the column order from the header row of an existing csv file
+    #
+    def loadHeader(self, filename) :
+        try :
+            with open(filename, 'r') as f :
+                line = f.readline().rstrip('\r\n')
+        except IOError :
+            return False
+        if not line.startswith(CSV_TIME_COLUMNS) :
+            return False
+        fields = line[len(CSV_TIME_COLUMNS):].split(',')
+        if fields and fields != [''] :
+            self.compile(fields)
+            self.keys = None                 # first record is checked against the header
+        return True
+
+    #
+    # "UNIX time (s),DateTime," for tsec, rebuilt at most twice a second
+    #
+    def timePrefix(self, tsec) :
+        key = int(tsec * 2)                  # round() and the DateTime second both fixed within a half second
+        if key != self.prefixKey :
+            self.prefixKey = key
+            self.prefix = str(round(tsec)) + "," + time.strftime('%Y-%m-%d %H:%M:%S,', time.localtime(tsec))
+        return self.prefix
+
+    #
+    # Check a new key order against the columns
+    #
+    def checkKeys(self, keys) :
+        if self.fields is None :
+            self.compile(keys)
+            return
+
+        known = set(self.fields)
+        added = [k for k in keys if k not in known]
+        missing = [f for f in self.fields if f not in keys]
+
+        if (added or missing) and frozenset(keys) not in self.seen :
+            self.seen.add(frozenset(keys))
+            self.drift += 1
+            print("Schema drift on " + self.topic + ": added " + str(added) + ", missing " + str(missing))
+
+        if added :
+            self.compile(self.fields + added)
+            self.needsNewFile = True
+
+        self.keys = keys
+        self.inOrder = (keys == tuple(self.fields))
+
+    #
+    # csv values of a dict record in column order
+    #
+    def dictValues(self, data) :
+        keys = tuple(data)
+        if keys != self.keys :
+            self.checkKeys(keys)
+
+        if self.inOrder :
+            if self.rowFmt :
+                return self.rowFmt.format(*data.values())
+            return ",".join(map(str, data.values()))
+
+        values = []
+        for f in self.fields :
+            if f in data :
+                values.append(self.formats.get(f, "{}").format(data[f]))
+            else :
+                values.append("")
+        return ",".join(values)
+
+    #
+    # csv values of a list record
+    #
+    def listValues(self, data) :
+        if self.fmtStr :
+            return self.fmtStr.format(*data)
+        fmt = self.listFmt.get(len(data))
+        if fmt is None :
+            fmt = self.listFmt[len(data)] = '{},' * len(data)
+        return fmt.format(*data)
+
+    def headerFields(self) :
+        return ",".join(self.fields or [])
+
+
+#
+# Registry
+#
+schemas = {}
+
+def getSchema(topic) :
+    schema = schemas.get(topic)
+    if schema is None :
+        schema = schemas[topic] = TopicSchema(topic)
+    return schema
+
+
+#
+# Test / debug, encoder cost against building each line from scratch
+#
+if __name__ == '__main__':
+    import datetime
+
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    data = {"Ultrasonic (in)": 4.25, "ABP (in)": 4.31, "Temp (C)": 21.5, "Pump": 0}
+
+    t0 = time.time()
+    for i in range(records) :
+        s = str(round(time.time())) + "," + datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S,')
+        s += ",".join("{}".format(v) for k, v in data.items())
+    tOld = time.time() - t0
+
+    schema = TopicSchema("basinMaster/WaterDepth")
+    t0 = time.time()
+    for i in range(records) :
+        s = schema.timePrefix(time.time()) + schema.dictValues(data)
+    tNew = time.time() - t0
+    print("per record: from scratch {:.2f} us, compiled {:.2f} us".format(tOld / records * 1e6, tNew / records * 1e6))
+
+    schema.dictValues({"ABP (in)": 4.3, "Ultrasonic (in)": 4.2, "Temp (C)": 21.0, "Pump": 1})
+    print(schema.dictValues({"ABP (in)": 4.3, "Ultrasonic (in)": 4.2, "Temp (C)": 21.0, "Pump": 1}))
+    print(schema.dictValues({"ABP (in)": 4.3, "Pump": 1}))
+    print(schema.dictValues({"ABP (in)": 4.3, "Pump": 1, "Flow": 2.5}), schema.needsNewFile, schema.headerFields())
@@ -10,10 +10,34 @@ REVISION HISTORY
   DATE        AUTHOR          CHANGES
   yyyy/mm/dd  --------------- ------------------------------------------------
   2021/04/14  BrucesHobbies   Added support for Antonio's variable tone buzzer
+  2026/10/19  BrucesHobbies   Minute/hour/day rollups of csv records (pubRollup.py)
+  2026/10/19  BrucesHobbies   SQLite destination (pubSqlite.py)
+  2026/10/19  BrucesHobbies   Batched line protocol InfluxDB writer (pubInflux.py)
+  2026/10/19  BrucesHobbies   Disk backed outbox for MQTT, InfluxDB and email (pubOutbox.py)
+  2026/10/19  BrucesHobbies   Threaded MQTT publisher with reconnect and QoS 1 window (pubMqtt.py)
+  2026/10/19  BrucesHobbies   IP_PORT destination to fleetCollector.py (pubIpPort.py)
+  2026/10/19  BrucesHobbies   Destinations are subscribers on an in-process topic bus (pubBus.py)
+  2026/10/19  BrucesHobbies   Compiled per topic csv encoders with schema drift detection (pubSchema.py)
+  2026/10/19  BrucesHobbies   Swinging door compression stage for csv records (pubCompress.py)
+  2026/10/19  BrucesHobbies   pubRecord can forward records to another process (procSplit.py)
+  2026/10/19  BrucesHobbies   Destinations restart when their settings change while running (runtimeConfig.py)
+  2026/10/19  BrucesHobbies   Buzzer patterns by priority on one PWM channel and thread (pubBuzzer.py)
+  2026/10/19  BrucesHobbies   Priority outbox lane for alert topics
+  2026/10/19  BrucesHobbies   Buzzer restart releases only the buzzer pin
+  2026/10/19  BrucesHobbies   Rollup resolutions finer than ROLLUP_SAMPLE_SEC are not kept
 
 
 OVERVIEW:
-    Place holder for alert and publish-subscribe
+    Alert and publish-subscribe. pubRecord() publishes a record on an
+    in-process topic bus (pubBus.py). Each enabled destination is a
+    subscriber to '#' named for the destination, so it only receives records
+    whose dest list names it. Other code can subscribe() a callback to a
+    topic pattern with + and # wildcards and receive every matching record.
+
+    MQTT and EMAIL_SMS have a second outbox, a priority lane, for records
+    whose topic contains a word in PRIORITY_TOPICS (e.g. basinMaster/Alert).
+    It is delivered by its own thread with a shorter retry interval, so an
+    alert is not queued behind status messages or a logging backlog.
 
 LICENSE:
     This program code and documentation are for personal private use only. 
@@ -48,10 +72,11 @@ sudo pip3 install paho-mqtt
 
 
 --- if INFLUXDB is used, basic commands for install of INFLUXDB are found on web pages ---
+    Records are written with the HTTP /write endpoint (InfluxDB 1.x), see pubInflux.py
 
 
 
---- Plan to add SQL ---
+--- SQLITE uses the sqlite3 module included with Python, see pubSqlite.py ---
 
 
 """
@@ -61,22 +86,45 @@ import sys
 import time
 import datetime
 
+import pubBus
+import pubSchema
+import runtimeConfig
+
 
 #
 # USER CONFIGURATION SECTION
 # Select one or more options to enable
 #
 CSV_FILE_ENABLED  = 1
+ROLLUP_ENABLED    = 1    # minute/hour/day min/max/mean rollup csv files next to csv logs
+ROLLUP_SAMPLE_SEC = {"basinMaster/WaterDepth": 60}   # topic: seconds between records, finer rollups are not kept
+
+# COMPRESS - only the swinging door breakpoints of these topics are written to <topic>_sdt.csv,
+# linear interpolation between them is within the error bound of every field
+COMPRESS_ENABLED  = 1
+COMPRESS_TOPICS   = {"basinMaster/WaterDepth": {"Ultrasonic (in)": 0.25, "ABP (in)": 0.1}}
+COMPRESS_ONLY     = 0    # 1 = compressed topics are not also written to their full csv file,
+                         #     readers rebuild them from <topic>_sdt.csv (pubCompress.expandFile)
 
 EMAIL_SMS_ENABLED = 1
 
-IP_PORT_ENABLED   = 0    # Future
+# IP_PORT - binary records over TCP to fleetCollector.py on a central host
+IP_PORT_ENABLED   = 0
+IP_PORT_HOST      = "192.168.100.11"
+IP_PORT_PORT      = 5555
+IP_PORT_SITE      = ""                 # site name, default is the RPi host name
+IP_PORT_BATCH_ROWS = 100               # records per batch
+IP_PORT_BATCH_SEC = 10                 # send a partial batch after this many seconds
 
 # MQTT
 MQTT_ENABLED      = 0
 MQTT_HOST         = "localhost"
 MQTT_PORT         = 1883
 MQTT_KEEPALIVE_INTERVAL = 45
+MQTT_QOS          = 1
+MQTT_MAX_INFLIGHT = 20                 # QoS 1 messages waiting for broker acknowledgement
+MQTT_BATCH_SAMPLES = 1                 # > 1 sends this many samples of a topic per message
+MQTT_BATCH_SEC    = 10                 # send a partial batch after this many seconds
 
 # INFLUX_DB
 INFLUX_DB_ENABLED = 0
@@ -85,6 +133,23 @@ INFLUX_PORT       = 8086               # default port
 INFLUX_USER       = "rpi"              # requires write access
 INFLUX_PASSWORD   = "rpi" 
 INFLUX_DBNAME     = "sensor_data"
+INFLUX_TAGS       = {}                 # extra tags for every point, e.g. {"site": "home"}
+INFLUX_BATCH_ROWS = 1000               # post after this many points
+INFLUX_BATCH_SEC  = 10                 # or when the oldest unsent point is this old
+
+# SQLITE
+SQLITE_ENABLED    = 0
+SQLITE_DBNAME     = "basinMaster.db"
+SQLITE_BATCH_ROWS = 500                # commit after this many records
+SQLITE_BATCH_SEC  = 60                 # or when the oldest uncommitted record is this old
+
+# OUTBOX - records for MQTT, INFLUX_DB, IP_PORT and EMAIL_SMS are queued on disk and
+# delivered by a background thread, so records are kept while a destination is down
+OUTBOX_ENABLED    = 1
+OUTBOX_DIR        = "outbox"
+OUTBOX_MAX_BYTES  = 50 * 1024 * 1024   # per destination, oldest records dropped beyond this
+PRIORITY_TOPICS   = ["Alert"]          # topics containing one of these words use the priority lane
+PRIORITY_RETRY_MAX = 30                # seconds, longest retry interval of the priority lane
 
 # BUZZER
 BUZZER_ENABLED = 0
@@ -94,107 +159,367 @@ buzzerPIN = 18                         # Customize based on your wiring
 # --- END USER CONFIGURATION ---
 
 
+if ROLLUP_ENABLED :
+    import pubRollup
+
+if COMPRESS_ENABLED :
+    import pubCompress
+
 if MQTT_ENABLED :
-    import paho.mqtt.client as mqtt
-    mqttClient = mqtt.Client()
+    import pubMqtt
 
 if EMAIL_SMS_ENABLED :
     import sendEmail
 
 if INFLUX_DB_ENABLED :
-    from influxdb import InfluxDBClient
+    import pubInflux
+
+if SQLITE_ENABLED :
+    import pubSqlite
+
+if IP_PORT_ENABLED :
+    import pubIpPort
+
+if OUTBOX_ENABLED :
+    import pubOutbox
 
 if BUZZER_ENABLED :
     import RPi.GPIO as GPIO
-    from threading import Timer
+    import pubBuzzer
+
 
+#
+# Settings that may be changed while running, see runtimeConfig.py
+#
+CONFIG_SCHEMA = {
+    "CSV_FILE_ENABLED":   (int, 0, 1),
+    "ROLLUP_ENABLED":     (int, 0, 1),
+    "ROLLUP_SAMPLE_SEC":  (dict, None, None),
+    "COMPRESS_ENABLED":   (int, 0, 1),
+    "COMPRESS_TOPICS":    (dict, None, None),
+    "COMPRESS_ONLY":      (int, 0, 1),
+    "EMAIL_SMS_ENABLED":  (int, 0, 1),
+    "IP_PORT_ENABLED":    (int, 0, 1),
+    "IP_PORT_HOST":       (str, None, None, r"^\S+$"),
+    "IP_PORT_PORT":       (int, 1, 65535),
+    "IP_PORT_SITE":       (str, None, None, r"^\S*$"),
+    "IP_PORT_BATCH_ROWS": (int, 1, 65535),
+    "IP_PORT_BATCH_SEC":  (runtimeConfig.NUMBER, 0, 3600),
+    "MQTT_ENABLED":       (int, 0, 1),
+    "MQTT_HOST":          (str, None, None, r"^\S+$"),
+    "MQTT_PORT":          (int, 1, 65535),
+    "MQTT_KEEPALIVE_INTERVAL": (int, 5, 3600),
+    "MQTT_QOS":           (int, 0, 2),
+    "MQTT_MAX_INFLIGHT":  (int, 1, 1000),
+    "MQTT_BATCH_SAMPLES": (int, 1, 10000),
+    "MQTT_BATCH_SEC":     (runtimeConfig.NUMBER, 0, 3600),
+    "INFLUX_DB_ENABLED":  (int, 0, 1),
+    "INFLUX_HOST":        (str, None, None, r"^\S+$"),
+    "INFLUX_PORT":        (int, 1, 65535),
+    "INFLUX_USER":        (str, None, None),
+    "INFLUX_PASSWORD":    (str, None, None),
+    "INFLUX_DBNAME":      (str, None, None, r"^\S+$"),
+    "INFLUX_TAGS":        (dict, None, None),
+    "INFLUX_BATCH_ROWS":  (int, 1, 1000000),
+    "INFLUX_BATCH_SEC":   (runtimeConfig.NUMBER, 0, 3600),
+    "SQLITE_ENABLED":     (int, 0, 1),
+    "SQLITE_DBNAME":      (str, None, None, r"^\S+$"),
+    "SQLITE_BATCH_ROWS":  (int, 1, 1000000),
+    "SQLITE_BATCH_SEC":   (runtimeConfig.NUMBER, 0, 3600),
+    "OUTBOX_ENABLED":     (int, 0, 1),
+    "OUTBOX_DIR":         (str, None, None, r"^\S+$"),
+    "OUTBOX_MAX_BYTES":   (int, 1024, None),
+    "PRIORITY_TOPICS":    (list, None, None),
+    "PRIORITY_RETRY_MAX": (runtimeConfig.NUMBER, 1, 3600),
+    "BUZZER_ENABLED":     (int, 0, 1),
+    "buzzerPIN":          (int, 0, 27),
+}
+
+mqttClient = None
+influxClient = None
+sqliteStore = None
+ipPortClient = None
+buzzerDriver = None
+buzzerPinInUse = None     # pin set up for buzzerDriver, buzzerPIN may have changed since
+connected = False
 
 def connectPubScribe() :
-    global mqttClient
-    global influxClient
+    global connected
+
+    for dest in DEST_SETTINGS :
+        connectDest(dest)
+    connected = True
+
+    return
 
-    if MQTT_ENABLED :
-        mqttClient.connect(MQTT_HOST, MQTT_PORT, MQTT_KEEPALIVE_INTERVAL)
 
-    if EMAIL_SMS_ENABLED :
+#
+# Start one destination when it is enabled
+#
+def connectDest(dest) :
+    global mqttClient
+    global influxClient
+    global sqliteStore
+    global ipPortClient
+    global pubRollup, pubCompress, pubMqtt, sendEmail, pubInflux, pubSqlite, pubIpPort, pubOutbox, GPIO, pubBuzzer
+    global buzzerDriver, buzzerPinInUse
+
+    if OUTBOX_ENABLED and dest in (MQTT, EMAIL_SMS, INFLUX_DB, IP_PORT) :
+        import pubOutbox
+
+    if dest == MQTT and MQTT_ENABLED :
+        import pubMqtt
+        mqttClient = pubMqtt.MqttPublisher(MQTT_HOST, MQTT_PORT, MQTT_KEEPALIVE_INTERVAL, qos=MQTT_QOS,
+                                           maxInflight=MQTT_MAX_INFLIGHT, batchSamples=MQTT_BATCH_SAMPLES,
+                                           batchSec=MQTT_BATCH_SEC)
+
+        if OUTBOX_ENABLED :
+            outboxes[MQTT] = pubOutbox.Outbox(MQTT, mqttClient.deliver, OUTBOX_DIR, OUTBOX_MAX_BYTES)
+            outboxes[MQTT + PRIORITY_LANE] = pubOutbox.Outbox(MQTT + PRIORITY_LANE, mqttClient.deliver, OUTBOX_DIR,
+                                                              OUTBOX_MAX_BYTES, retryMax=PRIORITY_RETRY_MAX)
+
+        destSubscribe(MQTT, outboxSubscriber(MQTT, lambda topic, tsec, data, hdr : mqttClient.publish(topic, data, tsec)))
+
+    elif dest == CSV_FILE and CSV_FILE_ENABLED :
+        destSubscribe(CSV_FILE, csvSubscriber)
+
+        if ROLLUP_ENABLED :
+            import pubRollup
+            pubRollup.sampleSec = dict(ROLLUP_SAMPLE_SEC)
+            destSubscribe(CSV_FILE, pubRollup.addRecord)
+
+        if COMPRESS_ENABLED :
+            import pubCompress
+            for topic, bounds in COMPRESS_TOPICS.items() :
+                compressors[topic] = pubCompress.SwingingDoor(bounds)
+                destSubscribe(CSV_FILE, compressRecord, topic)
+
+    elif dest == EMAIL_SMS and EMAIL_SMS_ENABLED :
+        import sendEmail
         sendEmail.loadJsonFile()
         # sendStatus("pubScribe.py", " Program start")
 
-    if INFLUX_DB_ENABLED :
-        influxClient = InfluxDBClient(INFLUX_HOST, INFLUX_PORT, INFLUX_USER, INFLUX_PASSWORD, INFLUX_DBNAME)
+        if OUTBOX_ENABLED :
+            outboxes[EMAIL_SMS] = pubOutbox.Outbox(EMAIL_SMS, deliverEmailSms, OUTBOX_DIR, OUTBOX_MAX_BYTES, batchSize=1)
+            outboxes[EMAIL_SMS + PRIORITY_LANE] = pubOutbox.Outbox(EMAIL_SMS + PRIORITY_LANE, deliverEmailSms, OUTBOX_DIR,
+                                                                   OUTBOX_MAX_BYTES, batchSize=1, retryMax=PRIORITY_RETRY_MAX)
 
-    if BUZZER_ENABLED :
+        destSubscribe(EMAIL_SMS, outboxSubscriber(EMAIL_SMS, lambda topic, tsec, data, hdr : sendEmailSms(topic, data, tsec)))
+
+    elif dest == INFLUX_DB and INFLUX_DB_ENABLED :
+        import pubInflux
+        influxClient = pubInflux.InfluxWriter(INFLUX_HOST, INFLUX_PORT, INFLUX_DBNAME, INFLUX_USER, INFLUX_PASSWORD,
+                                              INFLUX_TAGS, INFLUX_BATCH_ROWS, INFLUX_BATCH_SEC)
+
+        if OUTBOX_ENABLED :
+            outboxes[INFLUX_DB] = pubOutbox.Outbox(INFLUX_DB, influxClient.write, OUTBOX_DIR, OUTBOX_MAX_BYTES,
+                                                   batchSize=INFLUX_BATCH_ROWS, lingerSec=INFLUX_BATCH_SEC)
+
+        destSubscribe(INFLUX_DB, outboxSubscriber(INFLUX_DB, influxClient.add))
+
+    elif dest == SQLITE and SQLITE_ENABLED :
+        import pubSqlite
+        sqliteStore = pubSqlite.SqliteStore(SQLITE_DBNAME, SQLITE_BATCH_ROWS, SQLITE_BATCH_SEC)
+        destSubscribe(SQLITE, sqliteStore.add)
+
+    elif dest == IP_PORT and IP_PORT_ENABLED :
+        import pubIpPort
+        ipPortClient = pubIpPort.IpPortClient(IP_PORT_HOST, IP_PORT_PORT, IP_PORT_SITE or None,
+                                              IP_PORT_BATCH_ROWS, IP_PORT_BATCH_SEC)
+
+        if OUTBOX_ENABLED :
+            outboxes[IP_PORT] = pubOutbox.Outbox(IP_PORT, ipPortClient.deliver, OUTBOX_DIR, OUTBOX_MAX_BYTES,
+                                                 batchSize=IP_PORT_BATCH_ROWS, lingerSec=IP_PORT_BATCH_SEC)
+
+        destSubscribe(IP_PORT, outboxSubscriber(IP_PORT, ipPortClient.add))
+
+    elif dest == BUZZER and BUZZER_ENABLED :
+        import RPi.GPIO as GPIO
+        import pubBuzzer
         # GPIO.setwarnings(False)           # Remove warning message
         GPIO.setmode(GPIO.BCM)              # Set the pin mode to BOARD mode
         GPIO.setup(buzzerPIN, GPIO.OUT)     # Buzzer is output mode
+        buzzerDriver = pubBuzzer.BuzzerDriver(GPIO.PWM(buzzerPIN, pubBuzzer.BUZZER_FREQUENCY))
+        buzzerPinInUse = buzzerPIN
+
+        destSubscribe(BUZZER, lambda topic, tsec, data, hdr : buzzerOn(data))
 
     return
 
 
 
 def disconnectPubScribe() :
-    if MQTT_ENABLED :
-        mqttClient.disconnect()
+    global connected
 
-    if BUZZER_ENABLED :
-        GPIO.cleanup()
+    for dest in DEST_SETTINGS :
+        disconnectDest(dest)
+    connected = False
 
     return
 
 
-def attachFunction() :
+#
+# Stop one destination, whatever settings it was started with
+#
+def disconnectDest(dest) :
+    global mqttClient
+    global influxClient
+    global sqliteStore
+    global ipPortClient
+    global buzzerDriver, buzzerPinInUse
+
+    for sub in destSubs.pop(dest, []) :
+        bus.unsubscribe(sub)
+
+    for name in (dest, dest + PRIORITY_LANE) :
+        if name in outboxes :
+            outboxes.pop(name).close()
+
+    if dest == CSV_FILE :
+        for topic, door in compressors.items() :
+            for tsec, data in door.flush() :
+                writeCsv(topic + pubCompress.COMPRESS_SUFFIX, data, "", tsec)
+        compressors.clear()
+
+        if 'pubRollup' in globals() :
+            pubRollup.flushAll()
+
+    elif dest == MQTT and mqttClient :
+        mqttClient.stop()
+        mqttClient = None
+
+    elif dest == INFLUX_DB and influxClient :
+        influxClient.stop()
+        influxClient = None
+
+    elif dest == SQLITE and sqliteStore :
+        sqliteStore.close()
+        sqliteStore = None
+
+    elif dest == IP_PORT and ipPortClient :
+        ipPortClient.stop()
+        ipPortClient = None
+
+    elif dest == BUZZER and buzzerDriver :
+        buzzerDriver.stop()
+        buzzerDriver = None
+        GPIO.cleanup(buzzerPinInUse)        # only the buzzer pin, the sensor and pump pins stay in use
+        buzzerPinInUse = None
+
     return
 
+
+#
+# Settings changed while running, restart only the destinations using them
+#
+def reconfigure(changed) :
+    if not connected :
+        return
+
+    for dest, settings in DEST_SETTINGS.items() :
+        if changed & set(settings) :
+            print("Restarting " + dest)
+            disconnectDest(dest)
+            connectDest(dest)
+
+
+#
+# Topic bus, see pubBus.py
+#
+bus = pubBus.TopicBus()
+destSubs = {}          # dest: subscriptions of the enabled destination
+
+#
+# Call callback(topic, tsec, data, hdr) for every record published to a topic
+# matching pattern, e.g. 'basinMaster/#' or '+/Alert'. Returns the
+# subscription for unsubscribe(). A callback given a destination name only
+# receives records whose dest list names it.
+#
+def subscribe(pattern, callback, name=None) :
+    return bus.subscribe(pattern, callback, name)
+
+def unsubscribe(sub) :
+    return bus.unsubscribe(sub)
+
+def destSubscribe(dest, callback, pattern='#') :
+    destSubs.setdefault(dest, []).append(bus.subscribe(pattern, callback, dest))
+
+#
+# Callback for a destination, records are queued in its outbox when it has one
+#
+def outboxSubscriber(dest, send) :
+    def callback(topic, tsec, data, hdr) :
+        if isPriority(topic) and dest + PRIORITY_LANE in outboxes :
+            outboxes[dest + PRIORITY_LANE].put(topic, tsec, data, hdr)
+        elif dest in outboxes :
+            outboxes[dest].put(topic, tsec, data, hdr)
+        else :
+            send(topic, tsec, data, hdr)
+    return callback
+
+
+#
+# Records that skip the queue of their destination, e.g. alerts
+#
+def isPriority(topic) :
+    upperTopic = topic.upper()
+    return any(word.upper() in upperTopic for word in PRIORITY_TOPICS)
+
+
+#
+# Outboxes by destination, see pubOutbox.py. The priority lane of a
+# destination is the outbox named dest + PRIORITY_LANE.
+#
+outboxes = {}
+PRIORITY_LANE = "_PRIORITY"
+
+#
+# Outbox lag and delivery metrics by destination
+#
+def outboxStats() :
+    return {dest : outbox.stats() for dest, outbox in outboxes.items()}
+
 # Destinations
 MQTT = 'MQTT'
 CSV_FILE = 'CSV_FILE'
 EMAIL_SMS = 'EMAIL_SMS'
 INFLUX_DB = 'INFLUX_DB'
 BUZZER = 'BUZZER'
+SQLITE = 'SQLITE'
+IP_PORT = 'IP_PORT'
+
+# Settings used by each destination, a change restarts the destination
+OUTBOX_SETTINGS = ("OUTBOX_ENABLED", "OUTBOX_DIR", "OUTBOX_MAX_BYTES")
+DEST_SETTINGS = {
+    MQTT:      ("MQTT_ENABLED", "MQTT_HOST", "MQTT_PORT", "MQTT_KEEPALIVE_INTERVAL", "MQTT_QOS", "MQTT_MAX_INFLIGHT",
+                "MQTT_BATCH_SAMPLES", "MQTT_BATCH_SEC", "PRIORITY_RETRY_MAX") + OUTBOX_SETTINGS,
+    CSV_FILE:  ("CSV_FILE_ENABLED", "ROLLUP_ENABLED", "ROLLUP_SAMPLE_SEC", "COMPRESS_ENABLED", "COMPRESS_TOPICS"),
+    EMAIL_SMS: ("EMAIL_SMS_ENABLED", "PRIORITY_RETRY_MAX") + OUTBOX_SETTINGS,
+    INFLUX_DB: ("INFLUX_DB_ENABLED", "INFLUX_HOST", "INFLUX_PORT", "INFLUX_USER", "INFLUX_PASSWORD", "INFLUX_DBNAME",
+                "INFLUX_TAGS", "INFLUX_BATCH_ROWS", "INFLUX_BATCH_SEC") + OUTBOX_SETTINGS,
+    SQLITE:    ("SQLITE_ENABLED", "SQLITE_DBNAME", "SQLITE_BATCH_ROWS", "SQLITE_BATCH_SEC"),
+    IP_PORT:   ("IP_PORT_ENABLED", "IP_PORT_HOST", "IP_PORT_PORT", "IP_PORT_SITE", "IP_PORT_BATCH_ROWS",
+                "IP_PORT_BATCH_SEC") + OUTBOX_SETTINGS,
+    BUZZER:    ("BUZZER_ENABLED", "buzzerPIN"),
+}
 
 
 #
 # Publish data record
-# dest: [MQTT, CSV_FILE, EMAIL_SMS, INFLUX_DB]
+# dest: [MQTT, CSV_FILE, EMAIL_SMS, INFLUX_DB, SQLITE, IP_PORT, BUZZER]
 # topic: 'topic/subtopic', 'topic/subtopic/alert', or etc.
 # data: dict, list, or str
 #
+forward = None         # function(dest, topic, tsec, data, hdr) replacing local publishing, see procSplit.py
+
 def pubRecord(dest, topic, data, hdr="") :
     # print("DEST: ", dest, " TOPIC: ", topic, " DATA: ", data, " HDR: ", hdr)
 
-    if MQTT_ENABLED and (MQTT in dest) :
-        if not isinstance(data,str) :
-            msg = json.dumps(data)
-        else :
-            msg = data
-        mqttClient.publish(topic, msg)
-
-    if CSV_FILE_ENABLED and (CSV_FILE in dest) :
-        writeCsv(topic, data, hdr)
-
-    if EMAIL_SMS_ENABLED and (EMAIL_SMS in dest) :
-        if not isinstance(data, str) :
-            msg = str(data)
-        # if not isinstance(data,str) :
-        #     msg = json.dumps(data, indent=4)
-        else :
-            msg = data
+    if forward :
+        forward(dest, topic, time.time(), data, hdr)
+        return
 
-        upperTopic = topic.upper()
-        if 'ALERT' in upperTopic :
-            sendAlert(topic, msg)
-        elif 'STATUS' in upperTopic :
-            sendStatus(topic, msg)
-
-    if INFLUX_DB_ENABLED and (INFLUX_DB in dest) :
-        if not isinstance(data,str) :
-            msg = json.dumps(data)
-        else :
-            msg = data
-        influxClient.write_points(msg)
-
-    if BUZZER_ENABLED and (BUZZER in dest) :
-        buzzerOn(data)
+    bus.publish(topic, data, hdr, time.time(), dest)
 
     return
 
@@ -202,31 +527,37 @@ def pubRecord(dest, topic, data, hdr="") :
 #
 # CSV files
 #
-topicFmtStr = {}       # format string for data records in a topic's csv file
 topicFiles = {}        # Dictionary of csv files that exist
 
 #
 # Enables custom format strings per topic when writting csv files
 #
 def addTopicFmtStr(topic, fmtStr) :
-    topicFmtStr[topic] = fmtStr
+    pubSchema.getSchema(topic).fmtStr = fmtStr
 
 #
-# For new files, create a header row using dict or from hdr
+# Number formats per field of a topic's dict records, e.g. {"ABP (in)": "{:.2f}"}
+#
+def addTopicFormats(topic, formats) :
+    pubSchema.getSchema(topic).setFormats(formats)
+
+#
+# For new files, create a header row using the topic's columns or from hdr
 #
 def addTopicFileHeaders(filename, topic, data, hdr="") :
     result = ""
 
     if not (topic in topicFiles) :
         topicFiles[topic] = hdr
+        schema = pubSchema.getSchema(topic)
         if not os.path.isfile(filename) :
             # If csv log file does not exist, write header
-            result = 'UNIX time (s),DateTime,'
+            result = pubSchema.CSV_TIME_COLUMNS
 
             if isinstance(data, dict) :
-                # print("dict: ", data)
-                result += ",".join("{}".format(k) for k in data)    # keys
-                # print(result)
+                if schema.fields is None :
+                    schema.compile(data)
+                result += schema.headerFields()     # keys
 
             else :
                 # print("Else: ", hdr)
@@ -235,33 +566,61 @@ def addTopicFileHeaders(filename, topic, data, hdr="") :
 
             result += '\n'
 
+        elif isinstance(data, dict) and schema.fields is None :
+            schema.loadHeader(filename)            # columns of the existing file
+
     return result
 
 
+#
+# CSV_FILE subscriber
+#
+def csvSubscriber(topic, tsec, data, hdr) :
+    if not (COMPRESS_ONLY and topic in compressors) :
+        writeCsv(topic, data, hdr, tsec)
+
+
+#
+# Swinging door compression, see pubCompress.py
+#
+compressors = {}       # topic: pubCompress.SwingingDoor
+
+def compressRecord(topic, tsec, data, hdr) :
+    if isinstance(data, dict) :
+        for t, bp in compressors[topic].add(tsec, data) :
+            writeCsv(topic + pubCompress.COMPRESS_SUFFIX, bp, "", t)
+
+
 #
 # Append data to CSV file
 #
-def writeCsv(topic, data, hdr="") :
+def writeCsv(topic, data, hdr="", tsec=None) :
     filename = topic.replace('/','_') + ".csv"
     # print("Filename: ", filename)
+    if tsec is None :
+        tsec = time.time()
 
+    schema = pubSchema.getSchema(topic)
     s = addTopicFileHeaders(filename, topic, data, hdr)
 
-    s += str(round(time.time())) + "," + datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S,')
-
     if isinstance(data, dict) :
-        s += ",".join("{}".format(v) for k, v in data.items())             # values
+        values = schema.dictValues(data)
+        if schema.needsNewFile :
+            # new keys do not fit under the existing header, start a new file
+            schema.needsNewFile = False
+            if os.path.isfile(filename) :
+                os.rename(filename, filename[:-4] + time.strftime(".%Y%m%d-%H%M%S.csv", time.localtime(tsec)))
+            s = pubSchema.CSV_TIME_COLUMNS + schema.headerFields() + '\n'
+        s += schema.timePrefix(tsec) + values
 
     elif isinstance(data, list) :
-        if topic in topicFmtStr :
-            s += topicFmtStr[topic].format(*data)
-        else :
-            s += ('{},'*len(data)).format(*data)
+        s += schema.timePrefix(tsec) + schema.listValues(data)
 
     elif isinstance(data, str) :
-        s += data
+        s += schema.timePrefix(tsec) + data
 
     else :
+        s += schema.timePrefix(tsec)
         print("Type not supported")
    
     # write interval data to csv file
@@ -275,43 +634,66 @@ def writeCsv(topic, data, hdr="") :
 # EMAIL SMS
 #
 
+#
+# Send alert or status email depending on topic, tsec is the time of the record
+# Returns True if sent or if the topic is neither alert nor status
+#
+def sendEmailSms(topic, data, tsec=None) :
+    if not isinstance(data, str) :
+        msg = str(data)
+    # if not isinstance(data,str) :
+    #     msg = json.dumps(data, indent=4)
+    else :
+        msg = data
+
+    upperTopic = topic.upper()
+    if 'ALERT' in upperTopic :
+        return sendAlert(topic, msg, tsec)
+    elif 'STATUS' in upperTopic :
+        return sendStatus(topic, msg, tsec)
+    return True
+
+
+#
+# Outbox delivery, one message per batch so a failure never resends a message
+#
+def deliverEmailSms(records) :
+    for record in records :
+        if not sendEmailSms(record["topic"], record["data"], record["t"]) :
+            raise IOError("Email not sent")
+
+
 #
 # Send alert via email to another email or as SMS text
 #
-def sendAlert(subj, msg) :
-    msg = time.strftime("%a, %d %b %Y %H:%M:%S \n", time.localtime()) + msg
-    sendEmail.send_mail(sendEmail.ALERT_USERID, subj, msg)
+def sendAlert(subj, msg, tsec=None) :
+    msg = time.strftime("%a, %d %b %Y %H:%M:%S \n", time.localtime(tsec)) + msg
+    return sendEmail.send_mail(sendEmail.ALERT_USERID, subj, msg)
 
 
 #
 # Send status via email to another email or as SMS text
 #
-def sendStatus(subj, msg) :
-    msg = time.strftime("%a, %d %b %Y %H:%M:%S \n", time.localtime()) + msg
-    sendEmail.send_mail(sendEmail.STATUS_USERID, subj, msg)
+def sendStatus(subj, msg, tsec=None) :
+    msg = time.strftime("%a, %d %b %Y %H:%M:%S \n", time.localtime(tsec)) + msg
+    return sendEmail.send_mail(sendEmail.STATUS_USERID, subj, msg)
 
 
 #
 # Buzzer On
 #
-buzzer = []
-
 def buzzerOn(data) :
-    global buzzer
     print(datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S '),"Buzzer On", " F: ", data.get('Frequency', 700),  " DC: ", data.get('Dutycycle', 10),  " Duration(s): ", data.get('Duration',10))
 
-    buzzer = GPIO.PWM(buzzerPIN, data.get('Frequency', 700))    # Default is 700 Hz
-    buzzer.start(data.get('Dutycycle', 10))                      # Default is 10%
-    Timer(data.get('Duration',10), buzzerOff).start()            # Default is 10 seconds
+    buzzerDriver.play(data)        # queued by priority, see pubBuzzer.py for the pattern keys
 
 
 #
 # Buzzer Off
 #
 def buzzerOff() :
-    global buzzer
     print(datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S '), "Buzzer Off")
-    buzzer.stop()
+    buzzerDriver.clear()
 
 
 
@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+  2026/10/19  BrucesHobbies   Case-insensitive column names, failed batches go to <db>.rejected
+
+
+OVERVIEW:
+    SQLite storage destination for pubScribe. Uses the sqlite3 module that is
+    part of Python so no database server is needed on the RPi.
+
+    Each topic is stored in its own table named after the topic with '/'
+    replaced by '_' (same as the csv filename). Columns are "ts" (UNIX time in
+    seconds, indexed) followed by one column per dict key or hdr column.
+    A column is added when a dict gains a key. str records are stored in a
+    "data" column. The -99 sensor fault value is stored as NULL so that
+    aggregates skip it.
+
+    The database runs in WAL mode. Records are held in memory and written in
+    one transaction when SQLITE_BATCH_ROWS records are pending or the oldest
+    pending record is SQLITE_BATCH_SEC seconds old.
+
+    Column names are case-insensitive in SQLite, so "Depth" and "depth" are
+    the same column. When a transaction fails each table is tried again in
+    its own transaction. Records of a table that still fails are appended to
+    <dbname>.rejected as JSON lines and dropped, so one bad record can not
+    block every later commit.
+
+    Query examples:
+        store = SqliteStore("basinMaster.db")
+        cols, rows = store.queryRange("basinMaster/WaterDepth", tStart, tEnd)
+        rows = store.queryAggregate("basinMaster/WaterDepth", "ABP (in)", tStart, tEnd, 3600)
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import sys
+import json
+import time
+import sqlite3
+
+
+SQLITE_BATCH_ROWS = 500       # commit when this many records are pending
+SQLITE_BATCH_SEC  = 60        # commit when the oldest pending record is this old
+
+MISSING_VALUE = -99           # sensor fault sentinel, stored as NULL
+
+
+#
+# Table name and quoted identifiers
+#
+def tableName(topic) :
+    return topic.replace('/','_')
+
+
+def quoteId(name) :
+    return '"' + name.replace('"', '""') + '"'
+
+
+#
+# (column, value) pairs of a record, same column naming as the csv files
+#
+def recordColumns(data, hdr="") :
+    if isinstance(data, dict) :
+        items = data.items()
+    elif isinstance(data, list) :
+        names = hdr.split(',') if hdr else []
+        names += ["col" + str(idx) for idx in range(len(names) + 1, len(data) + 1)]
+        items = zip(names, data)
+    else :
+        return [("data", str(data))]
+
+    return [(k, None if v == MISSING_VALUE else v) for k, v in items]
+
+
+class SqliteStore :
+    def __init__(self, dbname, batchRows=SQLITE_BATCH_ROWS, batchSec=SQLITE_BATCH_SEC) :
+        self.dbname = dbname
+        self.db = sqlite3.connect(dbname, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+
+        self.batchRows = batchRows
+        self.batchSec = batchSec
+
+        self.columns = {}           # table: list of data columns
+        self.pending = {}           # table: list of (ts, [(column, value), ...])
+        self.nPending = 0
+        self.oldest = None          # time of the oldest pending record
+        self.rejected = 0           # records written to <dbname>.rejected
+
+        self.loadColumns()
+
+    #
+    # Table columns as they are in the database
+    #
+    def loadColumns(self) :
+        self.columns = {}
+        for (table,) in self.db.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall() :
+            self.columns[table] = [row[1] for row in self.db.execute("PRAGMA table_info(" + quoteId(table) + ")")][1:]
+
+    #
+    # Create the topic table or add columns that are new
+    #
+    def ensureColumns(self, table, columns) :
+        if table not in self.columns :
+            colDefs = ", ".join(quoteId(c) for c in columns)
+            self.db.execute("CREATE TABLE IF NOT EXISTS " + quoteId(table) + " (ts REAL NOT NULL" + (", " + colDefs if colDefs else "") + ")")
+            self.db.execute("CREATE INDEX IF NOT EXISTS " + quoteId(table + "_ts") + " ON " + quoteId(table) + " (ts)")
+            self.columns[table] = list(columns)
+            return
+
+        known = {c.lower() for c in self.columns[table]}
+        for c in columns :
+            if c.lower() not in known :
+                self.db.execute("ALTER TABLE " + quoteId(table) + " ADD COLUMN " + quoteId(c))
+                self.columns[table].append(c)
+                known.add(c.lower())
+
+    #
+    # Queue one record, commits when the batch size or age is reached
+    #
+    def add(self, topic, tsec, data, hdr="") :
+        self.pending.setdefault(tableName(topic), []).append((tsec, recordColumns(data, hdr)))
+        self.nPending += 1
+        if self.oldest is None :
+            self.oldest = time.time()
+
+        if self.nPending >= self.batchRows or (time.time() - self.oldest) >= self.batchSec :
+            self.flush()
+
+    #
+    # Write all pending records in one transaction
+    #
+    def flush(self) :
+        if self.nPending :
+            self.write(self.takePending())
+
+    #
+    # Pending records {table: records}, the store starts a new batch
+    #
+    def takePending(self) :
+        pending = self.pending
+        self.pending = {}
+        self.nPending = 0
+        self.oldest = None
+        return pending
+
+    #
+    # Write taken records in one transaction, or per table when that fails.
+    #   Returns the number of records rejected.
+    #
+    def write(self, pending) :
+        try :
+            self.insert(pending)
+            return 0
+        except sqlite3.Error as e :
+            print("SQLite commit failed, retrying per table: " + str(e))
+
+        nRejected = 0
+        for table, records in pending.items() :
+            try :
+                self.insert({table: records})
+            except sqlite3.Error as e :
+                self.reject(table, records, e)
+                nRejected += len(records)
+        return nRejected
+
+    #
+    # Append records of a table that can not be written to <dbname>.rejected
+    #
+    def reject(self, table, records, error) :
+        print("SQLite rejected {} records of {}: {}".format(len(records), table, error))
+        with open(self.dbname + ".rejected", "a") as f :
+            for tsec, cols in records :
+                f.write(json.dumps({"table": table, "ts": tsec, "columns": cols, "error": str(error)}, default=str) + "\n")
+        self.rejected += len(records)
+
+    #
+    # One transaction, the column lists are reloaded when it fails since
+    #   CREATE and ALTER may or may not have been rolled back with it
+    #
+    def insert(self, pending) :
+        try :
+            self.transaction(pending)
+        except sqlite3.Error :
+            self.loadColumns()
+            raise
+
+    def transaction(self, pending) :
+        with self.db :
+            for table, records in pending.items() :
+                names = []
+                for tsec, cols in records :
+                    for c, v in cols :
+                        if c not in names :
+                            names.append(c)
+                self.ensureColumns(table, names)
+
+                # group records with the same column set into one executemany
+                groups = {}
+                for tsec, cols in records :
+                    key = tuple(c for c, v in cols)
+                    groups.setdefault(key, []).append([tsec] + [v for c, v in cols])
+
+                for key, rows in groups.items() :
+                    sql = "INSERT INTO " + quoteId(table) + " (ts" + "".join(", " + quoteId(c) for c in key) + \
+                          ") VALUES (?" + ", ?" * len(key) + ")"
+                    self.db.executemany(sql, rows)
+
+    def close(self) :
+        self.flush()
+        self.db.close()
+
+    #
+    # Rows of topic with tStart <= ts <= tEnd in time order.
+    #   Returns (column names, list of row tuples), ts is the first column.
+    #
+    def queryRange(self, topic, tStart=None, tEnd=None, fields=None) :
+        self.flush()
+        table = tableName(topic)
+        if table not in self.columns :
+            return [], []
+
+        cols = ["ts"] + (list(fields) if fields else self.columns[table])
+        sql = "SELECT " + ", ".join(quoteId(c) for c in cols) + " FROM " + quoteId(table) + \
+              " WHERE ts >= ? AND ts <= ? ORDER BY ts"
+        rows = self.db.execute(sql, (tStart if tStart is not None else float("-inf"),
+                                     tEnd if tEnd is not None else float("inf"))).fetchall()
+        return cols, rows
+
+    #
+    # Per bucket (bucket start, count, min, max, mean) of one field of topic
+    #
+    def queryAggregate(self, topic, field, tStart=None, tEnd=None, bucketSec=3600) :
+        self.flush()
+        table = tableName(topic)
+        if table not in self.columns or field not in self.columns[table] :
+            return []
+
+        f = quoteId(field)
+        sql = "SELECT CAST(ts / ? AS INTEGER) * ? AS bucket, COUNT(" + f + "), MIN(" + f + "), MAX(" + f + "), AVG(" + f + ")" + \
+              " FROM " + quoteId(table) + " WHERE ts >= ? AND ts <= ? GROUP BY bucket ORDER BY bucket"
+        return self.db.execute(sql, (bucketSec, bucketSec,
+                                     tStart if tStart is not None else float("-inf"),
+                                     tEnd if tEnd is not None else float("inf"))).fetchall()
+
+
+#
+# Test / debug, import a topic csv file and print hourly aggregates
+#
+if __name__ == '__main__':
+    import csv
+
+    topic = sys.argv[1] if len(sys.argv) > 1 else "basinMaster/WaterDepth"
+    store = SqliteStore("basinMaster.db")
+
+    t0 = time.time()
+    n = 0
+    with open(tableName(topic) + ".csv", 'r') as csvFile :
+        reader = csv.reader(csvFile)
+        hdr = next(reader)
+        for row in reader :
+            try :
+                data = {k : float(v) for k, v in zip(hdr[2:], row[2:])}
+                store.add(topic, float(row[0]), data)
+                n += 1
+            except ValueError :
+                pass
+    store.flush()
+    print("Inserted {} rows in {:.1f} s".format(n, time.time() - t0))
+
+    cols, rows = store.queryRange(topic)
+    if rows :
+        tEnd = rows[-1][0]
+        for col in cols[1:] :
+            t0 = time.time()
+            agg = store.queryAggregate(topic, col, tEnd - 24*3600, tEnd, 3600)
+            print("{}: {} hourly buckets in last 24 h ({:.3f} s)".format(col, len(agg), time.time() - t0))
+
+    store.close()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+
+
+OVERVIEW:
+    Streaming sump pump cycle detector. The water depth is a sawtooth: the
+    basin fills, then the pump starts and drops the level quickly. Each
+    depth sample updates the detector in constant time and events are
+    returned as (topic, record) for pubScribe:
+
+    basinMaster/Pump/Start   pump started, the basin had filled
+        Peak (in)            depth when the pump started
+        Fill rate (in/hr)    least squares slope of the fill
+        Fill time (s)        from the previous pump stop
+        Period (s)           from the previous pump start
+    basinMaster/Pump/Stop    level stopped falling
+        Trough (in)          lowest depth
+        Pumped (in)          peak - trough
+        Run time (s)         peak sample to lowest sample, at sample resolution
+        Duty cycle (%)       run time / period
+    basinMaster/Pump/Alert   anomaly, text
+        - level above the usual pump on level by highMargin, pump did not start
+        - pump run lowered the level less than shortFactor times the usual
+          amount (short cycling), independent of the inflow rate
+
+    The usual pump on level and pumped depth are exponential averages of
+    past cycles, so they follow slow changes such as a reset float switch.
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import sys
+import time
+
+
+MISSING_VALUE = -99
+
+PUMP_DROP_IN       = 1.0      # inches the level must fall below its peak to count as the pump running
+PUMP_NOISE_IN      = 0.2      # rise above the trough that ends a pump run
+PUMP_HIGH_MARGIN   = 1.5      # inches above the usual pump on level for a pump did not start alert
+PUMP_SHORT_CYCLE   = 0.5      # alert when a run pumps less than this fraction of the usual depth
+PUMP_AVERAGING     = 0.2      # weight of the newest cycle in the usual levels
+PUMP_LEARN_CYCLES  = 3        # cycles before anomaly alerts are enabled
+
+START_TOPIC = "basinMaster/Pump/Start"
+STOP_TOPIC  = "basinMaster/Pump/Stop"
+ALERT_TOPIC = "basinMaster/Pump/Alert"
+
+FILLING = 0
+PUMPING = 1
+
+
+class PumpCycleDetector :
+    def __init__(self, dropIn=PUMP_DROP_IN, noiseIn=PUMP_NOISE_IN, highMargin=PUMP_HIGH_MARGIN,
+                 shortFactor=PUMP_SHORT_CYCLE) :
+        self.dropIn = dropIn
+        self.noiseIn = noiseIn
+        self.highMargin = highMargin
+        self.shortFactor = shortFactor
+
+        self.state = FILLING
+        self.peak = None                 # (tsec, depth) highest since the last pump stop
+        self.trough = None               # (tsec, depth) lowest since the pump started
+        self.fillStart = None            # tsec of the last pump stop
+        self.lastStart = None            # tsec of the last pump start
+        self.lastPeriod = None
+        self.resetFit()
+
+        # learned from past cycles
+        self.cycles = 0
+        self.usualPeak = None
+        self.usualPeriod = None
+        self.usualPumped = None
+        self.alerted = False             # pump did not start alert sent this cycle
+
+    #
+    # Running sums for the least squares fill rate, times relative to t0
+    #
+    def resetFit(self, t0=None) :
+        self.t0 = t0
+        self.n = 0
+        self.st = self.sv = self.stt = self.stv = 0.0
+
+    def fillRate(self) :
+        d = self.n * self.stt - self.st * self.st
+        if self.n < 2 or d <= 0 :
+            return None
+        return (self.n * self.stv - self.st * self.sv) / d * 3600.0
+
+    def average(self, old, new) :
+        return new if old is None else old + PUMP_AVERAGING * (new - old)
+
+    #
+    # Add one depth sample, returns a list of (topic, record)
+    #
+    def add(self, tsec, depth) :
+        if depth is None or depth == MISSING_VALUE :
+            return []
+        events = []
+
+        if self.state == FILLING :
+            if self.t0 is None :
+                self.resetFit(tsec)
+            x = tsec - self.t0
+            self.n += 1
+            self.st += x
+            self.sv += depth
+            self.stt += x * x
+            self.stv += x * depth
+
+            if self.peak is None or depth >= self.peak[1] :
+                self.peak = (tsec, depth)
+
+            if depth < self.peak[1] - self.dropIn :
+                events += self.pumpStart(tsec, depth)
+            else :
+                events += self.checkFilling(tsec, depth)
+
+        else :
+            if depth < self.trough[1] :
+                self.trough = (tsec, depth)
+            elif depth > self.trough[1] + self.noiseIn :
+                events += self.pumpStop(tsec, depth)
+
+        return events
+
+    def pumpStart(self, tsec, depth) :
+        events = []
+        tPeak, peak = self.peak
+        record = {"Peak (in)": round(peak, 2), "Fill rate (in/hr)": MISSING_VALUE, "Fill time (s)": MISSING_VALUE,
+                  "Period (s)": MISSING_VALUE}
+
+        rate = self.fillRate()
+        if rate is not None :
+            record["Fill rate (in/hr)"] = round(rate, 2)
+        if self.fillStart is not None :
+            record["Fill time (s)"] = round(tPeak - self.fillStart)
+
+        if self.lastStart is not None :
+            period = tPeak - self.lastStart
+            record["Period (s)"] = round(period)
+            self.lastPeriod = period
+            self.usualPeriod = self.average(self.usualPeriod, period)
+
+        self.usualPeak = self.average(self.usualPeak, peak)
+        self.lastStart = tPeak
+        self.state = PUMPING
+        self.trough = (tsec, depth)
+        self.alerted = False
+        events.append((START_TOPIC, record))
+        return events
+
+    def pumpStop(self, tsec, depth) :
+        tPeak, peak = self.peak
+        tTrough, trough = self.trough
+        runTime = tTrough - tPeak
+        record = {"Trough (in)": round(trough, 2), "Pumped (in)": round(peak - trough, 2),
+                  "Run time (s)": round(runTime), "Duty cycle (%)": MISSING_VALUE}
+        if self.lastPeriod :
+            record["Duty cycle (%)"] = round(100.0 * runTime / self.lastPeriod, 1)
+
+        events = [(STOP_TOPIC, record)]
+        pumped = peak - trough
+        if self.cycles >= PUMP_LEARN_CYCLES and pumped < self.shortFactor * self.usualPumped :
+            events.append((ALERT_TOPIC, "Pump short cycling: pumped {:.1f} in, usually {:.1f} in".format(pumped, self.usualPumped)))
+        self.usualPumped = self.average(self.usualPumped, pumped)
+
+        self.cycles += 1
+        self.state = FILLING
+        self.fillStart = tTrough
+        self.peak = (tsec, depth)
+        self.resetFit(tTrough)
+        for t, v in (self.trough, (tsec, depth)) :     # the fill starts at the trough
+            x = t - self.t0
+            self.n += 1
+            self.st += x
+            self.sv += v
+            self.stt += x * x
+            self.stv += x * v
+        return events
+
+    def checkFilling(self, tsec, depth) :
+        if self.cycles < PUMP_LEARN_CYCLES or self.alerted or depth <= self.usualPeak + self.highMargin :
+            return []
+        self.alerted = True
+        return [(ALERT_TOPIC, "Pump did not start: water {:.1f} in, pump usually starts at {:.1f} in".format(depth, self.usualPeak))]
+
+
+#
+# Test / debug, simulated sump with a failing pump and short cycling
+#
+if __name__ == '__main__':
+    import random
+
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    random.seed(2)
+    detector = PumpCycleDetector()
+
+    depth = 3.0
+    pumping = False
+    counts = {}
+    t0 = time.time()
+    for i in range(samples) :
+        tsec = 1.6e9 + 60 * i
+        stuck = samples * 0.3 < i < samples * 0.3 + 600          # float switch stuck, pump late
+        short = samples * 0.7 < i < samples * 0.7 + 600          # pump stops after one step
+
+        if pumping :
+            depth -= 2.5
+            if depth <= 3.0 or short :
+                pumping = False
+        else :
+            depth += 0.05
+            if depth >= (14.0 if stuck else 9.0) :
+                pumping = True
+
+        for topic, record in detector.add(tsec, round(depth + random.gauss(0, 0.05), 2)) :
+            counts[topic] = counts.get(topic, 0) + 1
+            if topic == ALERT_TOPIC :
+                print(time.strftime("%Y-%m-%d %H:%M ", time.localtime(tsec)) + record)
+    elapsed = time.time() - t0
+
+    print(counts, "usual period {:.0f} s, {:.2f} us per sample".format(detector.usualPeriod, elapsed / samples * 1e6))
@@ -0,0 +1,378 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+  2026/10/19  BrucesHobbies   Failed reloads are printed and the running settings kept
+
+
+OVERVIEW:
+    Runtime configuration that is applied live, without restarting.
+
+    Each module registers the module level settings it allows to change
+    with a schema, {name: (types, min, max)} or (str, None, None, pattern),
+    and an optional function called with the set of names that changed:
+
+        config = runtimeConfig.RuntimeConfig("basinMasterCfg.json")
+        config.register("basinMaster", basinMaster, basinMaster.CONFIG_SCHEMA, basinMaster.reconfigure)
+        config.load()
+        ...
+        config.check()          # in the main loop, returns at once when nothing changed
+
+    The file is JSON with a section per module, e.g.
+        {"basinMaster": {"measTime": 60, "pumpOnTime": 5},
+         "pubScribe":   {"MQTT_ENABLED": 1, "MQTT_HOST": "192.168.100.11"}}
+
+    On first start the file is created from the current module values.
+    Settings missing from the file keep their current value. A file with an
+    unknown setting or a value that fails the schema is rejected as a whole
+    and the running configuration is kept, so a half saved edit or a typo
+    never applies part of a change. When a module fails to apply a change
+    (its onChange raises) the previous values are put back. An error in
+    any watched file's function is printed and the main loop goes on.
+
+    The file is watched with Linux inotify (through ctypes) on its
+    directory, so editors that save by writing a new file and renaming it
+    are seen too. Where inotify is not available the modification time is
+    polled every CONFIG_POLL_SEC seconds. Other files, e.g. alertRules.json,
+    can be watched with watchFile().
+
+    Test / debug, apply changes to a scratch file as they are saved:
+        python3 runtimeConfig.py [file]
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import struct
+import select
+import ctypes
+import ctypes.util
+
+
+CONFIG_FILE     = "basinMasterCfg.json"
+CONFIG_POLL_SEC = 5          # seconds between modification time checks without inotify
+
+NUMBER = (int, float)        # schema type for settings that take either
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO    = 0x00000080
+IN_Q_OVERFLOW  = 0x00004000
+IN_EVENT       = struct.Struct("iIII")       # wd, mask, cookie, len, followed by name
+
+
+#
+# inotify instance from libc, None when not available
+#
+def inotifyInit() :
+    try :
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError) :
+        return None, None
+    if fd < 0 :
+        return None, None
+    return libc, fd
+
+
+#
+# Reports which of a set of files changed since the last call
+#
+class FileWatcher :
+    def __init__(self, paths=(), pollSec=CONFIG_POLL_SEC, useInotify=True) :
+        self.pollSec = pollSec
+        self.paths = set()
+        self.stamps = {}                 # path: (mtime_ns, size, inode), polling only
+        self.dirs = {}                   # inotify watch descriptor: directory
+        self.nextPoll = 0
+
+        self.libc, self.fd = inotifyInit() if useInotify else (None, None)
+
+        for path in paths :
+            self.add(path)
+
+    def add(self, path) :
+        path = os.path.abspath(path)
+        self.paths.add(path)
+        self.stamps[path] = self.stamp(path)
+
+        if self.fd is not None :
+            directory = os.path.dirname(path)
+            if directory not in self.dirs.values() :
+                wd = self.libc.inotify_add_watch(self.fd, directory.encode(), IN_CLOSE_WRITE | IN_MOVED_TO)
+                if wd < 0 :
+                    print("inotify watch failed for " + directory + ", polling instead")
+                    self.close()
+                else :
+                    self.dirs[wd] = directory
+
+    def stamp(self, path) :
+        try :
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError :
+            return None
+
+    #
+    # Set of watched paths that changed, waits up to timeout seconds with inotify
+    #
+    def changed(self, timeout=0) :
+        if self.fd is None :
+            return self.poll()
+
+        changed = set()
+        if not select.select([self.fd], [], [], timeout)[0] :
+            return changed
+        while True :
+            try :
+                buf = os.read(self.fd, 4096)
+            except BlockingIOError :
+                break
+            pos = 0
+            while pos < len(buf) :
+                wd, mask, cookie, length = IN_EVENT.unpack_from(buf, pos)
+                name = buf[pos + IN_EVENT.size : pos + IN_EVENT.size + length].split(b'\0', 1)[0]
+                pos += IN_EVENT.size + length
+                if mask & IN_Q_OVERFLOW :
+                    changed |= self.paths
+                elif wd in self.dirs :
+                    path = os.path.join(self.dirs[wd], os.fsdecode(name))
+                    if path in self.paths :
+                        changed.add(path)
+        return changed
+
+    def poll(self) :
+        changed = set()
+        now = time.monotonic()
+        if now < self.nextPoll :
+            return changed
+        self.nextPoll = now + self.pollSec
+        for path in self.paths :
+            stamp = self.stamp(path)
+            if stamp != self.stamps[path] :
+                self.stamps[path] = stamp
+                changed.add(path)
+        return changed
+
+    def close(self) :
+        if self.fd is not None :
+            os.close(self.fd)
+            self.fd = None
+            self.dirs = {}
+
+
+#
+# Errors of one value against its schema entry, [] when valid
+#
+def checkValue(name, value, spec) :
+    types, lo, hi = spec[:3]
+    types = types if isinstance(types, tuple) else (types,)
+    if isinstance(value, bool) != (bool in types) or not isinstance(value, types) :
+        return ["{}: expected {}, got {!r}".format(name, "/".join(t.__name__ for t in types), value)]
+    if lo is not None and value < lo :
+        return ["{}: {!r} is less than {}".format(name, value, lo)]
+    if hi is not None and value > hi :
+        return ["{}: {!r} is more than {}".format(name, value, hi)]
+    if len(spec) > 3 and not re.match(spec[3], value) :
+        return ["{}: {!r} does not match {}".format(name, value, spec[3])]
+    return []
+
+
+class RuntimeConfig :
+    def __init__(self, filename=CONFIG_FILE, pollSec=CONFIG_POLL_SEC) :
+        self.filename = os.path.abspath(filename)
+        self.sections = {}               # name: (module, schema, onChange)
+        self.files = {self.filename: self.reload}
+        self.watcher = FileWatcher([self.filename], pollSec)
+
+        # statistics
+        self.reloads = 0
+        self.rejected = 0
+
+    def register(self, name, module, schema, onChange=None) :
+        self.sections[name] = (module, schema, onChange)
+
+    #
+    # Call function() whenever another file changes
+    #
+    def watchFile(self, path, function) :
+        path = os.path.abspath(path)
+        self.files[path] = function
+        self.watcher.add(path)
+
+    def current(self) :
+        return {name : {key : getattr(module, key) for key in schema}
+                for name, (module, schema, onChange) in self.sections.items()}
+
+    def validate(self, cfg) :
+        if not isinstance(cfg, dict) :
+            return ["expected an object of sections"]
+        errors = []
+        for name, values in cfg.items() :
+            if name not in self.sections :
+                errors.append("unknown section " + name)
+                continue
+            schema = self.sections[name][1]
+            if not isinstance(values, dict) :
+                errors.append(name + ": expected an object of settings")
+                continue
+            for key, value in values.items() :
+                if key not in schema :
+                    errors.append("{}: unknown setting {}".format(name, key))
+                else :
+                    errors += checkValue(name + "." + key, value, schema[key])
+        return errors
+
+    #
+    # Read the file, created from the current values if it does not exist.
+    # Returns {section: set of changed names}, or None when the file was rejected.
+    #
+    def load(self) :
+        try :
+            with open(self.filename, 'r') as f :
+                cfg = json.load(f)
+        except IOError :
+            with open(self.filename, 'w') as f :
+                json.dump(self.current(), f, indent=2)
+            self.watcher.stamps[self.filename] = self.watcher.stamp(self.filename)
+            return {}
+        except ValueError as e :
+            self.rejected += 1
+            print("{} not applied: {}".format(self.filename, e))
+            return None
+
+        errors = self.validate(cfg)
+        if errors :
+            self.rejected += 1
+            print("{} not applied: {}".format(self.filename, "; ".join(errors)))
+            return None
+
+        return self.apply(cfg)
+
+    def apply(self, cfg) :
+        applied = {}
+        previous = {}
+        for name, values in cfg.items() :
+            module, schema, onChange = self.sections[name]
+            changed = set(key for key, value in values.items() if getattr(module, key) != value)
+            previous[name] = {key : getattr(module, key) for key in changed}
+            for key in changed :
+                setattr(module, key, values[key])
+            if changed :
+                applied[name] = changed
+                print("{} settings changed: {}".format(name, ", ".join(sorted(changed))))
+
+        # after all values are set, so a change can use settings from other sections
+        try :
+            self.notify(applied)
+        except Exception as e :
+            self.rejected += 1
+            print("{} not applied, previous settings restored: {}".format(self.filename, e))
+            for name, values in previous.items() :
+                for key, value in values.items() :
+                    setattr(self.sections[name][0], key, value)
+            try :
+                self.notify(applied)             # restart what was changed with the old settings
+            except Exception as e :
+                print("{} previous settings: {}".format(self.filename, e))
+            return None
+        return applied
+
+    def notify(self, applied) :
+        for name, changed in applied.items() :
+            onChange = self.sections[name][2]
+            if onChange :
+                onChange(changed)
+
+    def reload(self) :
+        self.reloads += 1
+        return self.load()
+
+    #
+    # Apply changed files, call often from the main loop
+    #
+    def check(self, timeout=0) :
+        for path in self.watcher.changed(timeout) :
+            try :
+                self.files[path]()
+            except Exception as e :
+                print("Reloading {} failed: {}: {}".format(path, type(e).__name__, e))
+
+    def close(self) :
+        self.watcher.close()
+
+
+#
+# Test / debug, time to notice and apply an edit
+#
+if __name__ == '__main__':
+
+    import types
+    import tempfile
+
+    filename = sys.argv[1] if len(sys.argv) > 1 else os.path.join(tempfile.mkdtemp(), CONFIG_FILE)
+
+    demo = types.ModuleType("demo")
+    demo.measTime = 60
+    demo.MQTT_HOST = "localhost"
+    applied = []
+
+    for useInotify in (True, False) :
+        if os.path.exists(filename) :
+            os.remove(filename)
+        config = RuntimeConfig(filename, pollSec=0.1)
+        if not useInotify :
+            config.watcher.close()
+        config.register("demo", demo, {"measTime": (NUMBER, 1, 3600), "MQTT_HOST": (str, None, None, r"^\S+$")},
+                        lambda changed : applied.append((time.time(), changed)))
+        config.load()
+
+        delays = []
+        for i in range(20) :
+            tmp = filename + ".tmp"
+            with open(tmp, 'w') as f :
+                json.dump({"demo": {"measTime": 10 + i}}, f)
+            t0 = time.time()
+            os.replace(tmp, filename)                      # editors save by rename
+            while demo.measTime != 10 + i and time.time() - t0 < 5 :
+                config.check(0.01)
+            delays.append(time.time() - t0)
+
+        with open(filename, 'w') as f :
+            json.dump({"demo": {"measTime": 0, "MQTT_HOST": "bad host"}}, f)
+        time.sleep(0.2)
+        config.check(0.2)
+
+        print("{}: {} changes applied, mean delay {:.1f} ms, max {:.1f} ms, measTime {} after invalid edit, {} rejected".format(
+              "inotify" if config.watcher.fd is not None else "polling", len(delays), sum(delays) / len(delays) * 1000,
+              max(delays) * 1000, demo.measTime, config.rejected))
+        config.close()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+
+
+OVERVIEW:
+    systemd service notifications (sd_notify(3)) without the systemd
+    Python package. When basinMaster runs as a Type=notify service with
+    WatchdogSec set, systemd restarts it if WATCHDOG=1 is not sent within
+    that time:
+
+        watchdog = sdNotify.Watchdog()
+        sdNotify.notify("READY=1")
+        while True :
+            ...
+            watchdog.kick()         # only from a loop that is known to be healthy
+
+    Outside systemd NOTIFY_SOCKET is not set and every call does nothing.
+
+    Test / debug, sends to a local socket as systemd would receive it:
+        python3 sdNotify.py
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import time
+import socket
+
+
+#
+# Send a state string such as "READY=1" to systemd, False when not run by systemd
+#
+def notify(state) :
+    address = os.environ.get("NOTIFY_SOCKET")
+    if not address :
+        return False
+    if address[0] == '@' :
+        address = '\0' + address[1:]             # abstract socket
+
+    try :
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM | socket.SOCK_CLOEXEC) as sock :
+            sock.connect(address)
+            sock.sendall(state.encode())
+    except OSError :
+        return False
+    return True
+
+
+#
+# Watchdog interval in seconds for this process, None when not enabled
+#
+def watchdogSec() :
+    usec = os.environ.get("WATCHDOG_USEC")
+    pid = os.environ.get("WATCHDOG_PID")
+    if not usec or (pid and int(pid) != os.getpid()) :
+        return None                              # e.g. a child process of the service
+    return int(usec) / 1e6
+
+
+class Watchdog :
+    def __init__(self) :
+        self.interval = watchdogSec()
+        self.nextKick = 0
+        self.kicks = 0
+
+    #
+    # Send WATCHDOG=1, at most every half interval as sd_watchdog_enabled(3) suggests
+    #
+    def kick(self) :
+        if self.interval is None :
+            return False
+        now = time.monotonic()
+        if now < self.nextKick :
+            return False
+        self.nextKick = now + self.interval / 2
+        self.kicks += 1
+        return notify("WATCHDOG=1")
+
+
+#
+# Test / debug
+#
+if __name__ == '__main__':
+
+    import tempfile
+
+    path = os.path.join(tempfile.mkdtemp(), "notify")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    server.bind(path)
+    server.settimeout(1)
+
+    os.environ["NOTIFY_SOCKET"] = path
+    os.environ["WATCHDOG_USEC"] = "2000000"
+    os.environ["WATCHDOG_PID"] = str(os.getpid())
+
+    watchdog = Watchdog()
+    notify("READY=1")
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < 3 :
+        watchdog.kick()
+        time.sleep(0.01)
+    notify("STOPPING=1")
+
+    received = []
+    try :
+        while True :
+            received.append(server.recv(256).decode())
+    except socket.timeout :
+        pass
+    print("watchdog interval {} s, received {}".format(watchdog.interval, received))
@@ -13,6 +13,8 @@ REVISION HISTORY
   2021/03/01  BrucesHobbies   Included cfgData.py
                               Removed key from cfg.json
                               Changed key generation
+  2026/10/19  BrucesHobbies   send_mail returns True when sent so pubOutbox can retry
+  2026/10/19  BrucesHobbies   SMTPSERVERTLSPORT may be changed while running (runtimeConfig.py)
 
 LICENSE:
     This program code and documentation are for personal private use only. 
@@ -83,6 +85,11 @@ SMTPSERVERTLSPORT = 'smtp.gmail.com:587'
 # SMTPTLSPORT = 587                   # For TLS, newer than SSL
 # SMTPSSLPORT = 465                   # For SSL
 
+# Settings that may be changed while running, see runtimeConfig.py
+CONFIG_SCHEMA = {
+    "SMTPSERVERTLSPORT": (str, None, None, r"^[^\s:]+:\d+$"),
+}
+
 
 FROM_USERID   = 'FROM_USERID'
 STATUS_USERID = 'STATUS_USERID'
@@ -91,6 +98,7 @@ ALERT_USERID  = 'ALERT_USERID'
 
 #
 # --- Send text message ---
+# Returns True if sent, False if the SMTP server could not be reached or refused it
 #
 def send_mail(to_UserID_key, subj, msg) : 
 
@@ -104,7 +112,9 @@ def send_mail(to_UserID_key, subj, msg) :
     print(fullMsg)
 
 
+    sent = False
     if (from_UserID!="") and (passwd!="") and (to_UserID!="") :
+        server = None
         try:
             server = smtplib.SMTP(SMTPSERVERTLSPORT)
             server.starttls()
@@ -119,15 +129,23 @@ def send_mail(to_UserID_key, subj, msg) :
             """
 
             print("--- End of message ---")
+            sent = True
 
         except Exception as e:
             print(e)
 
         finally:
-            server.quit()    # TLS quit
+            if server is not None :
+                try :
+                    server.quit()    # TLS quit
+                except Exception :
+                    pass
 
     else :
         print("No userids and a password - local message only!\n")
+        sent = True
+
+    return sent
 
 
 
@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+
+
+OVERVIEW:
+    Deadline for sensor bus transactions. An I2C or SPI read on a wedged
+    bus can block in the driver for ever, and with it the measurement loop
+    and every alert. Reads are run in a worker thread instead:
+
+        executor = sensorBus.DeadlineExecutor("ABP", reopen=sensor.reopenBus)
+        data = executor.run(bus.read_i2c_block_data, 0x28, 0, 4)
+
+    run() returns the result or raises the exception of the call. When the
+    call takes longer than deadlineSec it raises BusTimeout and the sensor
+    is marked degraded:
+    - the worker stuck in the driver is abandoned, a Python thread can not
+      be stopped, and a new worker is started for the next attempt
+    - while degraded run() raises BusDegraded at once, so the loop goes on
+      with the other sensors
+    - after a backoff, BUS_RETRY_MIN doubling up to BUS_RETRY_MAX seconds,
+      the next run() calls reopen() (close and open the bus handle) in the
+      new worker, also with the deadline, and then the transaction
+    - BUS_ERRORS_DEGRADED failures in a row, e.g. a device that no longer
+      acknowledges its address, also mark the sensor degraded and reopen it
+    - at most BUS_MAX_STUCK abandoned workers are kept. Beyond that the
+      sensor stays degraded until one returns, and a process that is truly
+      stuck is left to the procSplit heartbeat and systemd watchdog.
+
+    BusError is an IOError, so code that already handles bus IOErrors
+    handles these too.
+
+    Test / debug, loop timing while a simulated bus hangs and recovers:
+        python3 sensorBus.py
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import sys
+import time
+import queue
+import threading
+
+
+BUS_DEADLINE_SEC    = 0.25     # a 4 byte read takes about 1 ms
+BUS_RETRY_MIN       = 1        # seconds before the first recovery attempt
+BUS_RETRY_MAX       = 300      # longest wait between recovery attempts
+BUS_ERRORS_DEGRADED = 5        # failed transactions in a row that mark the sensor degraded
+BUS_MAX_STUCK       = 3        # abandoned workers before recovery waits for one to return
+
+
+class BusError(IOError) :
+    pass
+
+class BusTimeout(BusError) :
+    pass
+
+class BusDegraded(BusError) :
+    pass
+
+
+#
+# One thread running calls in order
+#
+class Worker :
+    def __init__(self, name) :
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self.loop, name="bus-" + name, daemon=True)
+        self.thread.start()
+
+    def loop(self) :
+        while True :
+            job = self.jobs.get()
+            if job is None :
+                return
+            function, args, done, result = job
+            try :
+                result.append((True, function(*args)))
+            except Exception as e :
+                result.append((False, e))
+            done.set()
+            job = function = args = None         # no references kept while waiting
+
+    def stop(self) :
+        self.jobs.put(None)                      # ends the thread once the call in progress returns
+
+
+class DeadlineExecutor :
+    #
+    # name: sensor name for messages
+    # reopen: function closing and opening the bus handle, None for none
+    #
+    def __init__(self, name, reopen=None, deadlineSec=BUS_DEADLINE_SEC, retryMin=BUS_RETRY_MIN,
+                 retryMax=BUS_RETRY_MAX, maxStuck=BUS_MAX_STUCK) :
+        self.name = name
+        self.reopen = reopen
+        self.deadlineSec = deadlineSec
+        self.retryMin = retryMin
+        self.retryMax = retryMax
+        self.maxStuck = maxStuck
+
+        self.lock = threading.Lock()             # one transaction at a time
+        self.worker = Worker(name)
+        self.stuck = []                          # abandoned workers
+        self.degraded = False
+        self.retry = retryMin
+        self.retryAt = 0
+        self.errorsInRow = 0
+
+        # statistics
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.recoveries = 0
+
+    #
+    # function(*args) with the deadline, see OVERVIEW
+    #
+    def run(self, function, *args) :
+        with self.lock :
+            if self.degraded :
+                if time.monotonic() < self.retryAt :
+                    raise BusDegraded(self.name + " bus degraded, next recovery in {:.0f} s".format(self.retryAt - time.monotonic()))
+                self.recover()
+
+            try :
+                result = self.call(function, args)
+            except BusTimeout :
+                raise
+            except Exception :
+                self.errors += 1
+                self.errorsInRow += 1
+                if self.errorsInRow >= BUS_ERRORS_DEGRADED :
+                    self.setDegraded("{} errors in a row".format(self.errorsInRow))
+                raise
+
+            self.errorsInRow = 0
+            self.retry = self.retryMin
+            return result
+
+    def call(self, function, args) :
+        done = threading.Event()
+        result = []
+        self.calls += 1
+        self.worker.jobs.put((function, args, done, result))
+        if not done.wait(self.deadlineSec) :
+            self.timeouts += 1
+            self.stuck.append(self.worker)       # still blocked in the driver
+            self.worker.stop()
+            self.worker = None
+            self.setDegraded("no response within {} s".format(self.deadlineSec))
+            raise BusTimeout(self.name + " bus did not respond within {} s".format(self.deadlineSec))
+
+        ok, value = result[0]
+        if not ok :
+            raise value
+        return value
+
+    def setDegraded(self, reason) :
+        if not self.degraded :
+            print("{} sensor degraded, {}".format(self.name, reason))
+        self.degraded = True
+        self.retryAt = time.monotonic() + self.retry
+        self.retry = min(self.retry * 2, self.retryMax)
+
+    #
+    # New worker and bus handle, raises BusError when the bus is still not usable
+    #
+    def recover(self) :
+        self.stuck = [worker for worker in self.stuck if worker.thread.is_alive()]
+        if self.worker is None :
+            if len(self.stuck) >= self.maxStuck :
+                self.setDegraded("")
+                raise BusDegraded(self.name + " bus degraded, {} calls still hung".format(len(self.stuck)))
+            self.worker = Worker(self.name)
+
+        if self.reopen :
+            try :
+                self.call(self.reopen, ())
+            except BusTimeout :
+                raise
+            except Exception as e :
+                self.setDegraded("")
+                raise BusDegraded(self.name + " bus reopen failed: " + str(e))
+
+        self.degraded = False
+        self.errorsInRow = 0
+        self.recoveries += 1
+        print("{} sensor bus reopened".format(self.name))
+
+    def stats(self) :
+        return {"degraded": self.degraded, "calls": self.calls, "timeouts": self.timeouts, "errors": self.errors,
+                "recoveries": self.recoveries, "stuck": len(self.stuck)}
+
+    def close(self) :
+        if self.worker :
+            self.worker.stop()
+            self.worker = None
+
+
+#
+# Test / debug, a measurement loop with a simulated bus that hangs for a
+# while and then works again
+#
+if __name__ == '__main__':
+
+    class FakeBus :
+        def __init__(self) :
+            self.hangUntil = 0
+            self.opens = 0
+
+        def read(self) :
+            while time.monotonic() < self.hangUntil :
+                time.sleep(0.05)                 # hung in the driver
+            return [0x20, 0x00, 0x80, 0x00]
+
+        def reopen(self) :
+            self.opens += 1
+
+    bus = FakeBus()
+    executor = DeadlineExecutor("TEST", bus.reopen, retryMin=0.5, retryMax=2)
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    t0 = time.perf_counter()
+    for i in range(n) :
+        executor.run(bus.read)
+    overhead = (time.perf_counter() - t0) / n
+    t0 = time.perf_counter()
+    for i in range(n) :
+        bus.read()
+    overhead -= (time.perf_counter() - t0) / n
+    print("executor overhead {:.1f} us per read".format(overhead * 1e6))
+
+    tStart = time.monotonic()
+    bus.hangUntil = tStart + 6
+    longest = 0
+    results = {"ok": 0, "timeout": 0, "degraded": 0}
+    while time.monotonic() - tStart < 10 :
+        t = time.monotonic()
+        try :
+            executor.run(bus.read)
+            results["ok"] += 1
+        except BusTimeout :
+            results["timeout"] += 1
+        except BusDegraded :
+            results["degraded"] += 1
+        longest = max(longest, time.monotonic() - t)
+        time.sleep(0.1)                          # measurement loop tick
+    print("bus hung for 6 s of 10 s: longest loop read {:.0f} ms, {}".format(longest * 1000, results))
+    print("threads {}, reopened {} times, stats {}".format(threading.active_count(), bus.opens, executor.stats()))
@@ -10,6 +10,7 @@ REVISION HISTORY
   DATE        AUTHOR          CHANGES
   yyyy/mm/dd  --------------- -------------------------------------
   2021/03/01  BrucesHobbies   Fixed exception logic in readAbp()'s
+  2026/10/19  BrucesHobbies   Bus reads with a deadline, reopened after a hang (sensorBus.py)
 
 
 OVERVIEW:
@@ -17,6 +18,11 @@ OVERVIEW:
   (High Accuracy, Compensated/Amplified, 60 mbar to 10 bar | 6kPa to 1 MPa | 1 psi to 150 psi,
   Liquid Media Capable)
 
+  Bus reads run through a sensorBus.DeadlineExecutor, so a hung I2C or SPI
+  bus returns status None after BUS_DEADLINE_SEC instead of blocking. The
+  sensor is then degraded (self.executor.degraded) and the bus handle is
+  reopened with backoff.
+
 
 LICENSE:
     This program code and documentation are for personal private use only. 
@@ -115,6 +121,8 @@ import time
 import smbus    # I2C support
 import spidev	# SPI support
 
+import sensorBus
+
 
 class SensorHnyAbp :
     def __init__(self, sensor) :
@@ -193,6 +201,11 @@ class SensorHnyAbp :
         print("Range: " + str(round(self.PRESSURE_MIN,1)) + " to " + str(round(self.PRESSURE_MAX,1)) + " " + self.PRES_UNITS + " " + self.PRESS_SENSOR + addr)
 
         # initialize appropriate bus
+        self.openBus()
+        self.executor = sensorBus.DeadlineExecutor("ABP", self.reopenBus)
+
+
+    def openBus(self) :
         if self.i2c_address :
             i2c_ch = 1                     # i2c channel
             self.bus=smbus.SMBus(i2c_ch)   # Initialize I2C (SMBus)
@@ -206,13 +219,39 @@ class SensorHnyAbp :
             self.spi.mode = 0
 
 
-    def __del__(self) :            # del Abp pressure sensor
+    def closeBus(self) :
         if self.i2c_address :
             self.bus.close()
         else :
             self.spi.close()
 
 
+    def reopenBus(self) :          # called by the executor after a hung or failing read
+        try :
+            self.closeBus()
+        except IOError :
+            pass
+        self.openBus()
+
+
+    def close(self) :              # release the bus, the executor keeps this object alive until then
+        if getattr(self, "executor", None) :
+            self.executor.close()
+            self.executor = None
+            self.closeBus()
+
+
+    def __del__(self) :            # del Abp pressure sensor
+        self.close()
+
+
+    # Read nbytes from the sensor, runs in the executor's worker thread
+    def transfer(self, nbytes) :
+        if self.i2c_address :
+            return self.bus.read_i2c_block_data(self.i2c_address, 0, nbytes)  # send address with read bit
+        return self.spi.readbytes(nbytes)
+
+
     def __cnts2pres(self, dataBlk) :
         # converts 2 bytes to return scaled floating point
         # print("dataBlk[0]: " + hex(dataBlk[0]) + " dataBlk[1]: " + hex(dataBlk[1]))
@@ -244,14 +283,10 @@ class SensorHnyAbp :
     # Reads the I2C pressure sensor returning pressure only
     def readAbp(self):                           
         try :
-            if self.i2c_address :
-                result = self.bus.read_i2c_block_data(self.i2c_address, 0, 2)  # send address with read bit and returns 2 bytes
-            else :
-                result = self.spi.readbytes(2)
-
+            result = self.executor.run(self.transfer, 2)
             pressure = self.__cnts2pres(result)
 
-        except :
+        except (IOError, IndexError, TypeError) :
             pressure = None
 
 
@@ -261,15 +296,11 @@ class SensorHnyAbp :
     # Reads the I2C pressure sensor and also returns status
     def readAbpStatus(self):
         try :
-            if self.i2c_address :
-                result = self.bus.read_i2c_block_data(self.i2c_address, 0, 2)  # send address with read bit and returns 2 bytes
-            else :
-                result = self.spi.readbytes(2)
-
+            result = self.executor.run(self.transfer, 2)
             status = (result[0] & 0xC0) >> 6
             pressure = self.__cnts2pres(result)
 
-        except :
+        except (IOError, IndexError, TypeError) :
             status = None
             pressure = None
 
@@ -279,16 +310,12 @@ class SensorHnyAbp :
     # Reads the I2C pressure sensor and also returns status and temp
     def readAbpStatusTemp(self):
         try :
-            if self.i2c_address :
-                result = self.bus.read_i2c_block_data(self.i2c_address, 0, 4)  # send address with read bit and returns 4 bytes
-            else :
-                result = self.spi.readbytes(4)
-
+            result = self.executor.run(self.transfer, 4)
             status = (result[0] & 0xC0) >> 6
             pressure = self.__cnts2pres(result)
             tempC = self.__cnts2tempC(result)
 
-        except :
+        except (IOError, IndexError, TypeError) :
             status = None
             pressure = None
             tempC = None
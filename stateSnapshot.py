@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+
+"""
+Copyright(C) 2021, BrucesHobbies
+All Rights Reserved
+
+AUTHOR: BrucesHobbies
+DATE: 10/19/2026
+REVISION HISTORY
+  DATE        AUTHOR          CHANGES
+  yyyy/mm/dd  --------------- -------------------------------------
+
+
+OVERVIEW:
+    Crash safe snapshots of program state, so a restart continues with the
+    last readings, delta logging baseline and alert throttling instead of
+    defaults.
+
+    State is kept in sections, each a small JSON file in STATE_DIR written
+    by the process that owns it:
+
+        snapshot = stateSnapshot.Snapshot("state")
+        snapshot.register("gauge", getState, setState)
+        snapshot.restore()      # setState(state, saved UNIX time), (None, None) when missing
+        ...
+        snapshot.tick()         # in the main loop, saves every saveSec seconds
+        snapshot.save()         # on exit or after an important change
+
+    A section is written to a temporary file, flushed to disk and renamed
+    over the old one, so a power cut leaves either the old or the new
+    snapshot, never a partial one.
+
+    When a snapshot is missing or stale the last values can be recovered
+    from a csv log with csvTail(). It reads the file backwards from the end
+    in blocks and stops when every field has a value, so it reads only a few
+    kB however large the log has grown, TAIL_MAX_BYTES at most.
+
+    Test / debug, csv tail recovery time against reading the whole file:
+        python3 stateSnapshot.py [rows]
+
+LICENSE:
+    This program code and documentation are for personal private use only.
+    No commercial use of this code is allowed without prior written consent.
+
+    This program is free for you to inspect, study, and modify for your
+    personal private use.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, version 3 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import sys
+import time
+import json
+
+
+STATE_DIR        = "state"
+STATE_SAVE_SEC   = 300             # seconds between periodic snapshots
+TAIL_BLOCK_BYTES = 4096            # csv is read backwards in blocks of this size
+TAIL_MAX_BYTES   = 1024 * 1024     # never read more than this from the end of a csv
+MISSING_VALUE    = -99
+
+
+#
+# Write data as JSON so that filename has either its old or its new contents
+#
+def atomicWriteJson(filename, data) :
+    tmp = filename + ".tmp"
+    with open(tmp, 'w') as f :
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+
+    try :
+        fd = os.open(os.path.dirname(os.path.abspath(filename)), os.O_RDONLY)
+        try :
+            os.fsync(fd)                         # the rename itself
+        finally :
+            os.close(fd)
+    except OSError :
+        pass
+
+
+class Snapshot :
+    def __init__(self, directory=STATE_DIR, saveSec=STATE_SAVE_SEC) :
+        self.directory = directory
+        self.saveSec = saveSec
+        self.sections = {}           # name: (getState, setState)
+        self.nextSave = time.time() + saveSec
+
+        # statistics
+        self.saves = 0
+        self.errors = 0
+
+        if not os.path.isdir(directory) :
+            os.makedirs(directory)
+
+    def filename(self, name) :
+        return os.path.join(self.directory, name + ".json")
+
+    #
+    # getState() returns a JSON serializable value, setState(state, tsec) restores it
+    #
+    def register(self, name, getState, setState) :
+        self.sections[name] = (getState, setState)
+
+    def restore(self) :
+        for name, (getState, setState) in self.sections.items() :
+            try :
+                with open(self.filename(name), 'r') as f :
+                    snap = json.load(f)
+                state, tsec = snap["state"], snap["t"]
+            except (IOError, ValueError, KeyError, TypeError) :
+                state, tsec = None, None
+            setState(state, tsec)
+
+    def save(self) :
+        now = time.time()
+        self.nextSave = now + self.saveSec
+        for name, (getState, setState) in self.sections.items() :
+            try :
+                atomicWriteJson(self.filename(name), {"t": now, "state": getState()})
+                self.saves += 1
+            except (IOError, OSError, TypeError, ValueError) as e :
+                self.errors += 1
+                print("State snapshot " + name + " not saved: " + str(e))
+
+    def tick(self, now=None) :
+        if (time.time() if now is None else now) >= self.nextSave :
+            self.save()
+
+
+#
+# Lines of a file from the last to the first, reading at most maxBytes from the end
+#
+def reverseLines(filename, blockSize=TAIL_BLOCK_BYTES, maxBytes=TAIL_MAX_BYTES) :
+    with open(filename, 'rb') as f :
+        f.seek(0, os.SEEK_END)
+        end = pos = f.tell()
+        rest = b''
+        while pos > 0 and end - pos < maxBytes :
+            n = min(blockSize, pos)
+            pos -= n
+            f.seek(pos)
+            lines = (f.read(n) + rest).split(b'\n')
+            rest = lines[0]                      # may continue in the previous block
+            for line in reversed(lines[1:]) :
+                if line.strip() :
+                    yield line.decode('utf-8', 'replace')
+        if pos == 0 and rest.strip() :
+            yield rest.decode('utf-8', 'replace')
+
+
+#
+# Last values of a pubScribe csv log.
+# Returns (lastRow, latest):
+#   lastRow  (UNIX time, {field: value}) of the last complete row, or None
+#   latest   {field: (UNIX time, value)} of the last row where the field is not MISSING_VALUE
+#
+def csvTail(filename, fields, maxBytes=TAIL_MAX_BYTES) :
+    lastRow = None
+    latest = {}
+    try :
+        with open(filename, 'r') as f :
+            header = f.readline().rstrip('\r\n').split(',')
+        columns = {field : header.index(field) for field in fields if field in header}
+
+        for line in reverseLines(filename, maxBytes=maxBytes) :
+            cols = line.rstrip('\r').split(',')
+            if len(cols) != len(header) :
+                continue                         # header or a row cut short by a crash
+            try :
+                tsec = float(cols[0])
+                values = {field : float(cols[i]) for field, i in columns.items()}
+            except ValueError :
+                continue
+
+            if lastRow is None :
+                lastRow = (tsec, values)
+            for field, value in values.items() :
+                if field not in latest and value != MISSING_VALUE :
+                    latest[field] = (tsec, value)
+            if len(latest) == len(columns) :
+                break
+
+    except IOError :
+        pass
+
+    return lastRow, latest
+
+
+#
+# Test / debug
+#
+if __name__ == '__main__':
+
+    import tempfile
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, "basinMaster_WaterDepth.csv")
+    fields = ["Ultrasonic (in)", "ABP (in)"]
+
+    t0 = 1.7e9
+    with open(filename, 'w') as f :
+        f.write("UNIX time (s),DateTime," + ",".join(fields) + "\n")
+        f.writelines("{},{},{:.2f},{:.2f}\n".format(int(t0 + i * 60), "2026-10-19 00:00:00", 4 + (i % 100) / 50.0,
+                                                    -99 if i > rows - 5 else 4.1) for i in range(rows))
+        f.write("{},2026-10-19 00:00:00,5.".format(int(t0 + rows * 60)))       # row cut short by a crash
+
+    t = time.time()
+    lastRow, latest = csvTail(filename, fields)
+    tTail = time.time() - t
+
+    t = time.time()
+    with open(filename, 'r') as f :
+        for line in f :
+            pass
+    tFull = time.time() - t
+
+    print("{} rows, {:.0f} MB: tail {:.2f} ms, reading the whole file {:.0f} ms".format(
+          rows, os.path.getsize(filename) / 1e6, tTail * 1000, tFull * 1000))
+    print("last row", lastRow, "latest valid", latest)
+
+    state = {"n": 0}
+    snapshot = Snapshot(os.path.join(directory, STATE_DIR))
+    snapshot.register("demo", lambda : state, lambda s, tsec : print("restored", s, "saved at", tsec))
+    snapshot.restore()
+    state["n"] = 42
+    snapshot.save()
+    snapshot.restore()